@@ -0,0 +1,93 @@
+"""Time of the logDice scores of collocations.
+
+Scores synthetic collocations one at a time, as `compute_collocation_scores`
+did before, and on the columns of `Collocations` (see
+`collocation_frequencies` and `log_dice`), without writing them. The time
+of coding the lemmas of the columns, which `load_collocations` takes once,
+is reported separately, e.g.:
+
+    PYTHONPATH=. python benchmarks/collocation_scores.py --collocations 10000000
+"""
+
+import math
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+from wordprofile.datatypes import Colloc
+from wordprofile.wpse.processing import (
+    Collocations,
+    collocation_frequencies,
+    log_dice,
+)
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--collocations", type=int, default=1_000_000, help="number of collocations"
+    )
+    parser.add_argument("--lemmas", type=int, default=100_000, help="number of lemmas")
+    return parser.parse_args(args)
+
+
+def score_rows(collocs, lemma_freqs):
+    invalid_ids = set()
+    for c_id, c in collocs.items():
+        score = 14 + math.log2(
+            2
+            * max(1, c.frequency)
+            / (
+                max(1, lemma_freqs[(c.lemma1, c.lemma1_tag)])
+                + max(1, lemma_freqs[(c.lemma2, c.lemma2_tag)])
+            )
+        )
+        if score < 0:
+            invalid_ids.add(c_id)
+    return invalid_ids
+
+
+def score_columns(collocs, lemma_freqs):
+    scores = log_dice(*collocation_frequencies(collocs, lemma_freqs))
+    return set(collocs.ids[scores < 0].tolist())
+
+
+def main(arguments: list):
+    args = parse_arguments(arguments)
+    rng = random.Random(0)
+    lemmas = [f"lemma{i}" for i in range(args.lemmas)]
+    lemma_freqs = {(lemma, "NOUN"): rng.randint(1, 100_000) for lemma in lemmas}
+    collocs = {
+        i: Colloc(
+            i,
+            "ATTR",
+            rng.choice(lemmas),
+            rng.choice(lemmas),
+            "NOUN",
+            "NOUN",
+            "_",
+            0,
+            rng.randint(5, 1000),
+        )
+        for i in range(1, args.collocations + 1)
+    }
+    print("scoring\tcollocations\tseconds")
+    start = time.perf_counter()
+    columns = Collocations(collocs.values())
+    elapsed = time.perf_counter() - start
+    print(f"coding columns\t{len(collocs)}\t{elapsed:.2f}")
+    results = []
+    for name, score, inventory in [
+        ("rows", score_rows, collocs),
+        ("columns", score_columns, columns),
+    ]:
+        start = time.perf_counter()
+        results.append(score(inventory, lemma_freqs))
+        elapsed = time.perf_counter() - start
+        print(f"{name}\t{len(collocs)}\t{elapsed:.2f}")
+    assert results[0] == results[1]
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,106 @@
+"""Wall time and disk usage of compressed intermediate files.
+
+Runs the extraction and the aggregation with each compression on storage
+directories given by `--dirs`, e.g. a local SSD and a network mount, and
+reports the wall time of both steps and the size of the extraction results
+and of the largest temporary files of the aggregation:
+
+    PYTHONPATH=. python benchmarks/compression.py --input corpus.conll.gz --copies 20 --dirs /scratch /mnt/nfs/scratch
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from benchmarks.process_files import replicate_input
+from wordprofile.utils import COMPRESSION_SUFFIXES, default_compression
+from wordprofile.wpse.processing import TABLE_FORMATS, compute_stats, process_files
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--input",
+        nargs="+",
+        default=[os.path.join("tests", "testdata", "data.anno.conll.gz")],
+        help="(gzip compressed) conll input file(s)",
+    )
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=1,
+        help="concatenate the input this many times to increase the workload",
+    )
+    parser.add_argument(
+        "--dirs",
+        nargs="+",
+        default=[tempfile.gettempdir()],
+        help="storage directories to compare, e.g. local and network storage",
+    )
+    parser.add_argument(
+        "--compression",
+        nargs="+",
+        choices=["none", *COMPRESSION_SUFFIXES],
+        default=["none", "gzip", default_compression()],
+    )
+    parser.add_argument("--table-format", choices=TABLE_FORMATS, default="tsv")
+    parser.add_argument("--njobs", type=int, default=4, help="number of jobs")
+    return parser.parse_args(args)
+
+
+def disk_usage(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, fname))
+        for root, _, fnames in os.walk(path)
+        for fname in fnames
+    )
+
+
+def main(arguments: list):
+    args = parse_arguments(arguments)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = replicate_input(args.input, args.copies, tmp_dir)
+        print("dir\tcompression\textract_s\tcolloc_MB\tstats_s\ttmp_MB")
+        for storage_dir in args.dirs:
+            for compression in dict.fromkeys(args.compression):
+                codec = None if compression == "none" else compression
+                dest = tempfile.mkdtemp(dir=storage_dir)
+                colloc_dir = os.path.join(dest, "colloc")
+                stats_dir = os.path.join(dest, "stats")
+                os.makedirs(colloc_dir)
+                os.makedirs(stats_dir)
+                try:
+                    start = time.perf_counter()
+                    process_files(
+                        [corpus],
+                        colloc_dir,
+                        args.njobs,
+                        table_format=args.table_format,
+                        compression=codec,
+                    )
+                    extract_time = time.perf_counter() - start
+                    start = time.perf_counter()
+                    compute_stats(
+                        [colloc_dir], stats_dir, with_mwe=True, compression=codec
+                    )
+                    stats_time = time.perf_counter() - start
+                    # the temporary files are removed, the duplicates are kept
+                    tmp_size = sum(
+                        os.path.getsize(os.path.join(stats_dir, fname))
+                        for fname in os.listdir(stats_dir)
+                        if fname.startswith("concord_sentences.duplicate")
+                    )
+                    print(
+                        f"{storage_dir}\t{compression}\t{extract_time:.2f}\t"
+                        f"{disk_usage(colloc_dir) / 2**20:.1f}\t{stats_time:.2f}\t"
+                        f"{tmp_size / 2**20:.1f}"
+                    )
+                finally:
+                    shutil.rmtree(dest)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,65 @@
+"""Throughput of the CoNLL-U readers (tokens per second).
+
+Compares `conllu.parse_incr` followed by `convert_sentence` with the streaming
+reader of `wordprofile.wpse.conllu_reader`, e.g.:
+
+    PYTHONPATH=. python benchmarks/conllu_reader.py --input corpus.conll.gz
+"""
+
+import gzip
+import io
+import os
+import sys
+import time
+from argparse import ArgumentParser
+
+import conllu
+
+from wordprofile.wpse.conllu_reader import parse_documents
+from wordprofile.wpse.processing import convert_sentence
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--input",
+        default=os.path.join("tests", "testdata", "data.anno.conll.gz"),
+        help="(gzip compressed) conll input file",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=100, help="number of passes over the input"
+    )
+    return parser.parse_args(args)
+
+
+def read_with_conllu(data: str) -> int:
+    n_tokens = 0
+    for sent in conllu.parse_incr(
+        io.StringIO(data), fields=conllu.parser.DEFAULT_FIELDS
+    ):
+        n_tokens += len(convert_sentence(sent))
+    return n_tokens
+
+
+def read_streaming(data: str) -> int:
+    return sum(
+        len(sent)
+        for doc in parse_documents(io.StringIO(data))
+        for sent in doc.sentences
+    )
+
+
+def main(arguments: list):
+    args = parse_arguments(arguments)
+    with gzip.open(args.input, "rt", encoding="utf-8") as fh:
+        data = fh.read()
+    print("reader\ttokens\tseconds\ttokens/s")
+    for name, read in [("conllu", read_with_conllu), ("streaming", read_streaming)]:
+        start = time.perf_counter()
+        n_tokens = sum(read(data) for _ in range(args.repeat))
+        elapsed = time.perf_counter() - start
+        print(f"{name}\t{n_tokens}\t{elapsed:.2f}\t{n_tokens / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
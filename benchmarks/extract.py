@@ -0,0 +1,74 @@
+"""Throughput of the relation extraction (sentences per second).
+
+Compares the single-pass `extract_matches` with running the separate rule
+functions (pattern, objects, predicatives, genitives, comparing groups,
+active and passive subjects) one after another, e.g.:
+
+    PYTHONPATH=. python benchmarks/extract.py --input corpus.conll.gz
+"""
+
+import gzip
+import os
+import sys
+import time
+from argparse import ArgumentParser
+
+import wordprofile.extract as ex
+from wordprofile.datatypes import DependencyTree
+from wordprofile.sentence_filter import sentence_is_valid
+from wordprofile.wpse.conllu_reader import parse_documents
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--input",
+        default=os.path.join("tests", "testdata", "data.anno.conll.gz"),
+        help="(gzip compressed) conll input file",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=200, help="number of passes over the input"
+    )
+    return parser.parse_args(args)
+
+
+def extract_matches_multi_pass(parses):
+    relations_inv = ex.get_inverted_relation_patterns()
+    for sid, sentence in enumerate(parses, 1):
+        yield from ex.extract_matches_by_pattern(relations_inv, sentence, sid)
+        dtree = DependencyTree(sentence)
+        yield from ex.extract_objects(dtree, sid)
+        yield from ex.extract_predicatives(dtree, sid)
+        yield from ex.extract_genitives(dtree, sid)
+        yield from ex.extract_comparing_groups(sentence, sid)
+        yield from ex.extract_active_subjects(dtree, sid)
+        yield from ex.extract_passive_subjects(dtree, sid)
+
+
+def main(arguments: list):
+    args = parse_arguments(arguments)
+    with gzip.open(args.input, "rt", encoding="utf-8") as fh:
+        documents = [
+            list(filter(sentence_is_valid, doc.sentences))
+            for doc in parse_documents(fh)
+        ]
+    n_sentences = sum(map(len, documents)) * args.repeat
+    print("extraction\tsentences\tmatches\tseconds\tsentences/s")
+    for name, extract in [
+        ("multi-pass", extract_matches_multi_pass),
+        ("single-pass", ex.extract_matches),
+    ]:
+        start = time.perf_counter()
+        n_matches = 0
+        for _ in range(args.repeat):
+            for parses in documents:
+                n_matches += sum(1 for _ in extract(parses))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name}\t{n_sentences}\t{n_matches}\t{elapsed:.2f}\t"
+            f"{n_sentences / elapsed:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
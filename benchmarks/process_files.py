@@ -0,0 +1,87 @@
+"""Throughput of the collocation extraction (documents per second).
+
+Runs `process_files` on a corpus for every combination of transport, number
+of jobs and batch size and reports the documents processed per second, e.g.:
+
+    PYTHONPATH=. python benchmarks/process_files.py --input corpus.conll.gz --njobs 1 4 16 32 --batch-tokens 0 5000
+"""
+
+import gzip
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from wordprofile.wpse.processing import TRANSPORTS, process_files
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--input",
+        nargs="+",
+        default=[os.path.join("tests", "testdata", "data.anno.conll.gz")],
+        help="(gzip compressed) conll input file(s)",
+    )
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=1,
+        help="concatenate the input this many times to increase the workload",
+    )
+    parser.add_argument(
+        "--njobs", type=int, nargs="+", default=[1, 2, 4, 8], help="numbers of jobs"
+    )
+    parser.add_argument(
+        "--transport", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS)
+    )
+    parser.add_argument(
+        "--batch-tokens",
+        type=int,
+        nargs="+",
+        default=[0],
+        help="token budgets of document batches (0: single documents)",
+    )
+    return parser.parse_args(args)
+
+
+def replicate_input(paths: list[str], copies: int, dest: str) -> str:
+    corpus = os.path.join(dest, "corpus.conll.gz")
+    with gzip.open(corpus, "wt", compresslevel=1) as fo:
+        for _ in range(copies):
+            for path in paths:
+                with gzip.open(path, "rt") as fh:
+                    fo.write(fh.read())
+    return corpus
+
+
+def main(arguments: list):
+    args = parse_arguments(arguments)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = replicate_input(args.input, args.copies, tmp_dir)
+        print("transport\tnjobs\tbatch_tokens\tdocs\tseconds\tdocs/s")
+        for transport in args.transport:
+            for njobs in args.njobs:
+                for batch_tokens in args.batch_tokens:
+                    dest = os.path.join(tmp_dir, f"{transport}-{njobs}-{batch_tokens}")
+                    os.makedirs(dest)
+                    start = time.perf_counter()
+                    process_files(
+                        [corpus],
+                        dest,
+                        njobs,
+                        transport=transport,
+                        batch_tokens=batch_tokens,
+                    )
+                    elapsed = time.perf_counter() - start
+                    with open(os.path.join(dest, "corpus_files")) as fh:
+                        n_docs = sum(1 for _ in fh)
+                    print(
+                        f"{transport}\t{njobs}\t{batch_tokens}\t{n_docs}\t"
+                        f"{elapsed:.2f}\t{n_docs / elapsed:.1f}"
+                    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
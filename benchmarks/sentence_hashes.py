@@ -0,0 +1,67 @@
+"""Memory and time of the duplicate detection of concordances.
+
+Adds the hashes of distinct synthetic sentences to the Python set of md5
+hexdigests used for `--hash-bits 128` and to the compact `HashSet64`, and
+reports the memory per sentence (traced by `tracemalloc`, final and peak)
+and the wall time without tracing, e.g.:
+
+    PYTHONPATH=. python benchmarks/sentence_hashes.py --sentences 10000000
+"""
+
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+from wordprofile.wpse.dedup import HashSet64, get_robust_hash, get_robust_hash64
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--sentences", type=int, default=1_000_000, help="number of sentences"
+    )
+    return parser.parse_args(args)
+
+
+def sentence(i: int) -> str:
+    # the robust hash ignores digits
+    word = "".join(chr(ord("a") + int(c)) for c in str(i))
+    return f"Das ist der Satz {word}."
+
+
+def add_to_set(sentences):
+    hashes = set()
+    for s in sentences:
+        hashes.add(get_robust_hash(s))
+    return hashes
+
+
+def add_to_hash_set64(sentences):
+    hashes = HashSet64()
+    for s in sentences:
+        hashes.add(get_robust_hash64(s))
+    return hashes
+
+
+def main(arguments: list):
+    args = parse_arguments(arguments)
+    sentences = [sentence(i) for i in range(args.sentences)]
+    print("hash set\tsentences\tbytes/sentence\tpeak bytes/sentence\tseconds")
+    for name, add in [("set[str]", add_to_set), ("HashSet64", add_to_hash_set64)]:
+        start = time.perf_counter()
+        hashes = add(sentences)
+        elapsed = time.perf_counter() - start
+        assert len(hashes) == len(sentences)
+        del hashes
+        tracemalloc.start()
+        hashes = add(sentences)
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del hashes
+        n = len(sentences)
+        print(f"{name}\t{n}\t{size / n:.1f}\t{peak / n:.1f}\t{elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+"""Memory and time of the sentence index of `compute_stats`.
+
+Adds synthetic (corpus file id, sentence id) pairs to the set of string
+tuples used before and to the `SentenceIndex` bitmap, one by one and as
+arrays, probes every pair, and reports the memory per sentence (traced by `tracemalloc`) and the wall
+time of adding and probing without tracing, e.g.:
+
+    PYTHONPATH=. python benchmarks/sentence_index.py --documents 100000
+"""
+
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+import numpy as np
+
+from wordprofile.wpse.processing import SentenceIndex
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--documents", type=int, default=100_000, help="number of corpus files"
+    )
+    parser.add_argument(
+        "--sentences", type=int, default=50, help="sentences per corpus file"
+    )
+    return parser.parse_args(args)
+
+
+def build_set(pairs):
+    index = set()
+    for doc_id, sent_id in pairs:
+        index.add((str(doc_id), str(sent_id)))
+    return index
+
+
+def probe_set(index, pairs):
+    return sum((str(doc_id), str(sent_id)) in index for doc_id, sent_id in pairs)
+
+
+def build_sentence_index(pairs):
+    index = SentenceIndex()
+    for doc_id, sent_id in pairs:
+        index.add(doc_id, sent_id)
+    len(index)
+    return index
+
+
+def probe_sentence_index(index, pairs):
+    return sum(index.contains(doc_id, sent_id) for doc_id, sent_id in pairs)
+
+
+def build_sentence_index_many(pairs):
+    index = SentenceIndex()
+    index.add_many(*np.array(pairs, dtype=np.int64).T)
+    len(index)
+    return index
+
+
+def probe_sentence_index_many(index, pairs):
+    return int(np.count_nonzero(index.contains_many(*np.array(pairs).T)))
+
+
+def main(arguments: list):
+    args = parse_arguments(arguments)
+    pairs = [(d, s) for d in range(args.documents) for s in range(args.sentences)]
+    print("index\tsentences\tbytes/sentence\tadd seconds\tprobe seconds")
+    for name, build, probe in [
+        ("set[tuple[str, str]]", build_set, probe_set),
+        ("SentenceIndex", build_sentence_index, probe_sentence_index),
+        ("SentenceIndex, arrays", build_sentence_index_many, probe_sentence_index_many),
+    ]:
+        start = time.perf_counter()
+        index = build(pairs)
+        added = time.perf_counter() - start
+        start = time.perf_counter()
+        assert probe(index, pairs) == len(pairs)
+        probed = time.perf_counter() - start
+        del index
+        tracemalloc.start()
+        index = build(pairs)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del index
+        n = len(pairs)
+        print(f"{name}\t{n}\t{size / n:.1f}\t{added:.2f}\t{probed:.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
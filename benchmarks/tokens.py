@@ -0,0 +1,115 @@
+"""Memory footprint of the token representation.
+
+Parses a corpus with the streaming reader, keeps all sentences in memory, and
+reports the allocated bytes and memory blocks per token (tracemalloc) and the
+peak RSS of the process. `WPToken` (slots, shared tag, relation and lemma
+strings) is compared with the previous representation (dataclass with
+instance dict, separate strings per token), e.g.:
+
+    PYTHONPATH=. python benchmarks/tokens.py --input corpus.conll.gz --copies 10
+"""
+
+import gzip
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from wordprofile.datatypes import WPToken
+from wordprofile.wpse.conllu_reader import parse_documents
+
+
+@dataclass
+class DictToken:
+    idx: int
+    surface: str
+    lemma: str
+    tag: str
+    head: int
+    rel: str
+    misc: bool
+    morph: Optional[dict[str, str]] = None
+    prt_pos: Optional[int] = None
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--input",
+        default=os.path.join("tests", "testdata", "data.anno.conll.gz"),
+        help="(gzip compressed) conll input file",
+    )
+    parser.add_argument(
+        "--copies", type=int, default=100, help="number of passes over the input"
+    )
+    return parser.parse_args(args)
+
+
+def copy_str(s: str) -> str:
+    return s.encode().decode()
+
+
+def to_dict_token(token: WPToken) -> DictToken:
+    return DictToken(
+        token.idx,
+        copy_str(token.surface),
+        copy_str(token.lemma),
+        copy_str(token.tag),
+        token.head,
+        copy_str(token.rel),
+        token.misc,
+        token.morph,
+        token.prt_pos,
+    )
+
+
+def load(data: str, copies: int, representation: str) -> list:
+    sentences = []
+    for _ in range(copies):
+        for doc in parse_documents(io.StringIO(data)):
+            for sent in doc.sentences:
+                if representation == "dict":
+                    sent = list(map(to_dict_token, sent))
+                sentences.append(sent)
+    return sentences
+
+
+def measure(
+    data: str, copies: int, representation: str
+) -> tuple[int, float, float, int]:
+    tracemalloc.start()
+    sentences = load(data, copies, representation)
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snapshot.statistics("filename")
+    n_bytes = sum(stat.size for stat in stats)
+    n_blocks = sum(stat.count for stat in stats)
+    n_tokens = sum(map(len, sentences))
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return n_tokens, n_bytes / n_tokens, n_blocks / n_tokens, max_rss
+
+
+def main(arguments: list):
+    args = parse_arguments(arguments)
+    with gzip.open(args.input, "rt", encoding="utf-8") as fh:
+        data = fh.read()
+    print("token\ttokens\tbytes/token\tblocks/token\tmax_rss_kb")
+    for representation in ["dict", "slots"]:
+        # a fresh process per representation for a meaningful peak RSS
+        with ProcessPoolExecutor(
+            1, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            n_tokens, n_bytes, n_blocks, max_rss = pool.submit(
+                measure, data, args.copies, representation
+            ).result()
+        print(f"{representation}\t{n_tokens}\t{n_bytes:.0f}\t{n_blocks:.1f}\t{max_rss}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,82 @@
+"""Cost of the token validation of matches (nanoseconds per match).
+
+Extracts the matches of a corpus sample once and validates the head and
+dependent of every match with the previous eager checks, the short-circuiting
+`is_valid_form` and the cached `is_valid_token`, e.g.:
+
+    PYTHONPATH=. python benchmarks/valid_tokens.py --input corpus.conll.gz
+"""
+
+import gzip
+import os
+import sys
+import time
+from argparse import ArgumentParser
+
+import wordprofile.sentence_filter as sf
+from wordprofile.extract import extract_matches
+from wordprofile.wpse.conllu_reader import parse_documents
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--input",
+        default=os.path.join("tests", "testdata", "data.anno.conll.gz"),
+        help="(gzip compressed) conll input file",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=200, help="number of passes over the matches"
+    )
+    return parser.parse_args(args)
+
+
+def is_valid_token_eager(tok):
+    """Previous implementation, all checks are evaluated."""
+    return not any(
+        [
+            len(tok.surface) < 2,
+            not tok.surface[0].isalpha(),
+            not tok.surface[-1].isalpha(),
+            any(c.isdigit() for c in tok.lemma),
+            any(c in "\"'@§!?;#*/&<>()_" for c in tok.surface),
+            any(c in "\"'@§!?;#*/&<>()_" for c in tok.lemma),
+            sf.RE_GK_NORM_ERROR.match(tok.lemma),
+        ]
+    )
+
+
+def is_valid_token_uncached(tok):
+    return sf.is_valid_form(tok.surface, tok.lemma)
+
+
+def main(arguments: list):
+    args = parse_arguments(arguments)
+    with gzip.open(args.input, "rt", encoding="utf-8") as fh:
+        matches = [
+            m
+            for doc in parse_documents(fh)
+            for m in extract_matches(list(filter(sf.sentence_is_valid, doc.sentences)))
+        ]
+    n_matches = len(matches) * args.repeat
+    print("validation\tmatches\tvalid\tseconds\tns/match")
+    for name, is_valid in [
+        ("eager", is_valid_token_eager),
+        ("short-circuit", is_valid_token_uncached),
+        ("cached", sf.is_valid_token),
+    ]:
+        sf._valid_forms.clear()
+        start = time.perf_counter()
+        n_valid = 0
+        for _ in range(args.repeat):
+            for m in matches:
+                n_valid += is_valid(m.head) and is_valid(m.dep)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name}\t{n_matches}\t{n_valid}\t{elapsed:.2f}\t"
+            f"{elapsed / n_matches * 1e9:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+"""Writes the golden matches of the extraction tests in `test_extract.py`.
+
+The matches are extracted by the implementation of the extraction before
+the single-pass extraction (commit `BASELINE`), which is checked out to a
+temporary git worktree and run in a separate process. The sentences are the
+sentences of the test corpora and the random sentences of the tests:
+
+    python -m tests.make_extract_golden
+"""
+
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BASELINE = "0c39c5d"
+GOLDEN = os.path.join(os.path.dirname(__file__), "testdata", "extract_golden.json.gz")
+
+
+def extract(sentences: list[list[list]]) -> list:
+    """Extracts the matches of each sentence with the `wordprofile` package
+    found first on the path. Runs with the baseline package as well."""
+    import wordprofile.extract as ex
+    from wordprofile.datatypes import WPToken
+
+    def encode(value):
+        if isinstance(value, WPToken):
+            return [getattr(value, field) for field in TOKEN_FIELDS]
+        return value
+
+    results = []
+    for tokens in sentences:
+        sentence = [WPToken(*token) for token in tokens]
+        try:
+            matches = list(ex.extract_matches([sentence]))
+        except Exception as e:
+            results.append(type(e).__name__)
+            continue
+        results.append([[encode(value) for value in match] for match in matches])
+    return results
+
+
+TOKEN_FIELDS = [
+    "idx", "surface", "lemma", "tag", "head", "rel", "misc", "morph", "prt_pos",
+]  # fmt: skip
+
+
+def encode_sentence(sentence) -> list[list]:
+    return [[getattr(token, field) for field in TOKEN_FIELDS] for token in sentence]
+
+
+def main():
+    from tests import test_extract
+
+    sentences = {
+        "files": {
+            fname: [encode_sentence(s) for s in test_extract.corpus_sentences(fname)]
+            for fname in test_extract.CORPORA
+        },
+        "random": [encode_sentence(s) for s in test_extract.random_sentences()],
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        worktree = os.path.join(tmpdir, "baseline")
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", worktree, BASELINE], check=True
+        )
+        try:
+            result = subprocess.run(
+                [sys.executable, __file__, "--extract"],
+                input=json.dumps(sentences),
+                capture_output=True,
+                text=True,
+                check=True,
+                env={**os.environ, "PYTHONPATH": worktree},
+            )
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", worktree], check=True
+            )
+    with gzip.open(GOLDEN, "wt", encoding="utf-8") as fh:
+        fh.write(result.stdout)
+
+
+def main_extract():
+    sentences = json.load(sys.stdin)
+    golden = {
+        "baseline": BASELINE,
+        "files": {
+            fname: extract(file_sentences)
+            for fname, file_sentences in sentences["files"].items()
+        },
+        "random": extract(sentences["random"]),
+    }
+    json.dump(golden, sys.stdout, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--extract"]:
+        main_extract()
+    else:
+        main()
@@ -0,0 +1,58 @@
+import gzip
+
+from wordprofile.block_gzip import (
+    INDEX_SUFFIX,
+    Block,
+    BlockWriter,
+    open_blocks,
+    read_index,
+    split_blocks,
+)
+
+DOCUMENTS = [
+    "# DDC:meta.file_ = a\n1\tEin\n\n2\tSatz\n\n",
+    "# DDC:meta.file_ = b\n1\tZwei\n\n",
+    "# DDC:meta.file_ = c\n1\tDrei\n\n2\tSätze\n\n3\tda\n\n",
+]
+
+
+def write_blocked(fname, block_size):
+    with BlockWriter(fname, block_size) as fh:
+        for document in DOCUMENTS:
+            fh.start_document()
+            fh.write(document)
+
+
+def test_blocks_hold_whole_documents(tmp_path):
+    fname = str(tmp_path / "corpus.conll.gz")
+    write_blocked(fname, len(DOCUMENTS[0]) + 1)
+    with gzip.open(fname, "rt") as fh:
+        assert fh.read() == "".join(DOCUMENTS)
+    blocks = read_index(fname)
+    assert [block.first_document for block in blocks] == [0, 2]
+    with open_blocks(fname, blocks[1:]) as fh:
+        assert fh.read() == DOCUMENTS[2]
+    with open_blocks(fname, blocks) as fh:
+        assert fh.read() == "".join(DOCUMENTS)
+
+
+def test_index_not_matching_the_file_is_ignored(tmp_path):
+    fname = str(tmp_path / "corpus.conll.gz")
+    write_blocked(fname, 1)
+    assert len(read_index(fname)) == 3
+    with gzip.open(fname, "wt") as fh:
+        fh.write("".join(DOCUMENTS))
+    assert read_index(fname) is None
+    write_blocked(fname, 1)
+    with gzip.open(fname, "wt") as fh:
+        fh.write("".join(DOCUMENTS))
+    # rewriting the file with blocks removes the stale index right away
+    BlockWriter(fname).fh.close()
+    assert not (tmp_path / ("corpus.conll.gz" + INDEX_SUFFIX)).exists()
+
+
+def test_split_blocks():
+    blocks = [Block(0, 10, 0), Block(10, 30, 1), Block(40, 10, 5), Block(50, 10, 6)]
+    assert split_blocks(blocks, 2) == [blocks[:2], blocks[2:]]
+    assert split_blocks(blocks, 1) == [blocks]
+    assert split_blocks(blocks, 8) == [[block] for block in blocks]
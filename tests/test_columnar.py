@@ -0,0 +1,88 @@
+import pytest
+
+from wordprofile.datatypes import DBConcordance
+from wordprofile.utils import open_file
+from wordprofile.wpse import columnar
+from wordprofile.wpse.processing import format_rows
+
+ROWS = [
+    ("ATTR", "Familienpolitik", "", 3, "doc1"),
+    ("ATTR", "modern", "Straße", 70000, "doc1"),
+    ("KON", "Familienpolitik", "modern", -2, "doc2"),
+    ("OBJ", "früh", "ATTR", 2**40, "doc2"),
+    ("ATTR", "modern", "", 0, "doc3"),
+]
+
+
+def write_table(path, rows, kinds="sssis", chunk_rows=2, batches=1):
+    with open(path, "wb") as fh:
+        writer = columnar.ColumnarWriter(fh, kinds, chunk_rows)
+        for batch in range(batches):
+            writer.put(rows[batch::batches])
+        writer.flush()
+
+
+def test_columnar_table_roundtrip(tmp_path):
+    write_table(tmp_path / "table", ROWS)
+    assert list(columnar.read_rows(tmp_path / "table")) == ROWS
+
+
+def test_columnar_chunks_are_dictionary_encoded_and_packed(tmp_path):
+    write_table(tmp_path / "table", ROWS[:2], chunk_rows=2)
+    chunks = columnar.read_chunks(tmp_path / "table")
+    chunk = next(chunks)
+    assert chunk.rows == 2
+    assert chunk.kinds == "sssis"
+    assert chunk.strings == ["ATTR", "Familienpolitik", "modern", "", "Straße", "doc1"]
+    assert [column.format for column in chunk.columns] == ["B", "B", "B", "I", "B"]
+    assert list(chunk.columns[1]) == [1, 2]
+    assert chunk.values(2) == ["", "Straße"]
+
+
+def test_columnar_tables_can_be_concatenated(tmp_path):
+    write_table(tmp_path / "first", ROWS[:3])
+    write_table(tmp_path / "second", ROWS[3:], chunk_rows=100)
+    with open(tmp_path / "table", "wb") as fh:
+        fh.write((tmp_path / "first").read_bytes())
+        fh.write((tmp_path / "second").read_bytes())
+    assert list(columnar.read_rows(tmp_path / "table")) == ROWS
+
+
+def test_columnar_empty_table(tmp_path):
+    (tmp_path / "table").touch()
+    assert not columnar.is_columnar(tmp_path / "table")
+    assert list(columnar.read_rows(tmp_path / "table")) == []
+
+
+def test_columnar_invalid_table(tmp_path):
+    (tmp_path / "table").write_text("ATTR\tmodern\n")
+    assert not columnar.is_columnar(tmp_path / "table")
+    with pytest.raises(ValueError):
+        list(columnar.read_rows(tmp_path / "table"))
+
+
+def test_columnar_converts_to_tsv(tmp_path):
+    concordances = [
+        DBConcordance("doc1", 1, "Das\x01ist\x01gut\x02."),
+        DBConcordance("doc1", 2, "Heute\x01nicht"),
+    ]
+    write_table(tmp_path / "table", concordances, kinds="sis")
+    columnar.convert_to_tsv(tmp_path / "table", tmp_path / "table.tsv")
+    assert (tmp_path / "table.tsv").read_text() == "".join(format_rows(concordances))
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".zst"])
+def test_columnar_compressed_table(tmp_path, suffix):
+    if suffix == ".zst":
+        pytest.importorskip("zstandard")
+    fname = tmp_path / f"table{suffix}"
+    with open_file(fname, "wb") as fh:
+        writer = columnar.ColumnarWriter(fh, "sssis", chunk_rows=2)
+        writer.put(ROWS[:3])
+        writer.flush()
+    with open_file(fname, "ab") as fh:
+        writer = columnar.ColumnarWriter(fh, "sssis", chunk_rows=2)
+        writer.put(ROWS[3:])
+        writer.flush()
+    assert columnar.is_columnar(fname)
+    assert list(columnar.read_rows(fname)) == ROWS
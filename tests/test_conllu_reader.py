@@ -0,0 +1,110 @@
+import gzip
+import pathlib
+
+import conllu
+import pytest
+
+import wordprofile.wpse.conllu_reader as cr
+from wordprofile.datatypes import WPToken
+from wordprofile.utils import BoundedCache
+from wordprofile.wpse.processing import convert_sentence
+
+TESTDATA_DIR = pathlib.Path(__file__).parent / "testdata"
+
+
+def open_conll(path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def read_documents_with_conllu(path):
+    docs = []
+    with open_conll(path) as fh:
+        for sent in conllu.parse_incr(fh, fields=conllu.parser.DEFAULT_FIELDS):
+            if "DDC:meta.file_" in sent.metadata or not docs:
+                docs.append((dict(sent.metadata), []))
+            docs[-1][1].append(convert_sentence(sent))
+    return docs
+
+
+@pytest.mark.parametrize(
+    "fname",
+    [
+        "data.anno.conll.gz",
+        "process_data.conll.gz",
+        "corpus/file1.conll.gz",
+        "four_docs.conll",
+        "phrasal_verbs.conll",
+        "short.conll",
+        "sample.conllu",
+    ],
+)
+def test_streaming_reader_parity_with_conllu(fname):
+    path = TESTDATA_DIR / fname
+    expected = read_documents_with_conllu(path)
+    with open_conll(path) as fh:
+        result = [(doc.meta, doc.sentences) for doc in cr.parse_documents(fh)]
+    assert result == expected
+
+
+def test_documents_split_at_file_meta():
+    with open_conll(TESTDATA_DIR / "four_docs.conll") as fh:
+        docs = list(cr.parse_documents(fh))
+    assert len(docs) == 4
+    assert all("DDC:meta.file_" in doc.meta for doc in docs)
+
+
+def test_parse_token_with_misc_annotations():
+    token = cr.parse_token(
+        "3\tfest\tfest\tADP\tPTKVZ\t_\t2\tcompound:prt\t_\tSpaceAfter=No"
+    )
+    assert token == WPToken(
+        idx=3,
+        surface="fest",
+        lemma="fest",
+        tag="ADP",
+        head=2,
+        rel="compound:prt",
+        misc=True,
+        morph=None,
+        prt_pos=None,
+    )
+    token = cr.parse_token(
+        "2\tnahm\tfestnehmen\tVERB\tVVFIN\tMood=Ind|Tense=Past\t0\tROOT\t_\t"
+        "compound:prt=3|NamedEntity=B-ORG"
+    )
+    assert token.tag == "PROPN"
+    assert token.prt_pos == "3"
+    assert token.morph == {"Mood": "Ind", "Tense": "Past"}
+
+
+def test_multiword_tokens_and_empty_nodes_skipped():
+    assert cr.parse_token("1-2\tzum\t_\t_\t_\t_\t_\t_\t_\t_") is None
+    assert cr.parse_token("1.1\tx\tx\tX\t_\t_\t_\t_\t_\t_") is None
+
+
+def test_comment_parsing():
+    meta = {}
+    cr.parse_comment("# DDC:meta.date_ = 2009-06-02", meta)
+    cr.parse_comment("# text = a = b", meta)
+    cr.parse_comment("# empty =", meta)
+    cr.parse_comment("# newdoc", meta)
+    assert meta == {"DDC:meta.date_": "2009-06-02", "text": "a = b", "newdoc": None}
+
+
+def test_token_strings_are_shared():
+    line = "1\tHäuser\tHaus\tNOUN\tNN\t_\t0\tROOT\t_\t_"
+    first, second = cr.parse_token(line), cr.parse_token(line)
+    assert first.lemma is second.lemma
+    assert first.tag is second.tag
+    assert first.rel is second.rel
+    assert not hasattr(first, "__dict__")
+
+
+def test_lemma_table_is_bounded(monkeypatch):
+    monkeypatch.setattr(cr, "_lemmas", BoundedCache(1))
+    assert cr.intern_lemma("Haus") == "Haus"
+    rare = "".join(["Dach", "boden"])
+    assert cr.intern_lemma(rare) is rare
+    assert cr._lemmas == {"Haus": "Haus"}
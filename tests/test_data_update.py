@@ -3,6 +3,7 @@ import os
 import tempfile
 
 import wordprofile.preprocessing.cli.data_update as du
+from wordprofile.block_gzip import read_index
 
 
 def test_current_basename_discovery():
@@ -74,3 +75,19 @@ def test_output_file_compressed():
         assert result == ["src/de1/DE1_0999_20090602"]
         with gzip.open(os.path.join(tmpdir, "tst.conll.gz"), "rt") as f:
             assert f.readline().startswith("# DDC:tokid")
+
+
+def test_output_file_block_compressed():
+    tp_path = os.path.join("tests", "testdata", "dump")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        du.convert_files(
+            "tst",
+            tmpdir,
+            tp_path,
+            [os.path.join("corpus-tabs.d", "sample.tabs")] * 2,
+            block_size=1,
+        )
+        fname = os.path.join(tmpdir, "tst.conll.gz")
+        assert [b.first_document for b in read_index(fname)] == [0, 1]
+        with gzip.open(fname, "rt") as f:
+            assert f.readline().startswith("# DDC:tokid")
@@ -0,0 +1,62 @@
+import multiprocessing
+
+from wordprofile.wpse.dedup import (
+    HashSet64,
+    SharedHashSet,
+    get_robust_hash,
+    get_robust_hash64,
+)
+
+
+def test_robust_hash_ignores_case_and_symbols():
+    assert get_robust_hash("Das\x01ist\x01gut\x02.") == get_robust_hash("dasistgut\n")
+    assert get_robust_hash64("Das ist gut.") == int(
+        get_robust_hash("dasistgut")[:16], 16
+    )
+    assert get_robust_hash64("1984") == get_robust_hash64("") != 0
+
+
+def test_shared_hash_set_reports_new_hashes():
+    hashes = SharedHashSet(4)
+    assert hashes.add_new([1, 2, 1]) == [True, True, False]
+    # colliding slots are probed linearly
+    assert hashes.add_new([2, 2 + 8, 2 + 16]) == [False, True, True]
+    assert len(hashes) == 4
+    assert hashes.is_full()
+    # beyond the capacity, hashes are not stored anymore
+    assert hashes.add_new([3, 3, 10]) == [True, True, False]
+    assert len(hashes) == 4
+
+
+def add_hashes(hashes, values, results):
+    results.put(hashes.add_new(values))
+
+
+def test_shared_hash_set_is_shared_between_processes():
+    hashes = SharedHashSet(100)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=add_hashes, args=(hashes, range(1, 51), results))
+        for _ in range(4)
+    ]
+    for p in processes:
+        p.start()
+    new = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    assert sum(sum(is_new) for is_new in new) == 50
+    assert len(hashes) == 50
+
+
+def test_hash_set64_grows():
+    hashes = HashSet64(size_hint=2)
+    assert len(hashes.slots) == 4
+    assert [hashes.add(h) for h in [5, 1, 5, 9, 13]] == [True, True, False, True, True]
+    assert len(hashes) == 4
+    assert len(hashes.slots) == 8
+    assert all(h in hashes for h in [1, 5, 9, 13])
+    assert 2 not in hashes
+    added = [hashes.add(h) for h in range(1, 100)]
+    assert sum(added) == 99 - 4
+    assert len(hashes) == 99
+    assert len(hashes) <= HashSet64.MAX_LOAD * len(hashes.slots)
@@ -1,7 +1,14 @@
+import gzip
+import json
+import pathlib
+import random
+
 import pytest
 
 import wordprofile.extract as ex
+from tests.make_extract_golden import GOLDEN, encode_sentence, extract
 from wordprofile.datatypes import DependencyTree, Match, WPToken
+from wordprofile.wpse.conllu_reader import parse_documents
 
 
 @pytest.fixture
@@ -4683,3 +4690,132 @@ def test_ignore_unwanted_pos_in_predicative_copula_constructions():
     ]
     result = list(ex.extract_predicatives(DependencyTree(sentence), 1))
     assert result == []
+
+
+CORPORA = [
+    "data.anno.conll.gz",
+    "process_data.conll.gz",
+    "four_docs.conll",
+    "phrasal_verbs.conll",
+    "short.conll",
+    "sample.conllu",
+]
+
+
+def corpus_sentences(fname):
+    path = pathlib.Path(__file__).parent / "testdata" / fname
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as fh:
+        return [s for document in parse_documents(fh) for s in document.sentences]
+
+
+@pytest.fixture(scope="module")
+def golden_matches():
+    """Matches of the extraction before the single-pass extraction, see
+    `make_extract_golden.py`."""
+    with gzip.open(GOLDEN, "rt", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+@pytest.mark.parametrize("fname", CORPORA)
+def test_single_pass_extraction_matches_golden_matches(fname, golden_matches):
+    sentences = [encode_sentence(s) for s in corpus_sentences(fname)]
+    assert sentences
+    assert extract(sentences) == golden_matches["files"][fname]
+
+
+RANDOM_REL_TAGS = {
+    "ROOT": ["VERB", "NOUN", "ADJ"],
+    "obj": ["NOUN", "ADJ"],
+    "obl": ["NOUN", "ADJ", "ADV"],
+    "obl:arg": ["NOUN"],
+    "iobj": ["NOUN"],
+    "nmod": ["NOUN"],
+    "nsubj": ["NOUN", "ADJ"],
+    "nsubj:pass": ["NOUN"],
+    "case": ["ADP", "CCONJ"],
+    "mark": ["SCONJ", "CCONJ"],
+    "cc": ["CCONJ"],
+    "conj": ["NOUN", "VERB", "ADJ"],
+    "cop": ["AUX"],
+    "aux:pass": ["AUX"],
+    "aux": ["AUX"],
+    "amod": ["ADJ"],
+    "advmod": ["ADV", "ADJ"],
+    "advcl": ["ADJ", "VERB"],
+    "xcomp": ["ADJ", "VERB", "NOUN"],
+    "det": ["DET"],
+}
+RANDOM_LEMMAS = [
+    "als", "wie", "für", "werden", "sein", "bleiben", "lassen", "aussehen",
+    "halten", "ansehen", "finden", "mehr", "Haus",
+]  # fmt: skip
+RANDOM_MORPHS = [
+    None, {"Case": "Gen"}, {"Case": "Dat"}, {"Case": "Acc"},
+    {"VerbForm": "Fin"}, {"VerbForm": "Part"},
+]  # fmt: skip
+
+
+def random_sentence(rng):
+    n = rng.randint(1, 8)
+    root = rng.randint(1, n)
+    tokens = []
+    for idx in range(1, n + 1):
+        rel = "ROOT" if idx == root else rng.choice(list(RANDOM_REL_TAGS)[1:])
+        lemma = rng.choice(RANDOM_LEMMAS)
+        tokens.append(
+            WPToken(
+                idx=idx,
+                surface=rng.choice([lemma, lemma, "wie", "mehr"]),
+                lemma=lemma,
+                tag=rng.choice(RANDOM_REL_TAGS[rel]),
+                head=0 if idx == root else rng.choice([root, rng.randint(1, n)]),
+                rel=rel,
+                misc=False,
+                morph=rng.choice(RANDOM_MORPHS),
+            )
+        )
+    return tokens
+
+
+def random_sentences():
+    rng = random.Random(13)
+    return [random_sentence(rng) for _ in range(30000)]
+
+
+def test_single_pass_extraction_matches_golden_matches_on_random_sentences(
+    golden_matches,
+):
+    sentences = [encode_sentence(s) for s in random_sentences()]
+    result = extract(sentences)
+    assert result == golden_matches["random"]
+    relations = {match[3] for matches in result for match in matches}
+    assert relations == {r.name for r in ex.relation_types}
+
+
+def test_dependency_tree():
+    tokens = [
+        WPToken(1, "Das", "die", "DET", 2, "det", False),
+        WPToken(2, "Haus", "Haus", "NOUN", 3, "nsubj", False),
+        WPToken(3, "steht", "stehen", "VERB", 0, "ROOT", False),
+        WPToken(4, "dort", "dort", "ADV", 3, "advmod", False),
+        WPToken(5, ".", ".", "PUNCT", 3, "punct", False),
+    ]
+    dtree = DependencyTree(tokens)
+    assert len(dtree) == 5
+    assert dtree.root == 2
+    assert [dtree.parent(i) for i in range(5)] == [1, 2, None, 2, 2]
+    assert [dtree.children(i) for i in range(5)] == [[], [0], [1, 3, 4], [], []]
+    assert dtree.child_offsets == [0, 0, 1, 4, 4, 4]
+    assert dtree.by_rel == {
+        (1, "det"): [0],
+        (2, "nsubj"): [1],
+        (2, "advmod"): [3],
+        (2, "punct"): [4],
+    }
+    assert dtree.has_children(2) and not dtree.has_children(3)
+
+
+def test_passive_subject_at_root_is_ignored():
+    sentence = [WPToken(1, "Haus", "Haus", "NOUN", 0, "nsubj:pass", False)]
+    assert list(ex.extract_passive_subjects(DependencyTree(sentence), 1)) == []
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+import wordprofile.preprocessing.cli.data_update as du
+import wordprofile.preprocessing.cli.pipeline as pl
+import wordprofile.wpse.processing as pro
+from wordprofile.utils import open_file
+
+TABS_DUMP = os.path.join("tests", "testdata", "dump")
+FILES = [os.path.join("corpus-tabs.d", "sample.tabs")]
+
+
+def copy_stage(in_fd, fd, fast, gpu, batch_size, audit_file):
+    """Annotation stage passing the converted data through."""
+    outputs = pl.open_outputs(fd, audit_file)
+    with os.fdopen(in_fd) as f:
+        text = f.read()
+    for fh in outputs:
+        fh.write(text)
+        fh.close()
+
+
+def read_table(path):
+    lines = []
+    for fname in pro.table_files(str(path)):
+        with open_file(fname) as fh:
+            lines.extend(fh.readlines())
+    return sorted(lines)
+
+
+def test_pipeline_matches_separate_steps(tmp_path, monkeypatch):
+    monkeypatch.setattr(pl, "annotate_stage", copy_stage)
+    for name in ["steps", "pipeline"]:
+        (tmp_path / name).mkdir()
+    du.convert_files("tst", str(tmp_path / "steps"), TABS_DUMP, FILES)
+    pro.process_files(
+        [str(tmp_path / "steps" / "tst.conll.gz")], str(tmp_path / "steps"), njobs=2
+    )
+    basenames = pl.run_pipeline(
+        TABS_DUMP,
+        FILES,
+        str(tmp_path / "pipeline"),
+        "tst",
+        annotated_file=str(tmp_path / "tst.anno.conll.gz"),
+        njobs=2,
+    )
+    assert basenames == ["src/de1/DE1_0999_20090602"]
+    assert (tmp_path / "pipeline" / "tst.toc").read_text() == basenames[0] + "\n"
+    with open_file(tmp_path / "steps" / "tst.conll.gz") as fh:
+        converted = fh.read()
+    with open_file(tmp_path / "tst.anno.conll.gz") as fh:
+        assert fh.read() == converted
+    for table in ["concord_sentences", "matches", "collocations", "lemma_freqs"]:
+        assert read_table(tmp_path / "pipeline" / table) == read_table(
+            tmp_path / "steps" / table
+        )
+
+
+def test_pipeline_fails_with_failing_stage(tmp_path, monkeypatch):
+    def crash(*args):
+        raise RuntimeError
+
+    monkeypatch.setattr(pl, "annotate_stage", crash)
+    with pytest.raises(RuntimeError, match="Annotation failed"):
+        pl.run_pipeline(TABS_DUMP, FILES, str(tmp_path), "tst")
+    assert not (tmp_path / "tst.toc").exists()
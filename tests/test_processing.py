@@ -1,16 +1,25 @@
+import contextlib
 import gzip
 import io
+import json
+import math
 import multiprocessing as mp
+import os
 import pathlib
 import tempfile
 from collections import defaultdict
 
 import conllu
+import numpy as np
 import pytest
 from conllu.models import Token, TokenList
 
 import wordprofile.wpse.processing as pro
+from wordprofile.block_gzip import BlockWriter, read_index
 from wordprofile.datatypes import Colloc, CollocInstance, DBMatch, WPToken
+from wordprofile.utils import COMPRESSION_SUFFIXES, compressed_name, open_file
+from wordprofile.wpse.conllu_reader import parse_documents
+from wordprofile.wpse.dedup import get_robust_hash
 
 
 class MockQueue:
@@ -328,6 +337,12 @@ def test_file_reader_multiple_files(testdata_dir):
     }
 
 
+def test_file_reader_uncompressed_file(testdata_dir):
+    file_reader = pro.FileReader([testdata_dir / "four_docs.conll"], MockQueue())
+    file_reader.run()
+    assert len(file_reader.doc_order[0]) == 4
+
+
 def test_file_reader_with_std_input(monkeypatch, testdata_dir):
     with gzip.open(testdata_dir / "corpus" / "file1.conll.gz", "rt") as fh:
         data = io.StringIO()
@@ -459,10 +474,12 @@ def test_sentence_conversion_token_only_contains_invalid_chars():
 def test_inverse_attribute_written_to_mwe_file():
     mwe_freqs = {1: 1}
     mwe_ids = {(11, 12, "label", "lemma", "tag", 0): 1}
-    collocs = {
-        11: Colloc(11, "", "", "", "", "", "_", 0, 1.0),
-        12: Colloc(12, "", "", "", "", "", "_", 0, 1.0),
-    }
+    collocs = pro.Collocations(
+        [
+            Colloc(11, "", "", "", "", "", "_", 0, 1.0),
+            Colloc(12, "", "", "", "", "", "_", 0, 1.0),
+        ]
+    )
     with tempfile.TemporaryDirectory() as tmpdir:
         file = pathlib.Path(tmpdir) / "file"
         pro.compute_mwe_scores(file, mwe_ids, mwe_freqs, collocs, min_freq=1)
@@ -499,6 +516,42 @@ def test_collocation_ids_start_at_one(testdata_dir):
     assert min(collocations.keys()) == 1
 
 
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_load_collocations_in_buckets_keeps_ids(tmp_path, compression):
+    rels = ["ATTR", "PP", "OBJA"]
+    fins = []
+    for i in range(3):
+        fins.append(tmp_path / f"collocations{i}")
+        with open(fins[-1], "w") as fh:
+            for j in range(200):
+                rel = rels[(i + j) % 3]
+                fh.write(
+                    f"{rel}\tlemma{j % 70}\tNOUN\tlemma{j % 11}\tADJ\t_\t{i + 1}\n"
+                )
+    expected = pro.load_collocations(fins, min_rel_freq=3)
+    assert pro.collocation_buckets(fins, max_memory=1000) > 1
+    (tmp_path / "tmp").mkdir()
+    result = pro.load_collocations(
+        fins,
+        min_rel_freq=3,
+        max_memory=1000,
+        tmp_dir=str(tmp_path / "tmp"),
+        compression=compression,
+    )
+    assert result == expected
+    assert not list((tmp_path / "tmp").iterdir())
+
+
+def test_collocation_buckets(tmp_path):
+    fin = tmp_path / "collocations"
+    fin.write_text("ATTR\tZeitung\tNOUN\tsüddeutsch\tADJ\t_\t10\n" * 10)
+    size = fin.stat().st_size * pro.COLLOCATION_MEMORY_FACTOR
+    assert pro.collocation_buckets([fin], None) == 1
+    assert pro.collocation_buckets([fin], size) == 1
+    assert pro.collocation_buckets([fin], size - 1) == 2
+    assert pro.collocation_buckets([fin], 1) == pro.MAX_COLLOCATION_BUCKETS
+
+
 def test_prt_position_of_phrasal_verb_stored_during_conll_conversion():
     token_list = TokenList(
         [
@@ -601,7 +654,7 @@ def test_aggregating_matches_with_extra_position(testdata_dir):
     colloc_files = list((testdata_dir / "freq_test").iterdir())
     collocations = pro.load_collocations(colloc_files, min_rel_freq=5)
     corpus_file_ids = {"doc1": 1}
-    sentence_ids = {("1", "3"), ("1", "4")}
+    sentence_ids = pro.SentenceIndex([(1, 3), (1, 4)])
     matches_dir = testdata_dir / "matches_agg"
     with tempfile.TemporaryDirectory() as tmpdir:
         output_file = pathlib.Path(tmpdir) / "file"
@@ -736,9 +789,11 @@ def test_morphological_features_parse_from_conll_file(conll_sentences):
 
 
 def test_inverse_of_objo_written_to_file():
-    collocations = {
-        1: Colloc(1, "OBJO", "beschuldigen", "Betrug", "VERB", "NOUN", "_", 0, 10.0),
-    }
+    collocations = pro.Collocations(
+        [
+            Colloc(1, "OBJO", "beschuldigen", "Betrug", "VERB", "NOUN", "_", 0, 10.0),
+        ]
+    )
     lemma_frequencies = {("beschuldigen", "VERB"): 10, ("Betrug", "NOUN"): 10}
     with tempfile.TemporaryDirectory() as tmpdir:
         file = pathlib.Path(tmpdir) / "file"
@@ -767,10 +822,12 @@ def test_mwe_filtered_for_min_freq():
         (13, 14, "label", "lemma", "tag", 0): 1,
         (15, 16, "label", "lemma", "tag", 0): 2,
     }
-    collocs = {
-        11: Colloc(11, "", "", "", "", "", "_", 0, 5.0),
-        12: Colloc(12, "", "", "", "", "", "_", 0, 5.0),
-    }
+    collocs = pro.Collocations(
+        [
+            Colloc(11, "", "", "", "", "", "_", 0, 5.0),
+            Colloc(12, "", "", "", "", "", "_", 0, 5.0),
+        ]
+    )
     with tempfile.TemporaryDirectory() as tmpdir:
         file = pathlib.Path(tmpdir) / "file"
         pro.compute_mwe_scores(file, mwe_ids, mwe_freqs, collocs, min_freq=4)
@@ -833,11 +890,13 @@ def test_mwe_scores_not_inflated_by_inverses_frequency():
         (12, 11, "label", "lemma", "tag", 1): 2,
         (11, 13, "label", "lemma2", "tag", 0): 3,
     }
-    collocs = {
-        11: Colloc(11, "", "", "", "", "", "_", 0, 45.0),
-        12: Colloc(12, "", "", "", "", "", "_", 0, 20.0),
-        13: Colloc(13, "", "", "", "", "", "_", 0, 25.0),
-    }
+    collocs = pro.Collocations(
+        [
+            Colloc(11, "", "", "", "", "", "_", 0, 45.0),
+            Colloc(12, "", "", "", "", "", "_", 0, 20.0),
+            Colloc(13, "", "", "", "", "", "_", 0, 25.0),
+        ]
+    )
     with tempfile.TemporaryDirectory() as tmpdir:
         file = pathlib.Path(tmpdir) / "file"
         pro.compute_mwe_scores(file, mwe_ids, mwe_freqs, collocs, min_freq=4)
@@ -885,12 +944,14 @@ def test_mwe_inverse_extraction(testdata_dir):
 
 
 def test_mwe_not_inverted_if_KON_relation(testdata_dir):
-    collocations = {
-        10: Colloc(10, "ADV", "verletzen", "tödlich", "VERB", "ADJ", "_", 0, 10.0),
-        11: Colloc(11, "KON", "rasen", "verletzen", "VERB", "VERB", "_", 0, 10.0),
-        12: Colloc(12, "KON", "Bau", "Sanierung", "NOUN", "NOUN", "_", 0, 10.0),
-        13: Colloc(13, "GMOD", "Sanierung", "Schule", "NOUN", "NOUN", "_", 0, 10.0),
-    }
+    collocations = pro.Collocations(
+        [
+            Colloc(10, "ADV", "verletzen", "tödlich", "VERB", "ADJ", "_", 0, 10.0),
+            Colloc(11, "KON", "rasen", "verletzen", "VERB", "VERB", "_", 0, 10.0),
+            Colloc(12, "KON", "Bau", "Sanierung", "NOUN", "NOUN", "_", 0, 10.0),
+            Colloc(13, "GMOD", "Sanierung", "Schule", "NOUN", "NOUN", "_", 0, 10.0),
+        ]
+    )
 
     matches_file = testdata_dir / "mwe_matches2"
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -954,11 +1015,13 @@ def test_extract_most_common_surface(testdata_dir):
 
 
 def test_pp_collocations_with_same_lemmas_and_different_prep_counted_separately():
-    collocations = {
-        1: Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
-        2: Colloc(2, "PP", "Buch", "Tisch", "NOUN", "NOUN", "neben", 0, 20.0),
-        3: Colloc(3, "PP", "Buch", "Tisch", "NOUN", "NOUN", "unter", 0, 30.0),
-    }
+    collocations = pro.Collocations(
+        [
+            Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
+            Colloc(2, "PP", "Buch", "Tisch", "NOUN", "NOUN", "neben", 0, 20.0),
+            Colloc(3, "PP", "Buch", "Tisch", "NOUN", "NOUN", "unter", 0, 30.0),
+        ]
+    )
     lemma_frequencies = {("Buch", "NOUN"): 60, ("Tisch", "NOUN"): 60}
     with tempfile.TemporaryDirectory() as tmpdir:
         file = pathlib.Path(tmpdir) / "file"
@@ -969,9 +1032,11 @@ def test_pp_collocations_with_same_lemmas_and_different_prep_counted_separately(
 
 
 def test_prepositions_written_to_file_with_collocation_scores():
-    collocations = {
-        1: Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
-    }
+    collocations = pro.Collocations(
+        [
+            Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
+        ]
+    )
     lemma_freqs = {("Buch", "NOUN"): 10, ("Tisch", "NOUN"): 10}
     with tempfile.TemporaryDirectory() as tmpdir:
         file = pathlib.Path(tmpdir) / "file"
@@ -1275,6 +1340,30 @@ def test_irrelevant_tags_discarded_for_lemma_count():
     }
 
 
+def test_lemma_counter_spills_sorted_runs(conll_sentences, tmp_path):
+    parses = [pro.convert_sentence(s) for s in conll_sentences]
+    expected = pro.LemmaCounter()
+    spilled = pro.LemmaCounter(str(tmp_path / "lemma_runs.0"), spill_limit=3)
+    rest = pro.LemmaCounter()
+    for counter in [spilled, spilled, rest]:
+        for parse in parses:
+            expected.count_token([parse])
+            counter.count_token([parse])
+    spilled.spill()
+    assert len(spilled.runs) > 1
+    assert not spilled.freqs
+    for run in spilled.runs:
+        lemmas = [lemma for lemma, _ in pro.read_run(run)]
+        assert lemmas == sorted(lemmas)
+    pro.save_lemma_counts_to_file([spilled, rest], str(tmp_path))
+    assert not list(tmp_path.glob("lemma_runs.*"))
+    with open(tmp_path / "lemma_freqs") as fh:
+        lines = fh.readlines()
+    assert lines == [
+        f"{lemma}\t{expected.freqs[lemma]}\n" for lemma in sorted(expected.freqs)
+    ]
+
+
 def test_lemma_counts_written_to_file():
     def fill_queue(shared_list):
         parses = [
@@ -1655,7 +1744,8 @@ def test_lemmata_filtered_for_min_frequency_in_token_stats(testdata_dir):
     ]
 
 
-def test_reindex_filter_concordances(testdata_dir):
+@pytest.mark.parametrize("hash_bits", pro.HASH_BITS)
+def test_reindex_filter_concordances(testdata_dir, hash_bits):
     input_files = [
         testdata_dir / "concord_sentences",
         testdata_dir / "concord_sentences2",
@@ -1668,6 +1758,7 @@ def test_reindex_filter_concordances(testdata_dir):
             directory / "output_file",
             file_ids,
             directory / "duplicates",
+            hash_bits,
         )
         with open(directory / "duplicates") as fh:
             duplicate_sents = fh.readlines()
@@ -1679,6 +1770,53 @@ def test_reindex_filter_concordances(testdata_dir):
     assert sents[0] == "1\t0\tsiebzig\x01siebzig\n"
 
 
+def test_reindex_concordances_rejects_hash_bits(tmp_path):
+    with pytest.raises(ValueError):
+        pro.reindex_concordances(
+            [], tmp_path / "out", {}, tmp_path / "duplicates", hash_bits=32
+        )
+
+
+def test_sentence_index():
+    index = pro.SentenceIndex([(2, 9), (0, 0), (2, 1), (2, 9)])
+    assert len(index) == 3
+    assert list(index) == [(0, 0), (2, 1), (2, 9)]
+    assert index.contains(2, 9) and index.contains(0, 0)
+    assert not index.contains(2, 8)
+    assert not index.contains(2, 100)
+    assert not index.contains(1, 0)
+    assert not index.contains(5, 0)
+    assert index.has_document(2)
+    assert not index.has_document(1)
+    assert not index.has_document(3)
+
+
+def test_sentence_index_update():
+    index = pro.SentenceIndex([(0, 1), (2, 3)])
+    index.update(pro.SentenceIndex([(2, 3), (2, 20), (1, 0), (4, 2)]))
+    assert len(index) == 5
+    assert list(index) == [(0, 1), (1, 0), (2, 3), (2, 20), (4, 2)]
+
+
+def test_sentence_index_vectorized():
+    index = pro.SentenceIndex([(0, 0)])
+    index.add_many(np.array([2, 2, 4]), np.array([1, 9, 0]))
+    assert len(index) == 4
+    found = index.contains_many(
+        np.array([0, 2, 2, 2, 1, 4, 5, -1]), np.array([0, 1, 2, 100, 0, 0, 0, 0])
+    )
+    assert found.tolist() == [True, True, False, False, False, True, False, False]
+    assert index.has_documents(np.array([0, 1, 2, 3, 4, 7])).tolist() == [
+        True,
+        False,
+        True,
+        False,
+        True,
+        False,
+    ]
+    assert not pro.SentenceIndex().contains_many(np.array([0]), np.array([0])).any()
+
+
 def test_reindex_corpus_files(testdata_dir):
     input_files = [testdata_dir / "cf1", testdata_dir / "cf2", testdata_dir / "cf3"]
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -1696,23 +1834,71 @@ def test_reindex_corpus_files(testdata_dir):
 
 
 def test_collocations_with_invalid_id_removed():
-    collocations = {
-        1: Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
-        2: Colloc(2, "PP", "Buch", "Boden", "NOUN", "NOUN", "neben", 0, 20.0),
-        3: Colloc(3, "PP", "Buch", "Regal", "NOUN", "NOUN", "unter", 0, 30.0),
-    }
+    collocations = pro.Collocations(
+        [
+            Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
+            Colloc(2, "PP", "Buch", "Boden", "NOUN", "NOUN", "neben", 0, 20.0),
+            Colloc(3, "PP", "Buch", "Regal", "NOUN", "NOUN", "unter", 0, 30.0),
+        ]
+    )
     invalid_ids = {1}
     filtered_collocs = pro.filter_invalid_collocations(collocations, invalid_ids)
     assert len(filtered_collocs) == 2
     assert 1 not in filtered_collocs
 
 
+def test_collocations_keep_coded_columns():
+    collocations = pro.Collocations(
+        [
+            Colloc(4, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10),
+            Colloc(7, "ATTR", "Tisch", "rund", "NOUN", "ADJ", "_", 0, 3),
+            Colloc(9, "PP", "Buch", "Buch", "NOUN", "NOUN", "auf", 0, 5),
+        ]
+    )
+    assert collocations.ids.tolist() == [4, 7, 9]
+    assert collocations.frequencies.tolist() == [10, 3, 5]
+    assert [collocations.labels[i] for i in collocations.label_ids] == [
+        "PP",
+        "ATTR",
+        "PP",
+    ]
+    lemmas = collocations.lemmas
+    assert [lemmas[i] for i in collocations.lemma1_ids] == [
+        ("Buch", "NOUN"),
+        ("Tisch", "NOUN"),
+        ("Buch", "NOUN"),
+    ]
+    assert [lemmas[i] for i in collocations.lemma2_ids] == [
+        ("Tisch", "NOUN"),
+        ("rund", "ADJ"),
+        ("Buch", "NOUN"),
+    ]
+    assert collocations.frequencies_by_id().tolist() == [0] * 4 + [10, 0, 0, 3, 0, 5]
+
+
+def test_filtered_collocations_keep_columns():
+    collocations = pro.Collocations(
+        [
+            Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10),
+            Colloc(2, "ATTR", "Tisch", "rund", "NOUN", "ADJ", "_", 0, 3),
+            Colloc(3, "PP", "Buch", "Regal", "NOUN", "NOUN", "unter", 0, 30),
+        ]
+    )
+    filtered = pro.filter_invalid_collocations(collocations, {2})
+    assert list(filtered) == [1, 3]
+    assert filtered.ids.tolist() == [1, 3]
+    assert filtered.frequencies.tolist() == [10, 30]
+    assert [filtered.lemmas[i][0] for i in filtered.lemma2_ids] == ["Tisch", "Regal"]
+
+
 def test_collocations_with_negative_logDice_not_written_to_file():
-    collocations = {
-        1: Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
-        2: Colloc(2, "PP", "Buch", "Boden", "NOUN", "NOUN", "neben", 0, 5.0),
-        3: Colloc(3, "PP", "Buch", "Regal", "NOUN", "NOUN", "unter", 0, 300.0),
-    }
+    collocations = pro.Collocations(
+        [
+            Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
+            Colloc(2, "PP", "Buch", "Boden", "NOUN", "NOUN", "neben", 0, 5.0),
+            Colloc(3, "PP", "Buch", "Regal", "NOUN", "NOUN", "unter", 0, 300.0),
+        ]
+    )
     lemma_freqs = {
         ("Buch", "NOUN"): 70000,
         ("Tisch", "NOUN"): 300000,
@@ -1727,12 +1913,43 @@ def test_collocations_with_negative_logDice_not_written_to_file():
     assert result == [3]
 
 
+def test_log_dice_of_columns_matches_formula():
+    pair_freqs = [0, 1, 10, 300, 7]
+    freqs1 = [0, 5, 10, 70000, 3]
+    freqs2 = [0, 5, 10, 330, 0]
+    result = pro.log_dice(
+        np.array(pair_freqs), np.array(freqs1), np.array(freqs2)
+    ).tolist()
+    expected = [
+        14 + math.log2(2 * max(1, f) / (max(1, f1) + max(1, f2)))
+        for f, f1, f2 in zip(pair_freqs, freqs1, freqs2)
+    ]
+    assert result == expected
+    assert result[2] == 14.0
+
+
+def test_collocation_frequencies_look_up_lemmas():
+    collocations = pro.Collocations(
+        [
+            Colloc(4, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10),
+            Colloc(7, "ATTR", "Tisch", "Buch", "NOUN", "NOUN", "_", 0, 3),
+        ]
+    )
+    lemma_freqs = {("Buch", "NOUN"): 60, ("Tisch", "NOUN"): 20}
+    pair_freqs, freqs1, freqs2 = pro.collocation_frequencies(collocations, lemma_freqs)
+    assert pair_freqs.tolist() == [10, 3]
+    assert freqs1.tolist() == [60, 20]
+    assert freqs2.tolist() == [20, 60]
+
+
 def test_ids_for_collocations_with_negative_logDice_returned():
-    collocations = {
-        1: Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
-        2: Colloc(2, "PP", "Buch", "Boden", "NOUN", "NOUN", "neben", 0, 5.0),
-        3: Colloc(3, "PP", "Buch", "Regal", "NOUN", "NOUN", "unter", 0, 300.0),
-    }
+    collocations = pro.Collocations(
+        [
+            Colloc(1, "PP", "Buch", "Tisch", "NOUN", "NOUN", "auf", 0, 10.0),
+            Colloc(2, "PP", "Buch", "Boden", "NOUN", "NOUN", "neben", 0, 5.0),
+            Colloc(3, "PP", "Buch", "Regal", "NOUN", "NOUN", "unter", 0, 300.0),
+        ]
+    )
     lemma_freqs = {
         ("Buch", "NOUN"): 70000,
         ("Tisch", "NOUN"): 300000,
@@ -1745,7 +1962,11 @@ def test_ids_for_collocations_with_negative_logDice_returned():
     assert invalid_ids == {1, 2}
 
 
-def test_match_processing_returns_index_of_valid_concordances(testdata_dir):
+@pytest.mark.parametrize("batch_rows", [1, pro.FILTER_BATCH_ROWS])
+def test_match_processing_returns_index_of_valid_concordances(
+    testdata_dir, monkeypatch, batch_rows
+):
+    monkeypatch.setattr(pro, "FILTER_BATCH_ROWS", batch_rows)
     collocations = {
         1: Colloc(
             id=1,
@@ -1760,7 +1981,7 @@ def test_match_processing_returns_index_of_valid_concordances(testdata_dir):
         )
     }
     corpus_file_ids = {"doc1": 1}
-    sentence_ids = {("1", "3"), ("1", "4")}
+    sentence_ids = pro.SentenceIndex([(1, 3), (1, 4)])
     matches_dir = testdata_dir / "matches_agg"
     with tempfile.TemporaryDirectory() as tmpdir:
         output_file = pathlib.Path(tmpdir) / "file"
@@ -1771,11 +1992,20 @@ def test_match_processing_returns_index_of_valid_concordances(testdata_dir):
             sentence_ids,
             collocations,
         )
-    assert result == {("1", "4")}
+    assert set(result) == {(1, 4)}
+
 
+def test_parse_ids():
+    assert pro.parse_ids(["0\t1", "12\t3"], 2).tolist() == [[0, 1], [12, 3]]
+    assert pro.parse_ids(["4", "0"]).tolist() == [[4], [0]]
+    with pytest.raises(ValueError):
+        pro.parse_ids(["0\t1", "x\t3"], 2)
 
-def test_invalid_concordances_removed():
-    valid_sentence_ids = {("0", "1"), ("0", "2"), ("2", "1")}
+
+@pytest.mark.parametrize("batch_rows", [1, pro.FILTER_BATCH_ROWS])
+def test_invalid_concordances_removed(monkeypatch, batch_rows):
+    monkeypatch.setattr(pro, "FILTER_BATCH_ROWS", batch_rows)
+    valid_sentence_ids = pro.SentenceIndex([(0, 1), (0, 2), (2, 1)])
     sentence_data = [
         (0, 1, "sent1"),
         (0, 2, "sent2"),
@@ -1797,8 +2027,10 @@ def test_invalid_concordances_removed():
         assert result == [["0", "1", "sent1"], ["0", "2", "sent2"], ["2", "1", "sent5"]]
 
 
-def test_unnecessary_corpus_files_removed():
-    valid_sentence_ids = {("0", "1"), ("1", "2"), ("4", "1")}
+@pytest.mark.parametrize("batch_rows", [1, pro.FILTER_BATCH_ROWS])
+def test_unnecessary_corpus_files_removed(monkeypatch, batch_rows):
+    monkeypatch.setattr(pro, "FILTER_BATCH_ROWS", batch_rows)
+    valid_sentence_ids = pro.SentenceIndex([(0, 1), (1, 2), (4, 1)])
     doc_data = [
         ("0", "corpus1", "file1", "bibl", "date", "corpus1"),
         ("1", "corpus1", "file2", "bibl", "date", "corpus1"),
@@ -1844,3 +2076,966 @@ def test_conversion_of_conll_token_with_empty_misc():
     result = pro.convert_sentence(sentence)
     assert result[0].misc is False
     assert result[0].prt_pos is None
+
+
+@pytest.mark.parametrize("transport", ["manager", "native"])
+def test_process_files_transports(testdata_dir, transport):
+    files = sorted((testdata_dir / "corpus").glob("*"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pro.process_files(files, tmpdir, njobs=2, transport=transport)
+        with open(pathlib.Path(tmpdir) / "corpus_files") as fh:
+            assert len(fh.readlines()) == 4
+        with open(pathlib.Path(tmpdir) / "concord_sentences") as fh:
+            assert {line.split("\t")[2] for line in fh} == {
+                "Damals\x02ging\x02eine\x02ganze\x02Epoche\x02zu\x02Ende\x02.\n",
+                "Eine\x02neue\x02Zeit\x02begann\x02.\n",
+                "Sehr\x02geehrter\x02Herr\x02Präsident\x02Palinkás\x01,\x02meine"
+                "\x02sehr\x02verehrten\x02Damen\x02und\x02Herren\x02,\n",
+            }
+        with open(pathlib.Path(tmpdir) / "matches") as fh:
+            assert len(fh.readlines()) == 11
+
+
+def test_process_files_unknown_transport(testdata_dir):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with pytest.raises(ValueError):
+            pro.process_files([], tmpdir, transport="carrier-pigeon")
+
+
+def read_table(path, ordered=False):
+    lines = []
+    for fname in pro.table_files(str(path)):
+        with open_file(fname) as fh:
+            lines.extend(fh.readlines())
+    return lines if ordered else sorted(lines)
+
+
+def test_process_files_sharded_output(testdata_dir):
+    files = sorted((testdata_dir / "corpus").glob("*"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        single_dir = pathlib.Path(tmpdir) / "single"
+        sharded_dir = pathlib.Path(tmpdir) / "sharded"
+        single_dir.mkdir()
+        sharded_dir.mkdir()
+        pro.process_files(files, str(single_dir), njobs=2)
+        pro.process_files(files, str(sharded_dir), njobs=2, sharded=True)
+        assert sorted(p.name for p in sharded_dir.iterdir()) == [
+            "collocations",
+            "common_surfaces",
+            "concord_sentences.0",
+            "concord_sentences.1",
+            "corpus_files",
+            "lemma_freqs",
+            "manifest.json",
+            "matches.0",
+            "matches.1",
+        ]
+        assert pro.table_files(str(sharded_dir / "corpus_files")) == [
+            str(sharded_dir / "corpus_files")
+        ]
+        for table in ["concord_sentences", "matches"]:
+            assert pro.table_files(str(sharded_dir / table)) == [
+                str(sharded_dir / f"{table}.0"),
+                str(sharded_dir / f"{table}.1"),
+            ]
+        for table in ["corpus_files", "concord_sentences", "matches"]:
+            assert read_table(sharded_dir / table, ordered=True) == read_table(
+                single_dir / table, ordered=True
+            )
+        for out_dir in [single_dir, sharded_dir]:
+            pro.extract_collocations(
+                str(out_dir / "matches"), str(out_dir / "collocations.rescan")
+            )
+            assert read_table(out_dir / "collocations.rescan") == read_table(
+                out_dir / "collocations"
+            )
+        assert read_table(sharded_dir / "collocations") == read_table(
+            single_dir / "collocations"
+        )
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_process_files_parallel_readers(testdata_dir, sharded):
+    files = sorted((testdata_dir / "corpus").glob("*"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        single_dir = pathlib.Path(tmpdir) / "single"
+        parallel_dir = pathlib.Path(tmpdir) / "parallel"
+        single_dir.mkdir()
+        parallel_dir.mkdir()
+        pro.process_files(files, str(single_dir), njobs=1)
+        pro.process_files(
+            files, str(parallel_dir), njobs=3, sharded=sharded, nreaders=2
+        )
+        for table in ["collocations", "lemma_freqs"]:
+            assert read_table(parallel_dir / table) == read_table(single_dir / table)
+        # rows are sorted by document, regardless of jobs and readers
+        for table in ["concord_sentences", "matches"]:
+            assert read_table(parallel_dir / table, ordered=True) == read_table(
+                single_dir / table, ordered=True
+            )
+        with open(single_dir / "corpus_files") as fh:
+            expected = fh.readlines()
+        with open(parallel_dir / "corpus_files") as fh:
+            assert fh.readlines() == expected
+
+
+@pytest.mark.parametrize("table_format", pro.TABLE_FORMATS)
+def test_sort_by_document(tmp_path, monkeypatch, table_format):
+    monkeypatch.setattr(pro, "SORT_RUN_ROWS", 2)
+    shards = [
+        str(tmp_path / "concord_sentences.0"),
+        str(tmp_path / "concord_sentences.1"),
+    ]
+    rows = [
+        [("b", 2, "b2"), ("a", 1, "a1"), ("b", 1, "b1")],
+        [("c", 1, "c1"), ("a", 2, "a2"), ("x", 1, "x1"), ("b", 1, "b1'")],
+    ]
+    for shard, shard_rows in zip(shards, rows):
+        with contextlib.closing(
+            pro.open_table_writer(shard, "concord_sentences", table_format)
+        ) as writer:
+            writer.put(shard_rows)
+    fouts = [str(tmp_path / "sorted.0"), str(tmp_path / "sorted.1")]
+    pro.sort_by_document(
+        shards, fouts, "concord_sentences", [["a", "b"], ["c"]], table_format
+    )
+    sorted_rows = [
+        [tuple(map(str, row)) for row in pro.read_table_rows(fout)] for fout in fouts
+    ]
+    assert sorted_rows == [
+        [("a", "1", "a1"), ("a", "2", "a2"), ("b", "1", "b1"), ("b", "1", "b1'")],
+        [("b", "2", "b2"), ("c", "1", "c1"), ("x", "1", "x1")],
+    ]
+
+
+def test_restore_document_order(tmp_path):
+    shards = [tmp_path / "corpus_files.0", tmp_path / "corpus_files.1"]
+    shards[0].write_text("c\tx\na\tx\n")
+    shards[1].write_text("b\tx\nunknown\tx\n")
+    pro.restore_document_order(
+        [str(p) for p in shards], str(tmp_path / "corpus_files"), [["a", "b"], ["c"]]
+    )
+    assert (tmp_path / "corpus_files").read_text() == ("a\tx\nb\tx\nc\tx\nunknown\tx\n")
+
+
+def test_journal_resumes_from_last_checkpoint(tmp_path):
+    journal = pro.Journal(str(tmp_path), 0)
+    journal.writers[2].put([("m", 1)])
+    journal.lemma_counter.freqs["Haus\tNOUN"] += 1
+    journal.record(pro.InputDocument("a.conll.gz", 0, "doc-0", []))
+    journal.checkpoint()
+    journal.writers[2].put([("m", 2)])
+    journal.lemma_counter.freqs["Baum\tNOUN"] += 1
+    journal.lemma_counter.spill()
+    journal.record(pro.InputDocument("a.conll.gz", 1, "doc-1", []))
+    journal.fh.flush()
+    journal.writers[2].fh.flush()
+    assert pro.read_journals(str(tmp_path), 1) == {"a.conll.gz": {0}}
+    resumed = pro.Journal(str(tmp_path), 0, resume=True)
+    assert (tmp_path / "matches.0.part").read_text() == "m\t1\n"
+    assert (tmp_path / "journal.0").read_text() == "a.conll.gz\t0\tdoc-0\n"
+    assert not resumed.lemma_counter.freqs
+    assert resumed.lemma_counter.runs == [str(tmp_path / "lemma_runs.0.0")]
+    assert dict(resumed.lemma_counter.counts()) == {"Haus\tNOUN": 1}
+    assert sorted(tmp_path.glob("lemma_runs.*")) == [tmp_path / "lemma_runs.0.0"]
+    resumed.close()
+    with pytest.raises(ValueError):
+        pro.read_journals(str(tmp_path), 0)
+
+
+def test_run_counter_merges_runs_of_equal_level(tmp_path):
+    counter = pro.RunCounter(str(tmp_path / "lemma_runs.0"))
+    for spill in range(7):
+        counter.freqs.update({f"lemma{spill}\tNOUN": 1, "Haus\tNOUN": 1})
+        counter.spill()
+        counter.remove_obsolete_runs()
+    assert counter.levels == [2, 1, 0]
+    assert sorted(map(str, tmp_path.glob("lemma_runs.*"))) == sorted(counter.runs)
+    counts = dict(counter.counts())
+    assert counts.pop("Haus\tNOUN") == 7
+    assert counts == {f"lemma{spill}\tNOUN": 1 for spill in range(7)}
+
+
+def test_journal_checkpoints_keep_counts_in_runs(tmp_path):
+    journal = pro.Journal(str(tmp_path), 0)
+    for doc in range(4):
+        journal.lemma_counter.freqs["Haus\tNOUN"] += 1
+        journal.record(pro.InputDocument("a.conll.gz", doc, f"doc-{doc}", []))
+        journal.checkpoint()
+    state = pro.read_state(str(tmp_path / "state.0"))
+    assert not state["lemma_counter"].freqs
+    assert state["lemma_counter"].runs == [str(tmp_path / "lemma_runs.0.6")]
+    assert list(tmp_path.glob("lemma_runs.*")) == [tmp_path / "lemma_runs.0.6"]
+    assert dict(state["lemma_counter"].counts()) == {"Haus\tNOUN": 4}
+    journal.close()
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_journal_resumes_compressed_shards(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    journal = pro.Journal(str(tmp_path), 0, compression=compression)
+    journal.writers[2].put([("m", 1)])
+    journal.record(pro.InputDocument("a.conll.gz", 0, "doc-0", []))
+    journal.checkpoint()
+    journal.writers[2].put([("m", 2)])
+    journal.writers[2].writer.flush()
+    part_file = journal.writers[2].part_file
+    assert part_file.endswith(f".part{COMPRESSION_SUFFIXES[compression]}")
+    resumed = pro.Journal(str(tmp_path), 0, resume=True, compression=compression)
+    resumed.writers[2].put([("m", 3)])
+    resumed.close()
+    with open_file(part_file) as fh:
+        assert fh.read() == "m\t1\nm\t3\n"
+
+
+@pytest.mark.parametrize("chunk_sentences", [0, 1])
+def test_process_files_resume(testdata_dir, monkeypatch, chunk_sentences):
+    files = [str(f) for f in sorted((testdata_dir / "corpus").glob("*"))]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fresh_dir = pathlib.Path(tmpdir) / "fresh"
+        resumed_dir = pathlib.Path(tmpdir) / "resumed"
+        fresh_dir.mkdir()
+        resumed_dir.mkdir()
+        pro.process_files(
+            files, str(fresh_dir), njobs=2, sharded=True, chunk_sentences=1
+        )
+        with monkeypatch.context() as m:
+
+            def crash(*args):
+                raise RuntimeError
+
+            m.setattr(pro, "finalize_shards", crash)
+            with pytest.raises(RuntimeError):
+                pro.process_files(
+                    files[:2],
+                    str(resumed_dir),
+                    njobs=2,
+                    sharded=True,
+                    chunk_sentences=chunk_sentences,
+                )
+        assert not (resumed_dir / "manifest.json").exists()
+        done = pro.read_journals(str(resumed_dir), 2)
+        assert set(done) == set(files[:2])
+        if not chunk_sentences:
+            assert sum(map(len, done.values())) == 2
+        with pytest.raises(ValueError):
+            pro.process_files(
+                files, str(resumed_dir), njobs=1, resume=True, sharded=True
+            )
+        pro.process_files(
+            files,
+            str(resumed_dir),
+            njobs=2,
+            sharded=True,
+            resume=True,
+            chunk_sentences=chunk_sentences,
+        )
+        assert sorted(p.name for p in resumed_dir.iterdir()) == sorted(
+            p.name for p in fresh_dir.iterdir()
+        )
+        for table in [
+            "corpus_files",
+            "concord_sentences",
+            "matches",
+            "collocations",
+            "common_surfaces",
+            "lemma_freqs",
+        ]:
+            assert read_table(resumed_dir / table) == read_table(fresh_dir / table)
+
+
+def crash_on_document(doc_id, marker=None):
+    """Returns a `prepare_corpus_file` exiting the process at the document,
+    once if a marker file is given."""
+    prepare_corpus_file = pro.prepare_corpus_file
+
+    def prepare(meta):
+        if meta.get("DDC:meta.file_") == doc_id and not (marker and marker.exists()):
+            if marker:
+                marker.touch()
+            os._exit(1)
+        return prepare_corpus_file(meta)
+
+    return prepare
+
+
+def write_documents(testdata_dir, path, n, block_size=0):
+    """Writes n copies of the test document with distinct ids, block-compressed
+    with `block_size` > 0."""
+    with gzip.open(testdata_dir / "data.anno.conll.gz", "rt") as fh:
+        document = fh.read().strip()
+    doc_id = "161207_SED_Podiumdiskussion"
+    with (
+        BlockWriter(str(path), block_size) if block_size else gzip.open(path, "wt")
+    ) as fh:
+        for i in range(n):
+            if block_size:
+                fh.start_document()
+            fh.write(document.replace(doc_id, f"{doc_id}-{i}") + "\n\n")
+    with gzip.open(path, "rt") as fh:
+        return [str(doc.meta["DDC:meta.file_"]) for doc in parse_documents(fh)]
+
+
+TABLES = [
+    "corpus_files",
+    "concord_sentences",
+    "matches",
+    "collocations",
+    "common_surfaces",
+    "lemma_freqs",
+]
+
+
+@pytest.mark.parametrize("batch_tokens", [0, 1000])
+def test_process_files_restarts_crashed_workers(
+    testdata_dir, tmp_path, monkeypatch, batch_tokens
+):
+    corpus = tmp_path / "corpus.conll.gz"
+    doc_id = write_documents(testdata_dir, corpus, 6)[-2]
+    (tmp_path / "fresh").mkdir()
+    (tmp_path / "restarted").mkdir()
+    pro.process_files([corpus], str(tmp_path / "fresh"), njobs=2, sharded=True)
+    monkeypatch.setattr(
+        pro, "prepare_corpus_file", crash_on_document(doc_id, tmp_path / "crashed")
+    )
+    pro.process_files(
+        [corpus],
+        str(tmp_path / "restarted"),
+        njobs=2,
+        sharded=True,
+        batch_tokens=batch_tokens,
+        max_restarts=1,
+    )
+    assert (tmp_path / "crashed").exists()
+    assert not (tmp_path / "restarted" / pro.FAILED_DOCUMENTS).exists()
+    for table in TABLES:
+        assert read_table(tmp_path / "restarted" / table) == read_table(
+            tmp_path / "fresh" / table
+        )
+
+
+@pytest.mark.parametrize("batch_tokens", [0, 1000])
+def test_process_files_gives_up_failing_documents(
+    testdata_dir, tmp_path, monkeypatch, batch_tokens
+):
+    corpus = tmp_path / "corpus.conll.gz"
+    doc_ids = write_documents(testdata_dir, corpus, 6)
+    (tmp_path / "colloc").mkdir()
+    monkeypatch.setattr(pro, "prepare_corpus_file", crash_on_document(doc_ids[1]))
+    pro.process_files(
+        [corpus],
+        str(tmp_path / "colloc"),
+        njobs=2,
+        sharded=True,
+        batch_tokens=batch_tokens,
+        max_restarts=3,
+    )
+    assert (tmp_path / "colloc" / pro.FAILED_DOCUMENTS).read_text() == (
+        f"{corpus}\t1\t{doc_ids[1]}\n"
+    )
+    corpus_files = [
+        line.split("\t")[0] for line in read_table(tmp_path / "colloc" / "corpus_files")
+    ]
+    assert sorted(corpus_files) == sorted(doc_ids[:1] + doc_ids[2:])
+
+
+@pytest.mark.parametrize("transport", pro.TRANSPORTS)
+@pytest.mark.parametrize("sharded", [False, True])
+def test_process_files_aborts_on_crashed_worker(
+    testdata_dir, tmp_path, monkeypatch, sharded, transport
+):
+    corpus = tmp_path / "corpus.conll.gz"
+    doc_id = write_documents(testdata_dir, corpus, 40)[0]
+    monkeypatch.setattr(pro, "prepare_corpus_file", crash_on_document(doc_id))
+    (tmp_path / "colloc").mkdir()
+    with pytest.raises(RuntimeError, match="died with exit code 1"):
+        pro.process_files(
+            [corpus],
+            str(tmp_path / "colloc"),
+            njobs=4,
+            sharded=sharded,
+            transport=transport,
+        )
+
+
+def test_process_files_restarts_require_shards(tmp_path):
+    with pytest.raises(ValueError):
+        pro.process_files([], str(tmp_path), max_restarts=1)
+    with pytest.raises(ValueError):
+        pro.process_files([], str(tmp_path), sharded=True, nreaders=2, max_restarts=1)
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_process_files_splits_block_compressed_files(testdata_dir, tmp_path, sharded):
+    blocked = tmp_path / "corpus.conll.gz"
+    write_documents(testdata_dir, blocked, 7, block_size=1)
+    write_documents(testdata_dir, tmp_path / "plain.conll.gz", 7)
+    assert len(read_index(str(blocked))) == 7
+    for name in ["single", "parallel"]:
+        (tmp_path / name).mkdir()
+    pro.process_files([str(tmp_path / "plain.conll.gz")], str(tmp_path / "single"))
+    pro.process_files(
+        [str(blocked)], str(tmp_path / "parallel"), njobs=2, sharded=sharded, nreaders=3
+    )
+    for table in TABLES:
+        assert read_table(tmp_path / "parallel" / table) == read_table(
+            tmp_path / "single" / table
+        )
+
+
+def test_block_ranges_are_journaled_by_document_position(
+    testdata_dir, tmp_path, monkeypatch
+):
+    blocked = tmp_path / "corpus.conll.gz"
+    write_documents(testdata_dir, blocked, 7, block_size=1)
+
+    def crash(*args):
+        raise RuntimeError
+
+    monkeypatch.setattr(pro, "finalize_shards", crash)
+    with pytest.raises(RuntimeError):
+        pro.process_files(
+            [str(blocked)], str(tmp_path), njobs=2, sharded=True, nreaders=3
+        )
+    done = pro.read_journals(str(tmp_path), 2)
+    assert sorted(done[str(blocked)]) == list(range(7))
+
+
+def test_process_files_resume_requires_shards(tmp_path):
+    with pytest.raises(ValueError):
+        pro.process_files([], str(tmp_path), resume=True)
+
+
+def read_queue(queue):
+    items = []
+    while (item := queue.get()) is not None:
+        items.append(item)
+    return items
+
+
+def test_file_reader_batches_documents_by_tokens(testdata_dir, tmp_path):
+    corpus = tmp_path / "corpus.conll.gz"
+    with gzip.open(corpus, "wt") as fo:
+        for _ in range(3):
+            for f in sorted((testdata_dir / "corpus").glob("*")):
+                with gzip.open(f, "rt") as fh:
+                    fo.write(fh.read().strip() + "\n\n")
+    file_reader = pro.FileReader([corpus], MockQueue())
+    file_reader.run()
+    documents = read_queue(file_reader.q)
+    file_reader = pro.FileReader([corpus], MockQueue(), batch_tokens=10)
+    file_reader.run()
+    batches = read_queue(file_reader.q)
+    assert all(isinstance(batch, pro.DocumentBatch) for batch in batches)
+    assert [doc for batch in batches for doc in batch.documents] == documents
+    assert [
+        [pro.count_document_tokens(doc) for doc in batch.documents] for batch in batches
+    ] == [[8, 2], [5, 13]] * 3
+    file_reader = pro.FileReader([corpus], MockQueue(), batch_tokens=1000)
+    file_reader.run()
+    assert read_queue(file_reader.q) == [pro.DocumentBatch(documents)]
+
+
+def test_process_doc_file_sends_batched_results(conll_sentences):
+    file_reader_queue = MockQueue()
+    file_reader_queue.put(conll_sentences)
+    single = [MockQueue(), MockQueue(), MockQueue()]
+    pro.process_doc_file(file_reader_queue, *single, [])
+    db_files, db_sents, db_matches = (q.get() for q in single)
+    file_reader_queue.put(pro.DocumentBatch([conll_sentences, conll_sentences]))
+    batched = [MockQueue(), MockQueue(), MockQueue()]
+    pro.process_doc_file(file_reader_queue, *batched, [])
+    assert [read_queue(q) for q in batched] == [
+        [db_files * 2],
+        [db_sents * 2],
+        [db_matches * 2],
+    ]
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_process_files_batched(testdata_dir, caplog, sharded):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        single_dir = pathlib.Path(tmpdir) / "single"
+        batched_dir = pathlib.Path(tmpdir) / "batched"
+        single_dir.mkdir()
+        batched_dir.mkdir()
+        pro.process_files(corpus, str(single_dir), njobs=2)
+        with caplog.at_level("INFO"):
+            pro.process_files(
+                corpus,
+                str(batched_dir),
+                njobs=2,
+                sharded=sharded,
+                batch_tokens=1000,
+                monitor_interval=0.01,
+            )
+        for table in [
+            "corpus_files",
+            "concord_sentences",
+            "matches",
+            "collocations",
+            "lemma_freqs",
+        ]:
+            assert read_table(batched_dir / table) == read_table(single_dir / table)
+        assert "QUEUE depths: reader=" in caplog.text
+
+
+@pytest.mark.parametrize("reader", pro.READERS)
+def test_file_reader_splits_large_documents(testdata_dir, reader):
+    corpus = testdata_dir / "data.anno.conll.gz"
+    file_reader = pro.FileReader([corpus], MockQueue(), reader="streaming")
+    file_reader.run()
+    documents = read_queue(file_reader.q)
+    file_reader = pro.FileReader([corpus], MockQueue(), reader, chunk_sentences=5)
+    file_reader.run()
+    items = read_queue(file_reader.q)
+    assert file_reader.doc_order == [[str(d.meta["DDC:meta.file_"]) for d in documents]]
+    assert any(isinstance(item, pro.DocumentChunk) for item in items)
+    chunks = iter(items)
+    for document in documents:
+        if len(document.sentences) <= 5:
+            assert pro.count_document_tokens(next(chunks)) == (
+                pro.count_document_tokens(document)
+            )
+            continue
+        sentences: list = []
+        while len(sentences) < len(document.sentences):
+            chunk = next(chunks)
+            assert chunk.meta["DDC:meta.file_"] == document.meta["DDC:meta.file_"]
+            assert chunk.index * 5 == len(sentences)
+            assert chunk.sentence_offset == sum(map(pro.sentence_is_valid, sentences))
+            assert len(chunk.sentences) <= 5
+            sentences.extend(chunk.sentences)
+        assert sentences == document.sentences
+    assert next(chunks, None) is None
+
+
+@pytest.mark.parametrize("reader", pro.READERS)
+@pytest.mark.parametrize("sharded", [False, True])
+def test_process_files_chunked_documents(testdata_dir, tmp_path, reader, sharded):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    (tmp_path / "single").mkdir()
+    (tmp_path / "chunked").mkdir()
+    pro.process_files(corpus, str(tmp_path / "single"), njobs=2)
+    pro.process_files(
+        corpus,
+        str(tmp_path / "chunked"),
+        njobs=3,
+        sharded=sharded,
+        reader=reader,
+        chunk_sentences=3,
+    )
+    for table in [
+        "corpus_files",
+        "concord_sentences",
+        "matches",
+        "collocations",
+        "common_surfaces",
+        "lemma_freqs",
+    ]:
+        assert read_table(tmp_path / "chunked" / table) == read_table(
+            tmp_path / "single" / table
+        )
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_process_files_writes_stats(testdata_dir, sharded):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stats_file = pathlib.Path(tmpdir) / "stats.jsonl"
+        pro.process_files(
+            corpus,
+            tmpdir,
+            njobs=2,
+            sharded=sharded,
+            monitor_interval=0.01,
+            stats_file=str(stats_file),
+        )
+        with open(stats_file) as fh:
+            stats = [json.loads(line) for line in fh]
+        sentences = len(read_table(pathlib.Path(tmpdir) / "concord_sentences"))
+        matches = len(read_table(pathlib.Path(tmpdir) / "matches"))
+    assert stats
+    final = stats[-1]
+    assert set(final["workers"]) == {"worker-0", "worker-1"}
+    workers = final["workers"].values()
+    assert sum(w["sentences"] - w["invalid_sentences"] for w in workers) == sentences
+    assert sum(w["matches"] for w in workers) == matches
+    assert all(0 <= w["invalid_share"] <= 1 for w in workers)
+    assert all(w["documents_per_s"] >= 0 for w in workers)
+    assert "reader" in final["queues"]
+    assert ("matches" in final["queues"]) != sharded
+    assert {"main", "worker-0", "worker-1"} <= set(final["rss"])
+    assert stats[0]["rss"]["main"] > 0
+
+
+def test_table_files_without_manifest(testdata_dir):
+    path = str(testdata_dir / "test_db" / "matches")
+    assert pro.table_files(path) == [path]
+
+
+def test_compute_stats_reads_sharded_extraction(testdata_dir):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = []
+        for sharded in [False, True]:
+            out_dir = pathlib.Path(tmpdir) / f"sharded-{sharded}"
+            colloc_dir = out_dir / "colloc"
+            stats_dir = out_dir / "stats"
+            colloc_dir.mkdir(parents=True)
+            stats_dir.mkdir()
+            pro.process_files(corpus, str(colloc_dir), njobs=3, sharded=sharded)
+            pro.compute_stats([str(colloc_dir)], str(stats_dir), min_freq=2)
+            with open(stats_dir / "collocations") as fh:
+                collocations = {tuple(line.split("\t")[1:]) for line in fh}
+            with open(stats_dir / "token_freqs") as fh:
+                token_freqs = set(fh.readlines())
+            with open(stats_dir / "matches") as fh:
+                matches = {tuple(line.split("\t")[2:7]) for line in fh}
+            results.append((collocations, token_freqs, matches))
+        assert results[0] == results[1]
+        assert results[0][0]
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_compute_stats_is_independent_of_njobs(testdata_dir, tmp_path, sharded):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    colloc_dir = tmp_path / "colloc"
+    colloc_dir.mkdir()
+    pro.process_files(corpus, str(colloc_dir), njobs=3, sharded=sharded)
+    outputs = []
+    for njobs in [1, 3]:
+        stats_dir = tmp_path / f"stats-{njobs}"
+        stats_dir.mkdir()
+        pro.compute_stats(
+            [str(colloc_dir)], str(stats_dir), min_freq=2, with_mwe=True, njobs=njobs
+        )
+        outputs.append(
+            {path.name: path.read_bytes() for path in sorted(stats_dir.iterdir())}
+        )
+    assert outputs[0] == outputs[1]
+    assert outputs[0]["matches"]
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 100])
+def test_table_ranges_split_whole_lines(tmp_path, n):
+    rows = [[str(i), "x" * (i % 5), "ü"] for i in range(20)]
+    fname = str(tmp_path / "matches")
+    with open(fname, "w") as fh:
+        fh.writelines("\t".join(row) + "\n" for row in rows)
+    ranges = pro.table_ranges(fname, n)
+    assert 1 <= len(ranges) <= n
+    assert [end for _, _, end in ranges[:-1]] == [start for _, start, _ in ranges[1:]]
+    result = [row for r in ranges for row in pro.read_table_rows(*r)]
+    assert result == rows
+    assert pro.table_ranges(fname + ".gz", n) == [(fname + ".gz", 0, None)]
+
+
+def test_queue_monitor_reports_current_processes():
+    class Process:
+        def __init__(self, pid):
+            self.pid = pid
+
+    workers = [Process(None)]
+    monitor = pro.QueueMonitor({}, 1, processes=lambda: {"worker-0": workers[0]})
+    assert monitor.stats()["rss"]["worker-0"] is None
+    # a restarted worker replaces the crashed one
+    workers[0] = Process(os.getpid())
+    assert monitor.stats()["rss"]["worker-0"] > 0
+
+
+def test_match_counter_aggregates_collocations_and_surfaces(conll_sentences):
+    file_reader_queue = MockQueue()
+    file_reader_queue.put(conll_sentences)
+    db_matches_queue = MockQueue()
+    match_counters = []
+    pro.process_doc_file(
+        file_reader_queue,
+        MockQueue(),
+        MockQueue(),
+        db_matches_queue,
+        [],
+        match_counters,
+    )
+    matches = db_matches_queue.get()
+    counter = match_counters[0]
+    assert sum(counter.collocations.freqs.values()) == len(matches) == 11
+    assert sum(counter.surfaces.freqs.values()) == 2 * len(matches)
+    assert counter.collocations.freqs["ADV\tgeehrt\tsehr\tADJ\tADV\t_"] == 1
+    assert counter.surfaces.freqs["ADV\tsehr\tSehr"] == 1
+
+
+def test_worker_ships_only_runs_of_spilled_counters(conll_sentences, tmp_path):
+    file_reader_queue = MockQueue()
+    file_reader_queue.put(conll_sentences)
+    lemma_counters, match_counters = [], []
+    pro.process_doc_file(
+        file_reader_queue,
+        MockQueue(),
+        MockQueue(),
+        MockQueue(),
+        lemma_counters,
+        match_counters,
+        counters=pro.shard_counters(str(tmp_path), 0),
+    )
+    counter = match_counters[0]
+    assert not lemma_counters[0].freqs
+    assert not counter.collocations.freqs and not counter.surfaces.freqs
+    assert lemma_counters[0].runs == [str(tmp_path / "lemma_runs.0.0")]
+    assert counter.collocations.runs == [str(tmp_path / "collocation_runs.0.0")]
+    assert counter.surfaces.runs == [str(tmp_path / "surface_runs.0.0")]
+    assert dict(counter.collocations.counts())["ADV\tgeehrt\tsehr\tADJ\tADV\t_"] == 1
+
+
+def test_most_common_surface_ties_resolve_to_first_in_sort_order(tmp_path):
+    counter = pro.MatchCounter()
+    counter.surfaces.freqs.update(
+        {"NOUN\tHaus\tHäuser": 2, "NOUN\tHaus\tHaus": 2, "NOUN\tHaus\tHAUS": 1}
+    )
+    pro.save_match_counts_to_file([counter], str(tmp_path))
+    assert (tmp_path / "common_surfaces").read_text() == "Haus\tNOUN\tHaus\t2\n"
+
+
+def test_match_counter_spills_sorted_runs(conll_sentences, tmp_path):
+    parses = [pro.convert_sentence(s) for s in conll_sentences]
+    matches = pro.prepare_matches("doc", pro.extract_matches_from_doc(parses))
+    expected = pro.MatchCounter()
+    spilled = pro.MatchCounter(
+        str(tmp_path / "collocation_runs.0"),
+        str(tmp_path / "surface_runs.0"),
+        spill_limit=3,
+    )
+    rest = pro.MatchCounter()
+    for counter in [expected, spilled, spilled, rest]:
+        for match in matches:
+            counter.count_matches([match])
+    spilled.spill()
+    assert len(spilled.collocations.runs) > 1
+    assert len(spilled.surfaces.runs) > 1
+    assert not spilled.collocations.freqs and not spilled.surfaces.freqs
+    for run in spilled.collocations.runs + spilled.surfaces.runs:
+        keys = [key for key, _ in pro.read_run(run)]
+        assert keys == sorted(keys)
+    (tmp_path / "expected").mkdir()
+    pro.save_match_counts_to_file([expected] * 3, str(tmp_path / "expected"))
+    pro.save_match_counts_to_file([spilled, rest], str(tmp_path))
+    assert not list(tmp_path.glob("*_runs.*"))
+    for table in ["collocations", "common_surfaces"]:
+        lines = (tmp_path / table).read_text().splitlines()
+        assert lines == (tmp_path / "expected" / table).read_text().splitlines()
+
+
+def test_process_files_writes_aggregated_matches(testdata_dir):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out_dir = pathlib.Path(tmpdir)
+        pro.process_files(corpus, tmpdir, njobs=3)
+        assert not list(out_dir.glob("*_runs.*"))
+        pro.extract_collocations(
+            str(out_dir / "matches"), str(out_dir / "collocations.rescan")
+        )
+        pro.extract_most_common_surface(
+            str(out_dir / "matches"), str(out_dir / "common_surfaces.rescan")
+        )
+        assert read_table(out_dir / "collocations") == read_table(
+            out_dir / "collocations.rescan"
+        )
+        with open(out_dir / "common_surfaces") as fh:
+            surfaces = {
+                tuple(line.split("\t")[:2] + line.split("\t")[3:]) for line in fh
+            }
+        with open(out_dir / "common_surfaces.rescan") as fh:
+            rescan = {tuple(line.split("\t")[:2] + line.split("\t")[3:]) for line in fh}
+        assert surfaces == rescan
+
+
+def test_file_reader_streaming_documents(testdata_dir):
+    conll_file = testdata_dir / "process_data.conll.gz"
+    file_reader = pro.FileReader([conll_file], MockQueue(), reader="streaming")
+    file_reader.run()
+    file_reader.stop(1)
+    doc = file_reader.q.get()
+    assert file_reader.q.get() is None
+    assert doc.meta["DDC:meta.collection"] == "politische_reden"
+    assert [len(sent) for sent in doc.sentences] == [13, 2, 8, 5]
+
+
+def test_process_files_streaming_reader(testdata_dir):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for reader in pro.READERS:
+            out_dir = pathlib.Path(tmpdir) / reader
+            out_dir.mkdir()
+            pro.process_files(corpus, str(out_dir), njobs=2, reader=reader)
+        for table in [
+            "corpus_files",
+            "concord_sentences",
+            "matches",
+            "lemma_freqs",
+            "collocations",
+        ]:
+            assert read_table(pathlib.Path(tmpdir) / "conllu" / table) == read_table(
+                pathlib.Path(tmpdir) / "streaming" / table
+            )
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_process_files_columnar_tables(testdata_dir, sharded):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = []
+        for table_format in pro.TABLE_FORMATS:
+            out_dir = pathlib.Path(tmpdir) / table_format
+            colloc_dir = out_dir / "colloc"
+            stats_dir = out_dir / "stats"
+            colloc_dir.mkdir(parents=True)
+            stats_dir.mkdir()
+            pro.process_files(
+                corpus,
+                str(colloc_dir),
+                njobs=1,
+                sharded=sharded,
+                table_format=table_format,
+            )
+            pro.compute_stats([str(colloc_dir)], str(stats_dir), min_freq=2)
+            results.append(
+                {
+                    table: (stats_dir / table).read_text()
+                    for table in ["corpus_files", "concord_sentences", "matches"]
+                }
+            )
+        assert results[0] == results[1]
+        assert results[0]["matches"]
+        columnar_dir = pathlib.Path(tmpdir) / "columnar" / "colloc"
+        assert pro.columnar.is_columnar(
+            pro.table_files(str(columnar_dir / "matches"))[0]
+        )
+        pro.convert_tables_to_tsv(str(columnar_dir), tmpdir)
+        for table in ["concord_sentences", "matches"]:
+            assert read_table(pathlib.Path(tmpdir) / table) == read_table(
+                pathlib.Path(tmpdir) / "tsv" / "colloc" / table
+            )
+
+
+def test_process_files_unknown_table_format(tmp_path):
+    with pytest.raises(ValueError):
+        pro.open_table_writer(str(tmp_path / "matches"), "matches", "xml")
+
+
+@pytest.mark.parametrize("table_format", pro.TABLE_FORMATS)
+@pytest.mark.parametrize("sharded", [False, True])
+def test_process_files_compressed_tables(testdata_dir, tmp_path, sharded, table_format):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    results = []
+    for compression in [None, "gzip"]:
+        colloc_dir = tmp_path / f"colloc-{compression}"
+        stats_dir = tmp_path / f"stats-{compression}"
+        colloc_dir.mkdir()
+        stats_dir.mkdir()
+        pro.process_files(
+            corpus,
+            str(colloc_dir),
+            njobs=1,
+            sharded=sharded,
+            table_format=table_format,
+            compression=compression,
+        )
+        pro.compute_stats(
+            [str(colloc_dir)],
+            str(stats_dir),
+            min_freq=2,
+            with_mwe=True,
+            compression=compression,
+        )
+        results.append(
+            {
+                table: (stats_dir / table).read_text()
+                for table in ["concord_sentences", "matches", "mwe", "mwe_match"]
+            }
+        )
+    assert results[0] == results[1]
+    assert results[0]["mwe_match"]
+    matches_files = pro.table_files(str(tmp_path / "colloc-gzip" / "matches"))
+    assert all(fname.endswith(".gz") for fname in matches_files)
+    uncompressed = {p.name for p in (tmp_path / "stats-None").iterdir()}
+    compressed = {p.name for p in (tmp_path / "stats-gzip").iterdir()}
+    assert compressed ^ uncompressed == {
+        "concord_sentences.duplicate",
+        "concord_sentences.duplicate.gz",
+    }
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_open_file_writes_utf8(tmp_path, compression):
+    fname = tmp_path / compressed_name("table", compression)
+    with open_file(fname, "w") as fh:
+        fh.write("süddeutsch\n")
+    with open_file(fname, "rb") as fh:
+        assert fh.read() == "süddeutsch\n".encode("utf-8")
+    with open_file(fname) as fh:
+        assert fh.read() == "süddeutsch\n"
+
+
+def test_process_files_replaces_tables_of_other_compression(testdata_dir, tmp_path):
+    corpus = [testdata_dir / "data.anno.conll.gz"]
+    pro.process_files(corpus, str(tmp_path), compression="gzip")
+    pro.process_files(corpus, str(tmp_path))
+    assert not (tmp_path / "matches.gz").exists()
+    assert pro.table_files(str(tmp_path / "matches")) == [str(tmp_path / "matches")]
+    with pytest.raises(ValueError):
+        pro.process_files(corpus, str(tmp_path), compression="lzma")
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_process_files_skips_duplicate_sentences(testdata_dir, tmp_path, sharded):
+    corpus = tmp_path / "corpus.conll.gz"
+    with gzip.open(testdata_dir / "data.anno.conll.gz", "rt") as fh:
+        data = fh.read()
+    with gzip.open(corpus, "wt") as fo:
+        fo.write(data * 3)
+    results = []
+    for dedup_capacity in [0, 1000]:
+        colloc_dir = tmp_path / f"colloc-{dedup_capacity}"
+        stats_dir = tmp_path / f"stats-{dedup_capacity}"
+        colloc_dir.mkdir()
+        stats_dir.mkdir()
+        pro.process_files(
+            [corpus],
+            str(colloc_dir),
+            njobs=2,
+            sharded=sharded,
+            dedup_capacity=dedup_capacity,
+        )
+        pro.compute_stats([str(colloc_dir)], str(stats_dir), min_freq=1)
+        results.append(
+            [
+                read_table(colloc_dir / "concord_sentences"),
+                read_table(colloc_dir / "matches"),
+                read_table(colloc_dir / "collocations"),
+                read_table(stats_dir / "concord_sentences"),
+            ]
+        )
+    (sents, matches, _, final_sents), (dd_sents, dd_matches, dd_collocs, dd_final) = (
+        results
+    )
+    # the corpus is repeated, and one of its documents has a duplicate sentence
+    first_sentences = {}
+    for doc_id, sent_id, sentence in sorted(
+        (line.rstrip("\n").split("\t") for line in set(sents)),
+        key=lambda row: int(row[1]),
+    ):
+        first_sentences.setdefault(get_robust_hash(sentence), (doc_id, sent_id))
+    kept = set(first_sentences.values())
+    assert len(kept) < len(sents) // 3
+    assert dd_sents == sorted(
+        line for line in set(sents) if tuple(line.split("\t")[:2]) in kept
+    )
+    assert dd_matches == sorted(
+        line
+        for line in set(matches)
+        if tuple(line.rstrip("\n").split("\t")[11:]) in kept
+    )
+    assert sum(int(line.split("\t")[-1]) for line in dd_collocs) == len(dd_matches)
+    assert dd_final == final_sents
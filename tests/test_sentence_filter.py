@@ -4,6 +4,7 @@ import pytest
 
 import wordprofile.sentence_filter as sf
 from wordprofile.datatypes import Match, WPToken
+from wordprofile.utils import BoundedCache
 
 
 @pytest.fixture
@@ -952,3 +953,33 @@ def test_sentence_is_invalid_if_no_token():
 
 def test_sent_filter_endings_returns_false_if_sentence_contains_no_token():
     assert sf.sent_filter_endings([]) is False
+
+
+@pytest.mark.parametrize(
+    "surface,lemma,expected",
+    [
+        ("Haus", "Haus", True),
+        ("Häuser", "Haus", True),
+        ("H", "H", False),
+        ("", "_", False),
+        ("3D-Drucker", "3D-Drucker", False),
+        ("Drucker", "Drucker3", False),
+        ("Drucker", "Drucker²", False),
+        ("Haus!", "Haus", False),
+        ("Ha(u)s", "Haus", False),
+        ("Haus", "Ha&us", False),
+        ("Bund-Länder", "Bund-länder", False),
+    ],
+)
+def test_valid_form(surface, lemma, expected):
+    assert sf.is_valid_form(surface, lemma) is expected
+
+
+def test_valid_token_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(sf, "_valid_forms", BoundedCache(2))
+    tokens = [
+        WPToken(idx=1, surface=s, lemma=s, tag="NOUN", head=0, rel="root", misc=False)
+        for s in ["Haus", "Ha_us", "Baum", "Haus"]
+    ]
+    assert [sf.is_valid_token(t) for t in tokens] == [True, False, True, True]
+    assert sf._valid_forms == {("Haus", "Haus"): True, ("Ha_us", "Ha_us"): False}
@@ -0,0 +1,178 @@
+"""Block-compressed CoNLL-U files for parallel reading.
+
+A block-compressed file is a sequence of independently compressed gzip
+members, the blocks, each holding whole documents. It is read like any other
+`.conll.gz` file. The sidecar index `<file>.idx` lists the offset and size of
+each block in the file and the position of its first document in the file,
+one block per line:
+
+    offset<TAB>size<TAB>first_document
+
+With the index, ranges of blocks can be decompressed and parsed
+independently of each other (see `wordprofile.wpse.processing.FileReader`).
+Documents are counted as the reader does: a document starts with a sentence
+carrying the `DDC:meta.file_` meta data or with the first sentence of the file.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import gzip
+import io
+import logging
+import os
+from collections.abc import Iterator, Sequence
+from typing import NamedTuple, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".idx"
+BLOCK_SIZE = 1 << 20
+
+
+class Block(NamedTuple):
+    offset: int
+    size: int
+    first_document: int
+
+
+class BlockWriter:
+    """Writes text to a block-compressed file and its index.
+
+    The text is buffered until a document starts after at least `block_size`
+    bytes, then the buffered documents are compressed as a block. The index
+    is written on `close`, the index of a previous file of the same name is
+    removed right away.
+
+    Args:
+        fname: name of the compressed file
+        block_size: minimal uncompressed size of a block in bytes, except
+            for the last block
+        compresslevel: gzip compression level of the blocks
+    """
+
+    def __init__(
+        self, fname: str, block_size: int = BLOCK_SIZE, compresslevel: int = 9
+    ) -> None:
+        self.fname = fname
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        if os.path.exists(fname + INDEX_SUFFIX):
+            os.remove(fname + INDEX_SUFFIX)
+        self.fh = open(fname, "wb")
+        self.blocks: list[Block] = []
+        self.buffer: list[bytes] = []
+        self.buffered = 0
+        self.offset = 0
+        self.documents = 0
+        self.first_document = 0
+
+    def __enter__(self) -> BlockWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start_document(self) -> None:
+        """Marks the start of a document, blocks start only at documents."""
+        if self.buffered >= self.block_size:
+            self._write_block()
+        self.documents += 1
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.buffer.append(data)
+        self.buffered += len(data)
+
+    def close(self) -> None:
+        self._write_block()
+        self.fh.close()
+        write_index(self.fname, self.blocks)
+
+    def _write_block(self) -> None:
+        if not self.buffered:
+            return
+        data = gzip.compress(
+            b"".join(self.buffer), compresslevel=self.compresslevel, mtime=0
+        )
+        self.fh.write(data)
+        self.blocks.append(Block(self.offset, len(data), self.first_document))
+        self.offset += len(data)
+        self.first_document = self.documents
+        self.buffer = []
+        self.buffered = 0
+
+
+def write_index(fname: str, blocks: Sequence[Block]) -> None:
+    tmp_fname = fname + INDEX_SUFFIX + ".tmp"
+    with open(tmp_fname, "w") as fh:
+        fh.writelines("\t".join(map(str, block)) + "\n" for block in blocks)
+    os.replace(tmp_fname, fname + INDEX_SUFFIX)
+
+
+def read_index(fname: str | os.PathLike) -> Optional[list[Block]]:
+    """Returns the blocks of a block-compressed file.
+
+    Returns None if the file has no index or if the index does not match
+    the file, e.g. since the file was rewritten without index.
+    """
+    index_fname = os.fspath(fname) + INDEX_SUFFIX
+    if not os.path.exists(index_fname):
+        return None
+    with open(index_fname) as fh:
+        blocks = [Block(*map(int, line.split("\t"))) for line in fh]
+    offset = 0
+    for block in blocks:
+        if block.offset != offset:
+            break
+        offset += block.size
+    else:
+        if offset == os.path.getsize(fname):
+            return blocks
+    logger.warning("Ignoring index not matching the file: %s" % index_fname)
+    return None
+
+
+def split_blocks(blocks: Sequence[Block], n: int) -> list[list[Block]]:
+    """Splits the blocks into at most n ranges of about equal compressed size."""
+    total = sum(block.size for block in blocks)
+    ranges: list[list[Block]] = []
+    size = 0
+    for block in blocks:
+        if not ranges or size >= total * len(ranges) / n:
+            ranges.append([])
+        ranges[-1].append(block)
+        size += block.size
+    return ranges
+
+
+class FileRange(io.RawIOBase):
+    """Binary file reading the bytes of a file between start and end."""
+
+    def __init__(self, fname: str, start: int, end: int) -> None:
+        self.fh = open(fname, "rb")
+        self.fh.seek(start)
+        self.remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = self.fh.readinto(memoryview(b)[: self.remaining])
+        self.remaining -= n
+        return n
+
+    def close(self) -> None:
+        self.fh.close()
+        super().close()
+
+
+@contextlib.contextmanager
+def open_blocks(fname: str, blocks: Sequence[Block]) -> Iterator[TextIO]:
+    """Opens the text of a range of consecutive blocks of a file."""
+    end = blocks[-1].offset + blocks[-1].size
+    with (
+        FileRange(fname, blocks[0].offset, end) as raw,
+        gzip.open(raw, "rt", encoding="utf-8") as fh,
+    ):
+        yield fh
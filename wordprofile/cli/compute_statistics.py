@@ -3,8 +3,12 @@ import os
 import sys
 from argparse import ArgumentParser
 
-from wordprofile.utils import configure_logs_to_file
-from wordprofile.wpse.processing import compute_stats
+from wordprofile.utils import (
+    COMPRESSION_SUFFIXES,
+    configure_logs_to_file,
+    default_compression,
+)
+from wordprofile.wpse.processing import HASH_BITS, compute_stats
 
 
 def parse_arguments(args):
@@ -18,6 +22,31 @@ def parse_arguments(args):
         help="Minimal frequency filter for aggregated collocations",
     )
     parser.add_argument("--mwe", action="store_true", help="Extract MWE collocations")
+    parser.add_argument(
+        "--compress",
+        nargs="?",
+        choices=list(COMPRESSION_SUFFIXES),
+        const=default_compression(),
+        help="Compress temporary files (default: zstd if installed, otherwise gzip)",
+    )
+    parser.add_argument(
+        "--hash-bits",
+        type=int,
+        choices=HASH_BITS,
+        default=128,
+        help="Bits of the sentence hashes detecting duplicate concordances: full 128-bit hashes (default) or compact 64-bit hashes with rare false duplicates",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        help="Memory for aggregating the collocations in MB, beyond which they are aggregated in partitions on disk",
+    )
+    parser.add_argument(
+        "--njobs",
+        type=int,
+        default=1,
+        help="number of processes aggregating the collocations and filtering the matches",
+    )
     return parser.parse_args(args)
 
 
@@ -26,7 +55,16 @@ def main(arguments: list):
     configure_logs_to_file(level=logging.INFO, log_file_identifier="compute-statistics")
     args = parse_arguments(arguments)
     os.makedirs(args.dest, exist_ok=True)
-    compute_stats(args.src, args.dest, min_freq=args.min_rel_freq, with_mwe=args.mwe)
+    compute_stats(
+        args.src,
+        args.dest,
+        min_freq=args.min_rel_freq,
+        with_mwe=args.mwe,
+        compression=args.compress,
+        hash_bits=args.hash_bits,
+        max_memory=args.max_memory and args.max_memory * 2**20,
+        njobs=args.njobs,
+    )
     logger.info("DONE compute statistics.")
 
 
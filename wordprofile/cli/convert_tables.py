@@ -0,0 +1,27 @@
+import logging
+import os
+import sys
+from argparse import ArgumentParser
+
+from wordprofile.utils import configure_logs_to_file
+from wordprofile.wpse.processing import convert_tables_to_tsv
+
+
+def parse_arguments(args):
+    parser = ArgumentParser()
+    parser.add_argument("src", type=str, help="Path to extracted data")
+    parser.add_argument("--dest", type=str, required=True, help="Output path")
+    return parser.parse_args(args)
+
+
+def main(arguments: list):
+    logger = logging.getLogger(__name__)
+    configure_logs_to_file(level=logging.INFO, log_file_identifier="convert-tables")
+    args = parse_arguments(arguments)
+    os.makedirs(args.dest, exist_ok=True)
+    convert_tables_to_tsv(args.src, args.dest)
+    logger.info("DONE convert %s" % args.src)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -3,10 +3,15 @@ import os
 import sys
 from argparse import ArgumentParser
 
-from wordprofile.utils import configure_logs_to_file
+from wordprofile.utils import (
+    COMPRESSION_SUFFIXES,
+    configure_logs_to_file,
+    default_compression,
+)
 from wordprofile.wpse.processing import (
-    extract_collocations,
-    extract_most_common_surface,
+    READERS,
+    TABLE_FORMATS,
+    TRANSPORTS,
     process_files,
 )
 
@@ -17,11 +22,86 @@ def parse_arguments(args):
         "--input",
         default="-",
         type=str,
-        help="(gzip compressed) conll input file(s). As default stdin is used, if this option is not used.",
+        help="(gzip compressed) conll input file(s), uncompressed files and pipes are detected. As default stdin is used, if this option is not used.",
         nargs="*",
     )
     parser.add_argument("--dest", help="temporary storage path")
     parser.add_argument("--njobs", type=int, default=1, help="number of process jobs")
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default="manager",
+        help="inter-process transport: queues proxied by a manager process or native multiprocessing queues",
+    )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="each job writes its own shard files (listed in manifest.json) instead of single output files",
+    )
+    parser.add_argument(
+        "--reader",
+        choices=READERS,
+        default="conllu",
+        help="conll parser: the conllu package or a streaming parser reading only the columns used for extraction",
+    )
+    parser.add_argument(
+        "--readers",
+        type=int,
+        default=1,
+        help="number of processes reading input files in parallel",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted extraction with --shards, documents in its journals are skipped",
+    )
+    parser.add_argument(
+        "--max-restarts",
+        type=int,
+        default=0,
+        help="restart crashed jobs of an extraction with --shards up to this many times in total (0: abort on a crash)",
+    )
+    parser.add_argument(
+        "--batch-tokens",
+        type=int,
+        default=0,
+        help="send documents to the jobs in batches of about this many tokens (0: single documents)",
+    )
+    parser.add_argument(
+        "--chunk-sentences",
+        type=int,
+        default=0,
+        help="split documents with more sentences into chunks of this many sentences processed in parallel (0: disabled)",
+    )
+    parser.add_argument(
+        "--monitor-interval",
+        type=float,
+        default=60,
+        help="log the queue depths every this many seconds (0: disabled)",
+    )
+    parser.add_argument(
+        "--table-format",
+        choices=TABLE_FORMATS,
+        default="tsv",
+        help="format of the concordances and matches: tab-separated text or chunked columnar binary",
+    )
+    parser.add_argument(
+        "--compress",
+        nargs="?",
+        choices=list(COMPRESSION_SUFFIXES),
+        const=default_compression(),
+        help="write the concordances and matches compressed (default: zstd if installed, otherwise gzip)",
+    )
+    parser.add_argument(
+        "--dedup-capacity",
+        type=int,
+        default=0,
+        help="skip duplicate sentences during extraction, remembering up to this many sentences (0: disabled); the copy kept depends on the scheduling of the jobs",
+    )
+    parser.add_argument(
+        "--stats-file",
+        help="write throughput, queue depths and memory usage as JSON lines to this file every monitor interval",
+    )
     return parser.parse_args(args)
 
 
@@ -32,14 +112,23 @@ def main(arguments: list):
     )
     args = parse_arguments(arguments)
     os.makedirs(args.dest, exist_ok=True)
-    process_files(args.input, args.dest, args.njobs)
-    logger.info("EXTRACT collocations from matches")
-    extract_collocations(
-        os.path.join(args.dest, "matches"), os.path.join(args.dest, "collocations")
-    )
-    logger.info("EXTRACT most common surface form")
-    extract_most_common_surface(
-        os.path.join(args.dest, "matches"), os.path.join(args.dest, "common_surfaces")
+    process_files(
+        args.input,
+        args.dest,
+        args.njobs,
+        transport=args.transport,
+        sharded=args.shards,
+        reader=args.reader,
+        nreaders=args.readers,
+        resume=args.resume,
+        max_restarts=args.max_restarts,
+        batch_tokens=args.batch_tokens,
+        monitor_interval=args.monitor_interval,
+        table_format=args.table_format,
+        compression=args.compress,
+        dedup_capacity=args.dedup_capacity,
+        stats_file=args.stats_file,
+        chunk_sentences=args.chunk_sentences,
     )
     logger.info("DONE %s" % args.dest)
 
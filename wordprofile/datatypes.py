@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import datetime
+import itertools
 from collections import namedtuple
 from dataclasses import asdict, dataclass
 from typing import Optional, Protocol
@@ -98,10 +99,13 @@ class MweConcordance:
         return sorted(all_positions)
 
 
-@dataclass
+@dataclass(slots=True)
 class WPToken:
     """
     Represents a token with information relevant for wordprofile
+
+    Tokens are kept for whole documents during extraction, hence slots
+    instead of an instance dict.
     """
 
     idx: int
@@ -222,25 +226,49 @@ Colloc = namedtuple(
 
 
 class DependencyTree:
-    class Node:
-        def __init__(self, token: WPToken) -> None:
-            self.token = token
-            self.parent: Optional["DependencyTree.Node"] = None
-            self.children: list["DependencyTree.Node"] = []
-
-        def add_child(self, token: "DependencyTree.Node") -> None:
-            if token not in self.children:
-                self.children.append(token)
+    """Dependency tree of a sentence in compressed sparse row layout.
+
+    Tokens are addressed by their 0-based position in the sentence. The
+    children of all tokens are stored in a single list, grouped by head and
+    in sentence order, `child_offsets[i]:child_offsets[i + 1]` is the slice
+    of the children of token i. `by_rel` maps `(head, deprel)` to the
+    children of the head with this dependency relation, for constant time
+    lookups such as `(i, "case") in dtree.by_rel`.
+    """
 
-        def is_root(self) -> bool:
-            return self.parent is None
+    __slots__ = ("tokens", "heads", "child_offsets", "child_ids", "by_rel", "root")
 
     def __init__(self, tokens: list[WPToken]) -> None:
-        self.nodes = [DependencyTree.Node(token) for token in tokens]
-        self.root: Optional[DependencyTree.Node] = None
-        for n in self.nodes:
-            if int(n.token.head) > 0:
-                n.parent = self.nodes[int(n.token.head) - 1]
-                self.nodes[int(n.token.head) - 1].add_child(n)
+        self.tokens = tokens
+        self.heads = heads = [int(t.head) - 1 for t in tokens]
+        n_children = [0] * (len(tokens) + 1)
+        self.by_rel: dict[tuple[int, str], list[int]] = {}
+        self.root: Optional[int] = None
+        by_rel = self.by_rel
+        for i, head in enumerate(heads):
+            if head < 0:
+                self.root = i
+                continue
+            n_children[head + 1] += 1
+            key = (head, tokens[i].rel)
+            if key in by_rel:
+                by_rel[key].append(i)
             else:
-                self.root = n
+                by_rel[key] = [i]
+        self.child_offsets = list(itertools.accumulate(n_children))
+        # stable sort by head, roots (negative heads) come first
+        self.child_ids = sorted(range(len(tokens)), key=heads.__getitem__)
+        del self.child_ids[: len(tokens) - self.child_offsets[-1]]
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def parent(self, i: int) -> Optional[int]:
+        head = self.heads[i]
+        return head if head >= 0 else None
+
+    def children(self, i: int) -> list[int]:
+        return self.child_ids[self.child_offsets[i] : self.child_offsets[i + 1]]
+
+    def has_children(self, i: int) -> bool:
+        return self.child_offsets[i] != self.child_offsets[i + 1]
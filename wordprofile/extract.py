@@ -249,37 +249,41 @@ def extract_matches_by_pattern(
     Returns:
         Generator over extracted matches from sentence.
     """
-    for t in tokens:
-        if int(t.head) <= 0:
-            # token is root
-            continue
-        t_head_1 = tokens[int(t.head) - 1]
-        relation_type = t.rel
-        if relation_type in relations_inv:
-            if (t_head_1.tag, t.tag) in relations_inv[relation_type]:
-                yield Match(
-                    t_head_1,
-                    t,
-                    None,
-                    relations_inv[relation_type][(t_head_1.tag, t.tag)],
-                    sid,
-                )
-        if int(t_head_1.head) <= 0:
-            # token head is root, cannot make ternary relation
-            continue
-        t_head_2 = tokens[int(t_head_1.head) - 1]
-        rel_types = (t_head_1.rel, t.rel)
-        if rel_types in relations_inv:
-            if (t_head_2.tag, t_head_1.tag, t.tag) in relations_inv[rel_types]:
-                rel = relations_inv[rel_types][(t_head_2.tag, t_head_1.tag, t.tag)]
-                prep = None if rel == "KON" else t
-                yield Match(
-                    t_head_2,
-                    t_head_1,
-                    prep,
-                    rel,
-                    sid,
-                )
+    heads = [int(t.head) - 1 for t in tokens]
+    matches: list[Match] = []
+    for i in range(len(tokens)):
+        if heads[i] >= 0:
+            _match_patterns(relations_inv, tokens, heads, i, sid, matches)
+    return iter(matches)
+
+
+def _match_patterns(
+    relations_inv: dict[str | tuple[str, ...], dict[tuple[str, ...], str]],
+    tokens: list[WPToken],
+    heads: list[int],
+    i: int,
+    sid: int,
+    matches: list[Match],
+) -> None:
+    """Binary and ternary pattern rules for the non-root token at position i."""
+    t = tokens[i]
+    t_head_1 = tokens[heads[i]]
+    rules = relations_inv.get(t.rel)
+    if rules is not None:
+        relation = rules.get((t_head_1.tag, t.tag))
+        if relation is not None:
+            matches.append(Match(t_head_1, t, None, relation, sid))
+    head_2 = heads[heads[i]]
+    if head_2 < 0:
+        # token head is root, cannot make ternary relation
+        return
+    rules = relations_inv.get((t_head_1.rel, t.rel))
+    if rules is not None:
+        t_head_2 = tokens[head_2]
+        relation = rules.get((t_head_2.tag, t_head_1.tag, t.tag))
+        if relation is not None:
+            prep = None if relation == "KON" else t
+            matches.append(Match(t_head_2, t_head_1, prep, relation, sid))
 
 
 def extract_comparing_groups(tokens: list[WPToken], sid: int) -> Iterator[Match]:
@@ -293,37 +297,37 @@ def extract_comparing_groups(tokens: list[WPToken], sid: int) -> Iterator[Match]
     Returns:
         Generator over extracted matches from sentence.
     """
-    for t in tokens:
-        if (
-            int(t.head) <= 0
-            or t.rel != "case"
-            or t.tag != "CCONJ"
-            or t.surface not in ["als", "wie"]
-        ):
-            # token is root
-            continue
-        t_head_1 = tokens[int(t.head) - 1]
-        if (
-            int(t_head_1.head) <= 0
-            or t_head_1.rel not in {"obl", "nmod"}
-            or t_head_1.tag != "NOUN"
-        ):
-            # token head is root, cannot make ternary relation
-            continue
-        t_head_2 = tokens[int(t_head_1.head) - 1]
-        if t.surface == "als":
-            # and t_head_2.tag != 'ADJ':
-            # expect relations with 'als' to relate to an adjective
-            # TODO: preferably check for comparative (https://universaldependencies.org/u/feat/Degree.html)
-            continue
-        if t_head_2.tag in {"ADJ", "VERB", "NOUN"}:
-            yield Match(
-                t_head_2,
-                t_head_1,
-                None,
-                "KOM",
-                sid,
-            )
+    heads = [int(t.head) - 1 for t in tokens]
+    matches: list[Match] = []
+    for i in range(len(tokens)):
+        if heads[i] >= 0:
+            _match_comparing_group(tokens, heads, i, sid, matches)
+    return iter(matches)
+
+
+def _match_comparing_group(
+    tokens: list[WPToken], heads: list[int], i: int, sid: int, matches: list[Match]
+) -> None:
+    """Comparison rule for the non-root token at position i."""
+    t = tokens[i]
+    if t.rel != "case" or t.tag != "CCONJ" or t.surface not in ["als", "wie"]:
+        return
+    t_head_1 = tokens[heads[i]]
+    if (
+        heads[heads[i]] < 0
+        or t_head_1.rel not in {"obl", "nmod"}
+        or t_head_1.tag != "NOUN"
+    ):
+        # token head is root, cannot make ternary relation
+        return
+    t_head_2 = tokens[heads[heads[i]]]
+    if t.surface == "als":
+        # and t_head_2.tag != 'ADJ':
+        # expect relations with 'als' to relate to an adjective
+        # TODO: preferably check for comparative (https://universaldependencies.org/u/feat/Degree.html)
+        return
+    if t_head_2.tag in {"ADJ", "VERB", "NOUN"}:
+        matches.append(Match(t_head_2, t_head_1, None, "KOM", sid))
 
 
 def extract_predicatives(dtree: DependencyTree, sid: int) -> Iterator[Match]:
@@ -341,118 +345,110 @@ def extract_predicatives(dtree: DependencyTree, sid: int) -> Iterator[Match]:
     Returns:
         Generator over extracted matches from sentence.
     """
-    for n in dtree.nodes:
-        # subject predicative
-        if n.token.tag in {"NOUN", "VERB", "ADJ"}:
-            if any(
-                c.token.rel == "cop" and c.token.lemma in {"werden", "sein", "bleiben"}
-                for c in n.children
+    matches: list[Match] = []
+    for i in range(len(dtree)):
+        if dtree.has_children(i):
+            _match_predicatives(dtree, i, sid, matches)
+    return iter(matches)
+
+
+def _has_child_with_lemma(
+    dtree: DependencyTree, i: int, rels: set[str], lemma: str
+) -> bool:
+    tokens = dtree.tokens
+    return any(
+        tokens[c].lemma == lemma and tokens[c].rel in rels for c in dtree.children(i)
+    )
+
+
+def _match_predicatives(
+    dtree: DependencyTree, i: int, sid: int, matches: list[Match]
+) -> None:
+    """Predicative rules for the token at position i as head."""
+    tokens = dtree.tokens
+    n = tokens[i]
+    # subject predicative
+    if n.tag in {"NOUN", "VERB", "ADJ"}:
+        if (
+            any(tokens[c].lemma in COPULAS for c in dtree.by_rel.get((i, "cop"), ()))
+            and (i, "case") not in dtree.by_rel
+        ):
+            for c in dtree.by_rel.get((i, "nsubj"), ()):
+                if tokens[c].tag == "NOUN":
+                    matches.append(Match(tokens[c], n, None, "PREDC", sid))
+    # object predicative
+    if n.tag != "VERB":
+        return
+    comparative = None
+    for p in dtree.children(i):
+        pred = tokens[p]
+        # filter subclauses:
+        # full verbs, particle  + aux
+        if pred.tag == "VERB":
+            verb_form = (pred.morph or {}).get("VerbForm", "")
+            if verb_form == "Fin" or (
+                verb_form == "Part"
+                and any(tokens[c].tag == "AUX" for c in dtree.children(p))
             ):
-                if not any(c.token.rel == "case" for c in n.children):
-                    for nsubj in n.children:
-                        if nsubj.token.rel == "nsubj" and nsubj.token.tag == "NOUN":
-                            yield Match(
-                                nsubj.token,
-                                n.token,
-                                None,
-                                "PREDC",
-                                sid,
-                            )
-        # object predicative
-        if n.token.tag == "VERB":
-            for pred in n.children:
-                # filter subclauses:
-                # full verbs, particle  + aux
-                if pred.token.tag == "VERB":
-                    morph = pred.token.morph or {}
-                    if morph.get("VerbForm", "") == "Fin" or (
-                        morph.get("VerbForm", "") == "Part"
-                        and any(c.token.tag == "AUX" for c in pred.children)
-                    ):
-                        continue
-                # case 1: als + NOUN > obl
-                if pred.token.tag == "NOUN" and pred.token.rel == "obl":
-                    if (
-                        n.token.lemma in PRED_VERBS["als_noun"]
-                        or n.token.lemma in PRED_VERBS["als_adj"]
-                    ):
-                        # skip sentences with "mehr ... als"
-                        if _is_probably_comparative(n):
-                            continue
-                        if any(
-                            c.token.lemma == "als" and c.token.rel == "case"
-                            for c in pred.children
-                        ):
-                            yield Match(n.token, pred.token, None, "PRED", sid)
-                # case 2 : als + ADJ > advcl
-                if pred.token.tag in {"ADJ", "VERB"} and pred.token.rel in {
-                    "advcl",  # relation used in HDT-UD
-                    "xcomp",
-                }:
-                    # skip sentences with "mehr ... als"
-                    if _is_probably_comparative(n):
-                        continue
-                    if n.token.lemma in PRED_VERBS["als_adj"]:
-                        if any(
-                            c.token.rel in {"mark", "case"} and c.token.lemma == "als"
-                            for c in pred.children
-                        ):
-                            yield Match(n.token, pred.token, None, "PRED", sid)
-                # case 3: für + ADJ/NOUN > obl/obj/xcomp
-                if pred.token.tag in {"ADJ", "NOUN"} and pred.token.rel in {
-                    "obl",
-                    "obj",
-                    "xcomp",
-                }:
-                    if n.token.lemma in PRED_VERBS["für_adj-noun"]:
-                        if any(
-                            c.token.rel == "case" and c.token.lemma == "für"
-                            for c in pred.children
-                        ):
-                            yield Match(n.token, pred.token, None, "PRED", sid)
-                # case 4: wie + NOUN/ADJ/VERB > obl/advcl
-                if (
-                    pred.token.tag in {"ADJ", "VERB"} and pred.token.rel == "advcl"
-                ) or (pred.token == "NOUN" and pred.token.rel == "obl"):
-                    # adj/verb > mark, advcl
-                    # noun, case, obl
-                    if n.token.lemma in PRED_VERBS["wie_adj-noun"]:
-                        if any(
-                            c.token.rel in {"case", "mark"} and c.token.lemma == "wie"
-                            for c in pred.children
-                        ):
-                            yield Match(n.token, pred.token, None, "PRED", sid)
-                # case 5: verb + adj ohne als/wie
-                if pred.token.tag == "ADJ" and not any(
-                    c.token.lemma in {"als", "wie"} for c in pred.children
-                ):
-                    if (n.token.lemma == "lassen" and pred.token.rel == "xcomp") or (
-                        n.token.lemma == "aussehen" and pred.token.rel == "advcl"
-                    ):
-                        yield Match(
-                            n.token,
-                            pred.token,
-                            None,
-                            "PRED",
-                            sid,
-                        )
-                    if n.token.lemma == "bleiben" and pred.token.rel == "xcomp":
-                        subj = [
-                            c
-                            for c in n.children
-                            if c.token.rel == "nsubj"
-                            and c.token.tag in {"ADJ", "NOUN", "VERB"}
-                        ]
-                        if len(subj) == 1:
-                            yield Match(subj[0].token, pred.token, None, "PREDC", sid)
-
-
-def _is_probably_comparative(node: "DependencyTree.Node") -> bool:
+                continue
+        # case 1: als + NOUN > obl
+        if pred.tag == "NOUN" and pred.rel == "obl" and n.lemma in ALS_VERBS:
+            # skip sentences with "mehr ... als"
+            if comparative is None:
+                comparative = _is_probably_comparative(dtree, i)
+            if comparative:
+                continue
+            if _has_child_with_lemma(dtree, p, {"case"}, "als"):
+                matches.append(Match(n, pred, None, "PRED", sid))
+        # case 2 : als + ADJ > advcl
+        if pred.tag in {"ADJ", "VERB"} and pred.rel in {
+            "advcl",  # relation used in HDT-UD
+            "xcomp",
+        }:
+            # skip sentences with "mehr ... als"
+            if comparative is None:
+                comparative = _is_probably_comparative(dtree, i)
+            if comparative:
+                continue
+            if n.lemma in PRED_VERBS["als_adj"]:
+                if _has_child_with_lemma(dtree, p, {"mark", "case"}, "als"):
+                    matches.append(Match(n, pred, None, "PRED", sid))
+        # case 3: für + ADJ/NOUN > obl/obj/xcomp
+        if pred.tag in {"ADJ", "NOUN"} and pred.rel in {"obl", "obj", "xcomp"}:
+            if n.lemma in PRED_VERBS["für_adj-noun"]:
+                if _has_child_with_lemma(dtree, p, {"case"}, "für"):
+                    matches.append(Match(n, pred, None, "PRED", sid))
+        # case 4: wie + ADJ/VERB > advcl
+        if pred.tag in {"ADJ", "VERB"} and pred.rel == "advcl":
+            # adj/verb > mark, advcl
+            if n.lemma in PRED_VERBS["wie_adj-noun"]:
+                if _has_child_with_lemma(dtree, p, {"case", "mark"}, "wie"):
+                    matches.append(Match(n, pred, None, "PRED", sid))
+        # case 5: verb + adj ohne als/wie
+        if pred.tag == "ADJ" and not any(
+            tokens[c].lemma in {"als", "wie"} for c in dtree.children(p)
+        ):
+            if (n.lemma == "lassen" and pred.rel == "xcomp") or (
+                n.lemma == "aussehen" and pred.rel == "advcl"
+            ):
+                matches.append(Match(n, pred, None, "PRED", sid))
+            if n.lemma == "bleiben" and pred.rel == "xcomp":
+                subj = [
+                    c
+                    for c in dtree.by_rel.get((i, "nsubj"), ())
+                    if tokens[c].tag in {"ADJ", "NOUN", "VERB"}
+                ]
+                if len(subj) == 1:
+                    matches.append(Match(tokens[subj[0]], pred, None, "PREDC", sid))
+
+
+def _is_probably_comparative(dtree: DependencyTree, i: int) -> bool:
+    tokens = dtree.tokens
     return any(
-        c.token.surface == "mehr" and c.token.rel in {"advmod", "obj"}
+        tokens[c].surface == "mehr" and tokens[c].rel in {"advmod", "obj"}
         for c in itertools.chain(
-            node.children,
-            itertools.chain.from_iterable(c.children for c in node.children),
+            dtree.children(i),
+            itertools.chain.from_iterable(dtree.children(c) for c in dtree.children(i)),
         )
     )
 
@@ -469,22 +465,25 @@ def extract_genitives(dtree: DependencyTree, sid: int) -> Iterator[Match]:
     Returns:
         Generator over extracted matches from sentence.
     """
-    for n in dtree.nodes:
-        if n.token.tag == "NOUN":
-            for nmod in n.children:
-                if nmod.token.rel == "nmod" and nmod.token.tag == "NOUN":
-                    if _has_case_marking(nmod.token, "Gen") or any(
-                        _has_case_marking(dep.token, "Gen") for dep in nmod.children
-                    ):
-                        if any(c.token.rel == "case" for c in nmod.children):
-                            continue
-                        yield Match(
-                            n.token,
-                            nmod.token,
-                            None,
-                            "GMOD",
-                            sid,
-                        )
+    matches: list[Match] = []
+    for i in range(len(dtree)):
+        _match_genitives(dtree, i, sid, matches)
+    return iter(matches)
+
+
+def _match_genitives(
+    dtree: DependencyTree, i: int, sid: int, matches: list[Match]
+) -> None:
+    tokens = dtree.tokens
+    if tokens[i].tag != "NOUN":
+        return
+    for c in dtree.by_rel.get((i, "nmod"), ()):
+        if tokens[c].tag != "NOUN" or (c, "case") in dtree.by_rel:
+            continue
+        if _has_case_marking(tokens[c], "Gen") or any(
+            _has_case_marking(tokens[d], "Gen") for d in dtree.children(c)
+        ):
+            matches.append(Match(tokens[i], tokens[c], None, "GMOD", sid))
 
 
 def _has_case_marking(token: WPToken, case: str) -> bool:
@@ -505,31 +504,41 @@ def extract_active_subjects(dtree: DependencyTree, sid: int) -> Iterator[Match]:
     Returns:
         Generator over extracted matches from sentence.
     """
-    for n in dtree.nodes:
-        if any(cop.token.rel == "cop" for cop in n.children):
-            continue
-        if n.token.tag in {"NOUN", "VERB", "ADJ"}:
-            for nsubj in n.children:
-                if nsubj.token.rel == "nsubj" and nsubj.token.tag == "NOUN":
-                    yield Match(
-                        n.token,
-                        nsubj.token,
-                        None,
-                        "SUBJA",
-                        sid,
-                    )
+    matches: list[Match] = []
+    for i in range(len(dtree)):
+        _match_active_subjects(dtree, i, sid, matches)
+    return iter(matches)
+
+
+def _match_active_subjects(
+    dtree: DependencyTree, i: int, sid: int, matches: list[Match]
+) -> None:
+    tokens = dtree.tokens
+    if tokens[i].tag not in {"NOUN", "VERB", "ADJ"} or (i, "cop") in dtree.by_rel:
+        return
+    for c in dtree.by_rel.get((i, "nsubj"), ()):
+        if tokens[c].tag == "NOUN":
+            matches.append(Match(tokens[i], tokens[c], None, "SUBJA", sid))
 
 
 def extract_passive_subjects(dtree: DependencyTree, sid: int) -> Iterator[Match]:
-    for n in dtree.nodes:
-        if n.token.rel == "nsubj:pass" and n.token.tag == "NOUN":
-            parent = n.parent
-            if parent.token.tag == "VERB":
-                if any(
-                    child.token.rel == "aux:pass" and child.token.lemma == "werden"
-                    for child in parent.children
-                ):
-                    yield Match(parent.token, n.token, None, "SUBJP", sid)
+    matches: list[Match] = []
+    for i in range(len(dtree)):
+        _match_passive_subject(dtree, i, sid, matches)
+    return iter(matches)
+
+
+def _match_passive_subject(
+    dtree: DependencyTree, i: int, sid: int, matches: list[Match]
+) -> None:
+    tokens = dtree.tokens
+    parent = dtree.parent(i)
+    if parent is None or tokens[i].rel != "nsubj:pass" or tokens[i].tag != "NOUN":
+        return
+    if tokens[parent].tag == "VERB" and any(
+        tokens[c].lemma == "werden" for c in dtree.by_rel.get((parent, "aux:pass"), ())
+    ):
+        matches.append(Match(tokens[parent], tokens[i], None, "SUBJP", sid))
 
 
 def extract_objects(dtree: DependencyTree, sid: int) -> Iterator[Match]:
@@ -543,59 +552,127 @@ def extract_objects(dtree: DependencyTree, sid: int) -> Iterator[Match]:
     Returns:
         Generator of extracted matches from sentence
     """
-    for node in dtree.nodes:
-        if node.token.tag == "VERB":
-            for child in node.children:
-                if child.token.rel in {"obj", "obl:arg"} and child.token.tag == "NOUN":
-                    if any(dep.token.rel == "case" for dep in child.children):
-                        continue
-                    if child.token.rel == "obj":
-                        if not (
-                            _has_case_marking(child.token, "Dat")
-                            or _has_case_marking(child.token, "Gen")
-                            or any(
-                                (
-                                    _has_case_marking(dep.token, "Gen")
-                                    and dep.token.rel != "nmod"
-                                )
-                                or (
-                                    _has_case_marking(dep.token, "Dat")
-                                    and dep.token.rel != "nmod"
-                                )
-                                for dep in child.children
-                            )
-                        ) or _has_case_marking(child.token, "Acc"):
-                            relation = "OBJ"
-                        else:
-                            relation = "OBJO"
-                    elif child.token.rel == "obl:arg":
-                        relation = "OBJO"
-                    yield Match(node.token, child.token, None, relation, sid)
-
-
-def extract_matches(parses: list[list[WPToken]]) -> Iterator[Match]:
+    matches: list[Match] = []
+    for i in range(len(dtree)):
+        _match_objects(dtree, i, sid, matches)
+    return iter(matches)
+
+
+def _match_objects(
+    dtree: DependencyTree, i: int, sid: int, matches: list[Match]
+) -> None:
+    tokens = dtree.tokens
+    if tokens[i].tag != "VERB":
+        return
+    for c in dtree.children(i):
+        child = tokens[c]
+        if child.rel not in {"obj", "obl:arg"} or child.tag != "NOUN":
+            continue
+        if (c, "case") in dtree.by_rel:
+            continue
+        relation = "OBJO"
+        if child.rel == "obj":
+            if not (
+                _has_case_marking(child, "Dat")
+                or _has_case_marking(child, "Gen")
+                or any(
+                    tokens[d].rel != "nmod"
+                    and (
+                        _has_case_marking(tokens[d], "Gen")
+                        or _has_case_marking(tokens[d], "Dat")
+                    )
+                    for d in dtree.children(c)
+                )
+            ) or _has_case_marking(child, "Acc"):
+                relation = "OBJ"
+        matches.append(Match(tokens[i], child, None, relation, sid))
+
+
+RELATIONS_INV = get_inverted_relation_patterns()
+COPULAS = {"werden", "sein", "bleiben"}
+ALS_VERBS = PRED_VERBS["als_noun"] | PRED_VERBS["als_adj"]
+HEAD_TAGS = {"NOUN", "VERB", "ADJ"}
+
+
+def extract_sentence_matches(tokens: list[WPToken], sid: int) -> list[Match]:
+    """Extracts the matches of all relations from a sentence in one pass.
+
+    The dependency tree is built once and the rules of the pattern, object,
+    predicative, genitive, comparison, active and passive subject relations
+    are evaluated in a single traversal. Matches are returned in the order
+    of the separate `extract_*` functions.
+
+    Args:
+        tokens: sequence of tokens representing a single sentence
+        sid: sentence id used for match initialization
+
+    Returns:
+        List of extracted matches from sentence.
+    """
+    dtree = DependencyTree(tokens)
+    heads, offsets, by_rel = dtree.heads, dtree.child_offsets, dtree.by_rel
+    patterns: list[Match] = []
+    objects: list[Match] = []
+    predicatives: list[Match] = []
+    genitives: list[Match] = []
+    comparing_groups: list[Match] = []
+    active_subjects: list[Match] = []
+    passive_subjects: list[Match] = []
+    # the rules are only called for tokens that can satisfy their conditions
+    for i, t in enumerate(tokens):
+        head = heads[i]
+        if head >= 0:
+            # inlined `_match_patterns`, evaluated for most tokens
+            t_head_1 = tokens[head]
+            rules = RELATIONS_INV.get(t.rel)
+            if rules is not None:
+                relation = rules.get((t_head_1.tag, t.tag))
+                if relation is not None:
+                    patterns.append(Match(t_head_1, t, None, relation, sid))
+            head_2 = heads[head]
+            if head_2 >= 0:
+                rules = RELATIONS_INV.get((t_head_1.rel, t.rel))
+                if rules is not None:
+                    t_head_2 = tokens[head_2]
+                    relation = rules.get((t_head_2.tag, t_head_1.tag, t.tag))
+                    if relation is not None:
+                        prep = None if relation == "KON" else t
+                        patterns.append(Match(t_head_2, t_head_1, prep, relation, sid))
+            if t.rel == "case":
+                _match_comparing_group(tokens, heads, i, sid, comparing_groups)
+            elif t.rel == "nsubj:pass":
+                _match_passive_subject(dtree, i, sid, passive_subjects)
+        if t.tag in HEAD_TAGS and offsets[i] != offsets[i + 1]:
+            has_cop = (i, "cop") in by_rel
+            if t.tag == "VERB":
+                _match_objects(dtree, i, sid, objects)
+            if t.tag == "VERB" or has_cop:
+                _match_predicatives(dtree, i, sid, predicatives)
+            if t.tag == "NOUN" and (i, "nmod") in by_rel:
+                _match_genitives(dtree, i, sid, genitives)
+            if not has_cop and (i, "nsubj") in by_rel:
+                _match_active_subjects(dtree, i, sid, active_subjects)
+    return (
+        patterns
+        + objects
+        + predicatives
+        + genitives
+        + comparing_groups
+        + active_subjects
+        + passive_subjects
+    )
+
+
+def extract_matches(parses: list[list[WPToken]], offset: int = 0) -> Iterator[Match]:
     """Extracts various matches from a given list of sentences.
 
     Args:
         parses: List of token sequences
+        offset: number of sentences preceding the first one, sentence ids
+            start at offset + 1
 
     Returns:
         Generator over extracted matches from sentences.
     """
-    relations_inv = get_inverted_relation_patterns()
-    for sid, sentence in enumerate(parses, 1):
-        for match in extract_matches_by_pattern(relations_inv, sentence, sid):
-            yield match
-        dtree = DependencyTree(sentence)
-        for match in extract_objects(dtree, sid):
-            yield match
-        for match in extract_predicatives(dtree, sid):
-            yield match
-        for match in extract_genitives(dtree, sid):
-            yield match
-        for match in extract_comparing_groups(sentence, sid):
-            yield match
-        for match in extract_active_subjects(dtree, sid):
-            yield match
-        for match in extract_passive_subjects(dtree, sid):
-            yield match
+    for sid, sentence in enumerate(parses, offset + 1):
+        yield from extract_sentence_matches(sentence, sid)
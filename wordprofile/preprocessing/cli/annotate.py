@@ -2,7 +2,7 @@ import gzip
 import logging
 import time
 from datetime import datetime
-from typing import Iterable, Iterator
+from typing import Iterable, Iterator, TextIO
 
 import click
 import conllu
@@ -13,7 +13,9 @@ import thinc.api
 from cachetools import LFUCache, cached
 from spacy.tokens import Doc
 
+from wordprofile.block_gzip import BlockWriter
 from wordprofile.utils import configure_logs_to_file
+from wordprofile.wpse.conllu_reader import DOC_START
 
 logger = logging.getLogger(__name__)
 
@@ -135,6 +137,34 @@ def lemmatize(
         token["lemma"] = dwdsmor_lemma
 
 
+def load_models(
+    fast: bool = False, gpu: int = -1
+) -> tuple[spacy.Language, dwdsmor.Lemmatizer]:
+    """Loads the spaCy pipeline, on the given GPU if >= 0, and the lemmatizer."""
+    if gpu >= 0:
+        thinc.api.set_gpu_allocator("pytorch")
+        thinc.api.require_gpu(gpu)
+    nlp = spacy.load("de_zdl_lg" if fast else "de_zdl_dist")
+    nlp.add_pipe("doc_cleaner")
+    return nlp, dwdsmor.lemmatizer("lemma")
+
+
+def annotate_file(
+    nlp: spacy.Language,
+    lemmatizer: dwdsmor.Lemmatizer,
+    f: TextIO,
+    batch_size: int = 128,
+) -> Iterator[conllu.models.TokenList]:
+    """Annotates and lemmatizes the sentences of a CoNLL-U text stream."""
+    for sentence in annotate(
+        nlp,
+        conllu.parse_incr(f, fields=conllu.parser.DEFAULT_FIELDS),
+        batch_size=batch_size,
+    ):
+        lemmatize(lemmatizer, sentence)
+        yield sentence
+
+
 def deduce_case(sentence: conllu.models.TokenList, token_index: int) -> str:
     token = sentence[token_index - 1]
     if token["deprel"] in {"nsubj", "nsubj:pass"}:
@@ -188,29 +218,35 @@ def deduce_case(sentence: conllu.models.TokenList, token_index: int) -> str:
     type=int,
     help="Batch size used by model during processing. Default is 128 (sentences).",
 )
-def main(input, output, fast, batch_size, gpu):
+@click.option(
+    "--block-size",
+    default=0,
+    type=int,
+    help="Write independently compressed blocks of whole documents of at least "
+    "this many bytes and an index (OUTPUT.idx) for parallel reading. "
+    "Default is 0, i.e. a single gzip stream.",
+)
+def main(input, output, fast, batch_size, gpu, block_size):
+    if block_size and output == "-":
+        raise click.UsageError("--block-size requires an output file.")
     configure_logs_to_file(log_file_identifier="annotate")
     input_file = input if input != "-" else "from stdin"
     logger.info(
         "Processing corpus %s on %s (batch size: %d)."
         % (input_file, f"gpu {gpu}" if gpu >= 0 else "cpu", batch_size)
     )
-    if gpu >= 0:
-        thinc.api.set_gpu_allocator("pytorch")
-        thinc.api.require_gpu(gpu)
-    nlp = spacy.load("de_zdl_lg" if fast else "de_zdl_dist")
-    nlp.add_pipe("doc_cleaner")
-    lemmatizer = dwdsmor.lemmatizer("lemma")
+    nlp, lemmatizer = load_models(fast, gpu)
     start = time.time()
     logger.info("Start time: %s" % datetime.fromtimestamp(start))
     with gzip.open(input, "rt") as f:
-        with gzip.open(output, "wt") as fo:
-            for sentence in annotate(
-                nlp,
-                conllu.parse_incr(f, fields=conllu.parser.DEFAULT_FIELDS),
-                batch_size=batch_size,
+        with (
+            BlockWriter(output, block_size) if block_size else gzip.open(output, "wt")
+        ) as fo:
+            for i, sentence in enumerate(
+                annotate_file(nlp, lemmatizer, f, batch_size=batch_size)
             ):
-                lemmatize(lemmatizer, sentence)
+                if block_size and (i == 0 or DOC_START in sentence.metadata):
+                    fo.start_document()
                 fo.write(sentence.serialize())
     end = time.time()
     elapsed_time = end - start
@@ -3,10 +3,12 @@ import gzip
 import logging
 import os
 import re
+from collections.abc import Iterator
 from datetime import date
 
 import click
 
+from wordprofile.block_gzip import BlockWriter
 from wordprofile.preprocessing.pytabs.tabs import TabsDocument
 from wordprofile.utils import configure_logs_to_file
 
@@ -53,22 +55,43 @@ def filter_new_files(
 
 
 def convert_files(
-    corpus: str, output_path: str, tabs_dump_path: str, files_to_process: list[str]
+    corpus: str,
+    output_path: str,
+    tabs_dump_path: str,
+    files_to_process: list[str],
+    block_size: int = 0,
 ) -> list[str]:
+    """Converts the tabs files into `<corpus>.conll.gz` and returns the
+    basenames of the converted documents.
+
+    With `block_size` > 0, the file is block-compressed with an index for
+    parallel reading (see `wordprofile.block_gzip`).
+    """
     basenames = []
-    with gzip.open(os.path.join(output_path, f"{corpus}.conll.gz"), "wt") as fp:
-        for file in files_to_process:
-            file_path = os.path.join(tabs_dump_path, file)
-            try:
-                doc = TabsDocument.from_tabs(file_path)
-            except UnicodeDecodeError:
-                logger.exception("Couldn't process file: %s" % file_path)
-            else:
-                fp.write(doc.as_conllu())
-                basenames.append(doc.meta["basename"])
+    fname = os.path.join(output_path, f"{corpus}.conll.gz")
+    with BlockWriter(fname, block_size) if block_size else gzip.open(fname, "wt") as fp:
+        for doc in convert_documents(tabs_dump_path, files_to_process):
+            if block_size:
+                fp.start_document()
+            fp.write(doc.as_conllu())
+            basenames.append(doc.meta["basename"])
     return basenames
 
 
+def convert_documents(
+    tabs_dump_path: str, files_to_process: list[str]
+) -> Iterator[TabsDocument]:
+    """Reads the tabs files, files that cannot be decoded are logged and skipped."""
+    for file in files_to_process:
+        file_path = os.path.join(tabs_dump_path, file)
+        try:
+            doc = TabsDocument.from_tabs(file_path)
+        except UnicodeDecodeError:
+            logger.exception("Couldn't process file: %s" % file_path)
+        else:
+            yield doc
+
+
 @click.command()
 @click.option(
     "--corpus",
@@ -93,11 +116,21 @@ def convert_files(
     help="""Path to 'ddc_dump' directory that contains subdir with .tabs files and
     'corpus-tabs.files'.""",
 )
+@click.option(
+    "--block-size",
+    "-b",
+    default=0,
+    type=int,
+    help="""Write independently compressed blocks of whole documents of at least
+    this many bytes and an index (.conll.gz.idx) for parallel reading.
+    Default is 0, i.e. a single gzip stream.""",
+)
 @click.help_option("--help", "-h")
 def main(
     corpus: str,
     data_root: str,
     tabs_dump_path: str,
+    block_size: int,
 ):
     """
     Generate .conll.gz file for corpus from .tabs files that are not
@@ -127,7 +160,9 @@ def main(
     output_path = os.path.join(data_root, output_dir)
     os.makedirs(os.path.abspath(output_path), exist_ok=True)
 
-    new_basenames = convert_files(corpus, output_path, tabs_dump_path, files_to_process)
+    new_basenames = convert_files(
+        corpus, output_path, tabs_dump_path, files_to_process, block_size
+    )
     logger.info("Processed %d documents successfully." % len(new_basenames))
     with open(os.path.join(output_path, f"{corpus}.toc"), "w", encoding="utf-8") as fp:
         fp.write("\n".join(new_basenames))
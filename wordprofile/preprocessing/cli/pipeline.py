@@ -0,0 +1,319 @@
+"""Streaming pipeline from tabs files to the extraction of collocations.
+
+The stages run in separate processes connected by pipes: the conversion of
+the tabs files (see `data_update.py`), the annotation (see `annotate.py`) and
+the extraction (`wordprofile.wpse.processing.process_files`). The CoNLL-U
+data between the stages is neither compressed nor stored, except when the
+intermediate files are requested for auditing.
+"""
+
+import logging
+import multiprocessing
+import os
+from typing import Optional
+
+import click
+
+from wordprofile.preprocessing.cli.annotate import annotate_file, load_models
+from wordprofile.preprocessing.cli.data_update import (
+    collect_current_basenames,
+    convert_documents,
+    filter_new_files,
+    map_tabs_file_to_basename,
+)
+from wordprofile.utils import (
+    COMPRESSION_SUFFIXES,
+    configure_logs_to_file,
+    open_file,
+)
+from wordprofile.wpse.processing import (
+    PART_SUFFIX,
+    READERS,
+    TABLE_FORMATS,
+    process_files,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def open_outputs(fd: int, audit_file: Optional[str]) -> list:
+    """Opens the pipe of a stage and the optional audit file (compressed by
+    suffix, see `wordprofile.utils.open_file`)."""
+    outputs = [os.fdopen(fd, "w", encoding="utf-8")]
+    if audit_file is not None:
+        outputs.append(open_file(audit_file, "w"))
+    return outputs
+
+
+def convert_stage(
+    tabs_dump_path: str,
+    files_to_process: list[str],
+    fd: int,
+    toc_file: str,
+    audit_file: Optional[str] = None,
+) -> None:
+    """Writes the converted documents to the pipe and their basenames to
+    the toc file."""
+    outputs = open_outputs(fd, audit_file)
+    with open(toc_file, "w", encoding="utf-8") as toc:
+        for doc in convert_documents(tabs_dump_path, files_to_process):
+            text = doc.as_conllu()
+            for fh in outputs:
+                fh.write(text)
+            toc.write(doc.meta["basename"] + "\n")
+    for fh in outputs:
+        fh.close()
+
+
+def annotate_stage(
+    in_fd: int,
+    fd: int,
+    fast: bool = False,
+    gpu: int = -1,
+    batch_size: int = 128,
+    audit_file: Optional[str] = None,
+) -> None:
+    """Annotates the sentences read from one pipe and writes them to another."""
+    # the output is opened first, so that the extraction sees the end of
+    # its input if loading the models fails
+    outputs = open_outputs(fd, audit_file)
+    nlp, lemmatizer = load_models(fast, gpu)
+    with os.fdopen(in_fd, encoding="utf-8") as f:
+        for sentence in annotate_file(nlp, lemmatizer, f, batch_size=batch_size):
+            text = sentence.serialize()
+            for fh in outputs:
+                fh.write(text)
+    for fh in outputs:
+        fh.close()
+
+
+def run_pipeline(
+    tabs_dump_path: str,
+    files_to_process: list[str],
+    dest: str,
+    corpus: str,
+    fast: bool = False,
+    gpu: int = -1,
+    batch_size: int = 128,
+    converted_file: Optional[str] = None,
+    annotated_file: Optional[str] = None,
+    **extraction_options,
+) -> list[str]:
+    """Converts, annotates and extracts the tabs files into `dest`.
+
+    The basenames of the converted documents are written to
+    `<dest>/<corpus>.toc` once all stages succeeded. The extraction options
+    are passed to `process_files`.
+
+    Returns:
+        basenames of the converted documents
+
+    Raises:
+        RuntimeError: if the conversion or the annotation failed
+    """
+    # the stages inherit the pipe ends, the ends not used by a stage are
+    # closed before the next stage is forked
+    ctx = multiprocessing.get_context("fork")
+    toc_file = os.path.join(dest, f"{corpus}.toc")
+    converted_in, converted_out = os.pipe()
+    converter = ctx.Process(
+        target=convert_stage,
+        args=(
+            tabs_dump_path,
+            files_to_process,
+            converted_out,
+            toc_file + PART_SUFFIX,
+            converted_file,
+        ),
+    )
+    converter.start()
+    os.close(converted_out)
+    annotated_in, annotated_out = os.pipe()
+    annotator = ctx.Process(
+        target=annotate_stage,
+        args=(converted_in, annotated_out, fast, gpu, batch_size, annotated_file),
+    )
+    annotator.start()
+    os.close(converted_in)
+    os.close(annotated_out)
+    try:
+        process_files([f"/dev/fd/{annotated_in}"], dest, **extraction_options)
+    finally:
+        os.close(annotated_in)
+        annotator.join()
+        if annotator.exitcode != 0:
+            # the converter would block on the pipe nobody reads anymore
+            converter.terminate()
+        converter.join()
+    for name, stage in [("Annotation", annotator), ("Conversion", converter)]:
+        if stage.exitcode != 0:
+            raise RuntimeError(f"{name} failed with exit code {stage.exitcode}")
+    os.replace(toc_file + PART_SUFFIX, toc_file)
+    with open(toc_file, encoding="utf-8") as fh:
+        return fh.read().splitlines()
+
+
+@click.command()
+@click.option(
+    "--corpus",
+    "-c",
+    required=True,
+    type=str,
+    help="Name of corpus. Used for detection of .toc files and naming of output files.",
+)
+@click.option(
+    "--tabs-dump-path",
+    "-t",
+    required=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="""Path to 'ddc_dump' directory that contains subdir with .tabs files and
+    'corpus-tabs.files'.""",
+)
+@click.option(
+    "--dest",
+    required=True,
+    type=click.Path(file_okay=False),
+    help="Storage path of the extraction.",
+)
+@click.option(
+    "--data-root",
+    "-d",
+    type=click.Path(exists=True, file_okay=False),
+    help="""Path to directory containing existing data and .toc files.
+    Documents listed there are skipped.""",
+)
+@click.option(
+    "--converted-output",
+    type=click.Path(dir_okay=False),
+    help="Also write the converted conll data to this file (e.g. corpus.conll.gz).",
+)
+@click.option(
+    "--annotated-output",
+    type=click.Path(dir_okay=False),
+    help="Also write the annotated conll data to this file (e.g. corpus.anno.conll.gz).",
+)
+@click.option(
+    "--fast",
+    "-f",
+    is_flag=True,
+    help="Use CPU-optimized models for faster processing. "
+    "As default, GPU-optmized model group is used.",
+)
+@click.option(
+    "--gpu",
+    "-g",
+    type=int,
+    default=-1,
+    help="ID of GPU to use, default -1 , i.e. using CPU.",
+)
+@click.option(
+    "--batch-size",
+    "-b",
+    default=128,
+    type=int,
+    help="Batch size used by model during processing. Default is 128 (sentences).",
+)
+@click.option("--njobs", default=1, type=int, help="Number of extraction jobs.")
+@click.option(
+    "--shards",
+    is_flag=True,
+    help="Each extraction job writes its own shard files.",
+)
+@click.option(
+    "--reader",
+    type=click.Choice(READERS),
+    default="conllu",
+    help="Conll parser of the extraction.",
+)
+@click.option(
+    "--batch-tokens",
+    default=0,
+    type=int,
+    help="Send documents to the extraction jobs in batches of about this many tokens.",
+)
+@click.option(
+    "--chunk-sentences",
+    default=0,
+    type=int,
+    help="Split documents with more sentences into chunks processed in parallel (0: disabled).",
+)
+@click.option(
+    "--monitor-interval",
+    default=60,
+    type=float,
+    help="Log the queue depths of the extraction every this many seconds (0: disabled).",
+)
+@click.option(
+    "--table-format",
+    type=click.Choice(TABLE_FORMATS),
+    default="tsv",
+    help="Format of the concordances and matches.",
+)
+@click.option(
+    "--compress",
+    type=click.Choice(list(COMPRESSION_SUFFIXES)),
+    help="Write the concordances and matches compressed.",
+)
+@click.help_option("--help", "-h")
+def main(
+    corpus,
+    tabs_dump_path,
+    dest,
+    data_root,
+    converted_output,
+    annotated_output,
+    fast,
+    gpu,
+    batch_size,
+    njobs,
+    shards,
+    reader,
+    batch_tokens,
+    chunk_sentences,
+    monitor_interval,
+    table_format,
+    compress,
+):
+    """
+    Convert, annotate and extract the .tabs files of a corpus in one run.
+
+    The stages are connected by pipes, the conll data is not written to
+    disk unless --converted-output or --annotated-output is given. The
+    basenames of the documents are written to DEST/CORPUS.toc.
+    """
+    configure_logs_to_file(log_file_identifier="pipeline")
+    old_basenames = collect_current_basenames(data_root, corpus) if data_root else set()
+    corpus_tabs_file = os.path.join(tabs_dump_path, "corpus-tabs.files")
+    files_to_process = filter_new_files(
+        old_basenames, map_tabs_file_to_basename(corpus_tabs_file)
+    )
+    logger.info(
+        "%d new documents found for corpus %s." % (len(files_to_process), corpus),
+    )
+    if not files_to_process:
+        return
+    os.makedirs(dest, exist_ok=True)
+    basenames = run_pipeline(
+        tabs_dump_path,
+        files_to_process,
+        dest,
+        corpus,
+        fast=fast,
+        gpu=gpu,
+        batch_size=batch_size,
+        converted_file=converted_output,
+        annotated_file=annotated_output,
+        njobs=njobs,
+        sharded=shards,
+        reader=reader,
+        batch_tokens=batch_tokens,
+        chunk_sentences=chunk_sentences,
+        table_format=table_format,
+        compression=compress,
+        monitor_interval=monitor_interval,
+    )
+    logger.info("Processed %d documents successfully." % len(basenames))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,29 +3,51 @@ from collections.abc import Iterator
 
 from wordprofile.datatypes import Match, WPToken
 from wordprofile.extract import extract_matches
+from wordprofile.utils import BoundedCache
 
 RE_GK_NORM_ERROR = re.compile(r"^([^-]+-)+[a-zäüöß]+$")
 INVALID_CHARS = re.compile(r"[^\u0000-\uD7FF\uE000-\uFFFF]|\\", re.UNICODE)
+# symbols not allowed in the surface form or lemma of collocation tokens
+INVALID_FORM_CHARS = frozenset("\"'@§!?;#*/&<>()_")
+VALID_FORM_CACHE_SIZE = 500_000
+
+_valid_forms: BoundedCache = BoundedCache(VALID_FORM_CACHE_SIZE)
 
 
 def remove_invalid_chars(unicode_string):
     return INVALID_CHARS.sub("", unicode_string) or "_"
 
 
-def is_valid_token(tok: WPToken) -> bool:
-    return not any(
-        [
-            len(tok.surface) < 2,
-            not tok.surface[0].isalpha(),
-            not tok.surface[-1].isalpha(),
-            any(c.isdigit() for c in tok.lemma),
-            any(c in "\"'@§!?;#*/&<>()_" for c in tok.surface),
-            any(c in "\"'@§!?;#*/&<>()_" for c in tok.lemma),
-            RE_GK_NORM_ERROR.match(tok.lemma),
-        ]
+def is_valid_form(surface: str, lemma: str) -> bool:
+    """Checks the surface form and lemma of a collocation token: the surface
+    has at least two characters and starts and ends with a letter, neither
+    contains special symbols, the lemma has no digits and no hyphenated
+    lowercase ending (normalization error)."""
+    return (
+        len(surface) >= 2
+        and surface[0].isalpha()
+        and surface[-1].isalpha()
+        and INVALID_FORM_CHARS.isdisjoint(surface)
+        and INVALID_FORM_CHARS.isdisjoint(lemma)
+        and not any(map(str.isdigit, lemma))
+        and not RE_GK_NORM_ERROR.match(lemma)
     )
 
 
+def is_valid_token(tok: WPToken) -> bool:
+    """Checks a token with `is_valid_form`.
+
+    Both tokens of every extracted match are checked, mostly with forms
+    checked before, hence the results are cached per surface and lemma.
+    """
+    key = (tok.surface, tok.lemma)
+    valid = _valid_forms.get(key)
+    if valid is None:
+        valid = is_valid_form(*key)
+        _valid_forms.add(key, valid)
+    return valid
+
+
 def valid_match(match: Match) -> bool:
     """
     Validates matches by specified criteria (surface form, special symbols,
@@ -36,11 +58,14 @@ def valid_match(match: Match) -> bool:
     return is_valid_token(match.head) and is_valid_token(match.dep)
 
 
-def extract_matches_from_doc(parses: list[list[WPToken]]) -> Iterator[Match]:
+def extract_matches_from_doc(
+    parses: list[list[WPToken]], offset: int = 0
+) -> Iterator[Match]:
     """
     Extracts valid matches from a given document (list of token sequences).
+    Sentence ids start at `offset` + 1, see `extract_matches`.
     """
-    return filter(valid_match, extract_matches(parses))
+    return filter(valid_match, extract_matches(parses, offset))
 
 
 def sent_filter_length(sentence: list[WPToken]) -> bool:
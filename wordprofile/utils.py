@@ -1,6 +1,32 @@
+import gzip
+import importlib.util
+import io
 import logging
 import os
 from datetime import date
+from typing import IO
+
+# fast levels, compressed files are intermediate results of the processing
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 1
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+class BoundedCache(dict):
+    """Dict that takes entries until it holds `maxsize` of them.
+
+    Entries are never evicted, so a lookup costs no more than a dict lookup,
+    unlike with `functools.lru_cache`. Keys added once the cache is full are
+    not cached.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+
+    def add(self, key, value) -> None:
+        if len(self) < self.maxsize:
+            self[key] = value
 
 
 def chunks(lst, n):
@@ -53,3 +79,49 @@ def configure_logs_to_file(level=logging.INFO, log_file_identifier="wp-logs"):
         format="%(asctime)s - %(levelname)s - %(name)s: %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
+
+
+def default_compression() -> str:
+    """Returns zstd if the zstandard package is installed, otherwise gzip."""
+    return "zstd" if importlib.util.find_spec("zstandard") else "gzip"
+
+
+def compressed_name(fname: str, compression: str | None) -> str:
+    """Appends the suffix of the compression to a file name."""
+    if compression is None:
+        return fname
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {compression}")
+    return fname + COMPRESSION_SUFFIXES[compression]
+
+
+def is_compressed(fname: str | os.PathLike) -> bool:
+    return os.fspath(fname).endswith(tuple(COMPRESSION_SUFFIXES.values()))
+
+
+def open_file(fname: str | os.PathLike, mode: str = "r") -> IO:
+    """Opens a file like `open`, compressed streams are detected by suffix.
+
+    Files ending with `.gz` are read and written as gzip streams, files
+    ending with `.zst` as zstd streams (requires the `zstandard` package).
+    Appending to a compressed file starts a new gzip member or zstd frame.
+    Text is encoded as UTF-8, independent of the locale.
+    """
+    fname = os.fspath(fname)
+    binary_mode = mode.replace("t", "") + ("" if "b" in mode else "b")
+    if fname.endswith(COMPRESSION_SUFFIXES["gzip"]):
+        fh: IO = gzip.open(fname, binary_mode, compresslevel=GZIP_LEVEL)
+    elif fname.endswith(COMPRESSION_SUFFIXES["zstd"]):
+        import zstandard
+
+        if "r" in mode:
+            fh = zstandard.ZstdDecompressor().stream_reader(
+                open(fname, "rb"), read_across_frames=True
+            )
+        else:
+            fh = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+                open(fname, binary_mode)
+            )
+    else:
+        return open(fname, mode, encoding=None if "b" in mode else "utf-8")
+    return fh if "b" in mode else io.TextIOWrapper(fh, encoding="utf-8")
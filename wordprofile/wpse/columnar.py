@@ -0,0 +1,241 @@
+"""Chunked columnar storage for extraction tables.
+
+A table file is a sequence of self-contained chunks of up to `CHUNK_ROWS`
+rows. The string values of a chunk are stored once in a dictionary shared
+by all string columns, the columns hold dictionary codes or integer values
+packed into the smallest fitting integer type. Chunks start with `MAGIC`,
+hence files can be concatenated and truncated at chunk boundaries, and an
+empty file is an empty table.
+
+Chunk layout (little-endian, sections padded to 8 bytes):
+
+    header     magic, number of rows, size of the dictionary, number of columns
+    specs      per column its kind (`s`: string, `i`: integer) and typecode
+    dictionary strings of the chunk, utf-8 encoded and joined by newlines
+    columns    one packed array of `rows` values per column
+
+Like the TSV tables, values must not contain newlines. Compressed table
+files are read as streams instead of memory maps.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from typing import BinaryIO, NamedTuple, Union
+
+from wordprofile.utils import is_compressed, open_file
+
+MAGIC = b"WPC1"
+CHUNK_ROWS = 65536
+CHUNK_HEADER = struct.Struct("<4sIIH")
+STRING = "s"
+INTEGER = "i"
+
+Value = Union[str, int]
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+def _typecode(values: Sequence[int]) -> str:
+    """Returns the typecode of the smallest integer array holding the values."""
+    low, high = min(values, default=0), max(values, default=0)
+    signed = low < 0
+    for typecode in "bhiq" if signed else "BHIQ":
+        bits = 8 * array(typecode).itemsize - signed
+        if -(1 << bits) <= low and high < 1 << bits:
+            return typecode
+    raise OverflowError(f"Integer column out of range: {low}..{high}")
+
+
+class ColumnarWriter:
+    """Writes rows to a columnar table file.
+
+    Provides the interface of the table writers used for TSV tables (see
+    `wordprofile.wpse.processing.open_table_writer`). Rows are buffered and
+    written in chunks of `chunk_rows` rows, `flush` writes the buffered rows
+    as a (smaller) chunk.
+
+    Args:
+        fh: binary file object
+        kinds: kind of each column, `s` for strings and `i` for integers
+        chunk_rows: maximal number of rows per chunk
+    """
+
+    def __init__(self, fh: BinaryIO, kinds: str, chunk_rows: int = CHUNK_ROWS) -> None:
+        self.fh = fh
+        self.kinds = kinds
+        self.chunk_rows = chunk_rows
+        self.rows: list[Iterable[Value]] = []
+
+    def put(self, rows: Iterable[Iterable[Value]]) -> None:
+        self.rows.extend(rows)
+        while len(self.rows) >= self.chunk_rows:
+            self._write_chunk(self.rows[: self.chunk_rows])
+            del self.rows[: self.chunk_rows]
+
+    def flush(self) -> None:
+        if self.rows:
+            self._write_chunk(self.rows)
+            self.rows = []
+        self.fh.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.fh.close()
+
+    def _write_chunk(self, rows: list[Iterable[Value]]) -> None:
+        codes: dict[str, int] = {}
+        specs = []
+        columns = []
+        for kind, values in zip(self.kinds, zip(*map(tuple, rows))):
+            if kind == STRING:
+                values = tuple(codes.setdefault(v, len(codes)) for v in values)
+            typecode = _typecode(values)
+            column = array(typecode, values)
+            if sys.byteorder == "big":
+                column.byteswap()
+            specs.append(kind + typecode)
+            columns.append(column.tobytes())
+        strings = "\n".join(codes).encode()
+        spec = "".join(specs).encode()
+        header = CHUNK_HEADER.pack(MAGIC, len(rows), len(strings), len(specs)) + spec
+        for section in [header, strings, *columns]:
+            self.fh.write(section)
+            self.fh.write(b"\0" * _padding(len(section)))
+
+
+class Chunk(NamedTuple):
+    """Chunk of a columnar table, see `read_chunks`."""
+
+    rows: int
+    kinds: str
+    strings: list[str]
+    columns: list[Sequence[int]]
+
+    def values(self, i: int) -> Sequence[Value]:
+        """Returns the decoded values of column i."""
+        if self.kinds[i] == STRING:
+            return list(map(self.strings.__getitem__, self.columns[i]))
+        return self.columns[i]
+
+
+def is_columnar(fname: str) -> bool:
+    """Checks whether a table file is a non-empty columnar table."""
+    with open_file(fname, "rb") as fh:
+        return fh.read(len(MAGIC)) == MAGIC
+
+
+def read_chunks(fname: str) -> Iterator[Chunk]:
+    """Reads the chunks of a columnar table from a memory map of the file.
+
+    Compressed files (see `wordprofile.utils.open_file`) are decompressed
+    chunk by chunk instead. The columns of a chunk are views into the
+    memory map or chunk buffer, they are valid only until the next chunk
+    is read.
+    """
+    if is_compressed(fname):
+        yield from _read_stream_chunks(fname)
+        return
+    if os.path.getsize(fname) == 0:
+        return
+    with (
+        open(fname, "rb") as fh,
+        mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+    ):
+        buf = memoryview(mm)
+        views: list[memoryview] = []
+        offset = 0
+        try:
+            while offset < len(buf):
+                chunk, views, offset = _parse_chunk(fname, buf, offset)
+                yield chunk
+                for view in views:
+                    view.release()
+                views = []
+        finally:
+            # the memory map can only be closed without views into it
+            for view in views:
+                view.release()
+            buf.release()
+
+
+def _read_stream_chunks(fname: str) -> Iterator[Chunk]:
+    with open_file(fname, "rb") as fh:
+        while header := _read_exactly(fh, CHUNK_HEADER.size):
+            if header[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"{fname}: no table chunk in stream")
+            _, rows, n_bytes, n_columns = CHUNK_HEADER.unpack(header)
+            size = 2 * n_columns
+            specs = _read_exactly(fh, size + _padding(CHUNK_HEADER.size + size))
+            size = n_bytes + _padding(n_bytes)
+            for typecode in specs[1 : 2 * n_columns : 2].decode():
+                column_size = rows * array(typecode).itemsize
+                size += column_size + _padding(column_size)
+            chunk, views, _ = _parse_chunk(
+                fname, memoryview(header + specs + _read_exactly(fh, size)), 0
+            )
+            yield chunk
+            for view in views:
+                view.release()
+
+
+def _read_exactly(fh: BinaryIO, size: int) -> bytes:
+    data = fh.read(size)
+    while 0 < len(data) < size and (more := fh.read(size - len(data))):
+        data += more
+    if 0 < len(data) < size:
+        raise ValueError("Truncated table chunk")
+    return data
+
+
+def _parse_chunk(
+    fname: str, buf: memoryview, offset: int
+) -> tuple[Chunk, list[memoryview], int]:
+    """Parses the chunk at the offset of the buffer.
+
+    Returns:
+        chunk, views of the chunk into the buffer, offset of the next chunk
+    """
+    if buf[offset : offset + len(MAGIC)] != MAGIC:
+        raise ValueError(f"{fname}: no table chunk at offset {offset}")
+    _, rows, n_bytes, n_columns = CHUNK_HEADER.unpack_from(buf, offset)
+    offset += CHUNK_HEADER.size
+    specs = bytes(buf[offset : offset + 2 * n_columns]).decode()
+    offset += 2 * n_columns
+    offset += _padding(offset)
+    strings = bytes(buf[offset : offset + n_bytes]).decode().split("\n")
+    offset += n_bytes + _padding(n_bytes)
+    views = []
+    columns: list[Sequence[int]] = []
+    for typecode in specs[1::2]:
+        size = rows * array(typecode).itemsize
+        view = buf[offset : offset + size].cast(typecode)
+        views.append(view)
+        offset += size + _padding(size)
+        if sys.byteorder == "big":
+            column = array(typecode, view.tobytes())
+            column.byteswap()
+            columns.append(column)
+        else:
+            columns.append(view)
+    return Chunk(rows, specs[::2], strings, columns), views, offset
+
+
+def read_rows(fname: str) -> Iterator[tuple[Value, ...]]:
+    """Reads the rows of a columnar table, strings decoded."""
+    for chunk in read_chunks(fname):
+        yield from zip(*(chunk.values(i) for i in range(len(chunk.kinds))))
+
+
+def convert_to_tsv(fin: str, fout: str) -> None:
+    """Writes a columnar table as TSV table, as written by the extraction."""
+    with open_file(fout, "w") as fh:
+        for row in read_rows(fin):
+            fh.write("\t".join(map(str, row)) + "\n")
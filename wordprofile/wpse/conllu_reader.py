@@ -0,0 +1,149 @@
+"""Streaming reader for annotated CoNLL-U corpora.
+
+In contrast to `conllu.parse_incr`, only the columns used for the collocation
+extraction are parsed and tokens are directly converted into `WPToken`s, just
+as `wordprofile.wpse.processing.convert_sentence` does for `conllu` token
+lists.
+"""
+
+import sys
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple, Optional
+
+from wordprofile.datatypes import WPToken
+from wordprofile.sentence_filter import remove_invalid_chars
+from wordprofile.utils import BoundedCache
+
+DOC_START = "DDC:meta.file_"
+LEMMA_TABLE_SIZE = 500_000
+
+_lemmas: BoundedCache = BoundedCache(LEMMA_TABLE_SIZE)
+
+
+class Document(NamedTuple):
+    """Document meta data (taken from its first sentence) and sentences."""
+
+    meta: dict[str, Optional[str]]
+    sentences: list[list[WPToken]]
+
+
+def case_by_tag(w: str, tag: str) -> str:
+    if tag in {"VERB", "ADJ", "ADV", "AUX", "ADP"}:
+        return w.lower()
+    elif tag == "NOUN":
+        return w[0].upper() + w[1:]
+    else:
+        return w
+
+
+def intern_lemma(lemma: str) -> str:
+    """Returns a shared instance of the lemma string.
+
+    Unlike tags and relations, lemmas are an open class, so the table holds
+    at most `LEMMA_TABLE_SIZE` lemmas. Once it is full, other lemmas are
+    returned as they are.
+    """
+    shared = _lemmas.get(lemma)
+    if shared is not None:
+        return shared
+    _lemmas.add(lemma, lemma)
+    return lemma
+
+
+def entity_tag_conversion(upos: str, misc: Optional[dict]) -> str:
+    if misc and "NamedEntity" in misc:
+        ner_tag = misc["NamedEntity"]
+        if (
+            ner_tag.endswith("PER")
+            or ner_tag.endswith("LOC")
+            or ner_tag.endswith("ORG")
+        ):
+            return "PROPN"
+    return upos
+
+
+def parse_nullable_value(value: str) -> Optional[str]:
+    if not value or value == "_":
+        return None
+    return value
+
+
+def parse_dict_value(value: str) -> Optional[dict[str, Optional[str]]]:
+    """Parses feats and misc columns like `conllu` does."""
+    if parse_nullable_value(value) is None:
+        return None
+    result: dict[str, Optional[str]] = {}
+    for part in value.split("|"):
+        key, sep, val = part.partition("=")
+        if parse_nullable_value(key) is None:
+            continue
+        result[key] = parse_nullable_value(val.split("=")[0]) if sep else ""
+    return result
+
+
+def parse_comment(line: str, meta: dict[str, Optional[str]]) -> None:
+    key, sep, value = line[1:].partition("=")
+    key = key.strip()
+    value = value.strip()
+    if key in {"newdoc", "newpar"}:
+        meta[key] = value if sep else None
+    elif key and value:
+        meta[key] = value
+
+
+def parse_token(line: str) -> Optional[WPToken]:
+    """Converts a token line, multi-word tokens and empty nodes are skipped."""
+    cols = line.split("\t")
+    idx = cols[0]
+    if not idx.isdigit():
+        return None
+    misc = parse_dict_value(cols[9]) if len(cols) > 9 else None
+    tag = sys.intern(entity_tag_conversion(cols[3], misc))
+    head = cols[6]
+    return WPToken(
+        idx=int(idx),
+        surface=remove_invalid_chars(cols[1]),
+        lemma=intern_lemma(case_by_tag(remove_invalid_chars(cols[2]), tag)),
+        tag=tag,
+        head=int(head) if head != "_" else None,  # type: ignore[arg-type]
+        rel=sys.intern(cols[7]),
+        misc=misc.get("SpaceAfter") == "No" if misc else False,
+        morph=parse_dict_value(cols[5]),
+        prt_pos=misc.get("compound:prt", None) if misc else None,  # type: ignore
+    )
+
+
+def parse_sentences(
+    lines: Iterable[str],
+) -> Iterator[tuple[dict[str, Optional[str]], list[WPToken]]]:
+    """Yields the meta data and tokens of each sentence."""
+    meta: dict[str, Optional[str]] = {}
+    tokens: list[WPToken] = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if meta or tokens:
+                yield meta, tokens
+                meta, tokens = {}, []
+        elif line[0] == "#":
+            parse_comment(line, meta)
+        else:
+            token = parse_token(line)
+            if token is not None:
+                tokens.append(token)
+    if meta or tokens:
+        yield meta, tokens
+
+
+def parse_documents(lines: Iterable[str]) -> Iterator[Document]:
+    """Groups sentences into documents, a document starts with a sentence
+    carrying the `DDC:meta.file_` meta data."""
+    doc: Optional[Document] = None
+    for meta, tokens in parse_sentences(lines):
+        if DOC_START in meta or doc is None:
+            if doc is not None:
+                yield doc
+            doc = Document(meta, [])
+        doc.sentences.append(tokens)
+    if doc is not None:
+        yield doc
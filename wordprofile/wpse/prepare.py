@@ -31,7 +31,7 @@ def prepare_corpus_file(meta: Metadata) -> tuple[str, DBCorpusFile]:
 
 
 def prepare_concord_sentences(
-    doc_id: str, parses: list[list[WPToken]]
+    doc_id: str, parses: list[list[WPToken]], offset: int = 0
 ) -> list[DBConcordance]:
     """Converts concordances into DB entries.
 
@@ -42,6 +42,7 @@ def prepare_concord_sentences(
     Args:
         doc_id: document id
         parses: list of valid sentences
+        offset: number of valid sentences of the document preceding parses
 
     Returns:
         List of concordances as database entries with encoded sentences.
@@ -58,7 +59,7 @@ def prepare_concord_sentences(
                 for tok in parse
             ),
         )
-        for sent_i, parse in enumerate(parses, 1)
+        for sent_i, parse in enumerate(parses, offset + 1)
     ]
 
 
@@ -1,27 +1,70 @@
 from __future__ import annotations
 
+import array
+import contextlib
+import functools
+import glob
 import gzip
-import hashlib
+import heapq
+import io
+import itertools
+import json
 import logging
 import math
 import multiprocessing
+import multiprocessing.connection
 import os
-import re
+import pickle
+import queue
 import sys
+import tempfile
+import threading
+import time
+import zlib
 from collections import Counter, defaultdict
-from collections.abc import Callable, Iterator
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from multiprocessing.queues import Queue
-from typing import Any, Protocol, Union
+from operator import attrgetter, itemgetter
+from typing import Any, NamedTuple, Optional, Protocol, TextIO, Union
 
 import conllu
-from conllu.models import Token, TokenList
-
+import numpy as np
+from conllu.models import TokenList
+
+from wordprofile.block_gzip import (
+    Block,
+    FileRange,
+    open_blocks,
+    read_index,
+    split_blocks,
+)
 from wordprofile.datatypes import Colloc, CollocInstance, DBMatch, WPToken
 from wordprofile.sentence_filter import (
     extract_matches_from_doc,
     remove_invalid_chars,
     sentence_is_valid,
 )
+from wordprofile.utils import (
+    COMPRESSION_SUFFIXES,
+    compressed_name,
+    is_compressed,
+    open_file,
+)
+from wordprofile.wpse import columnar
+from wordprofile.wpse.conllu_reader import (
+    DOC_START,
+    Document,
+    case_by_tag,
+    entity_tag_conversion,
+    intern_lemma,
+    parse_sentences,
+)
+from wordprofile.wpse.dedup import (
+    HashSet64,
+    SharedHashSet,
+    get_robust_hash,
+    get_robust_hash64,
+)
 from wordprofile.wpse.prepare import (
     prepare_concord_sentences,
     prepare_corpus_file,
@@ -32,6 +75,45 @@ logger = logging.getLogger(__name__)
 
 COLLOC_INSTANCE_DTYPES = [int, int, str, str, int, int, str, int, int]
 
+MANIFEST = "manifest.json"
+JOURNAL = "journal"
+STATE = "state"
+LEMMA_RUNS = "lemma_runs"
+COLLOCATION_RUNS = "collocation_runs"
+SURFACE_RUNS = "surface_runs"
+RUNS = (LEMMA_RUNS, COLLOCATION_RUNS, SURFACE_RUNS)
+FAILED_DOCUMENTS = "failed_documents"
+CHECKPOINT_INTERVAL = 1000
+# crashes of a worker while processing an item before the item is given up
+MAX_ITEM_ATTEMPTS = 2
+# seconds between checks for an abort by readers and workers blocked on the
+# reader queue
+ABORT_POLL_INTERVAL = 0.2
+# seconds given to the workers to stop after an abort before they are killed
+ABORT_TIMEOUT = 10
+# distinct keys counted by a counter of a worker before they are spilled to a
+# run file
+SPILL_LIMIT = 1_000_000
+# estimated memory of the aggregated collocations per byte of collocation
+# files, if all collocations are distinct
+COLLOCATION_MEMORY_FACTOR = 10
+# bucket files written at the same time by `partition_collocations`
+MAX_COLLOCATION_BUCKETS = 256
+PART_SUFFIX = ".part"
+SHARDED_TABLES = ("corpus_files", "concord_sentences", "matches")
+TABLE_FORMATS = ("tsv", "columnar")
+# column kinds of the tables written in columnar format
+COLUMNAR_TABLES = {"concord_sentences": "sis", "matches": "ssssssssiissi"}
+# tables written as compressed streams if a compression is chosen
+COMPRESSED_TABLES = ("concord_sentences", "matches")
+# columns of the corpus file and sentence ids of the tables sorted by
+# `sort_by_document`
+DOCUMENT_COLUMNS = {"concord_sentences": (0, 1), "matches": (11, 12)}
+# rows sorted in memory at once by `sort_table_rows`
+SORT_RUN_ROWS = 200_000
+# rows looked up in a `SentenceIndex` at once while filtering the tables
+FILTER_BATCH_ROWS = 100_000
+
 
 def convert_line(
     line: str, cls: Callable, dtypes: list[type]
@@ -43,50 +125,22 @@ def convert_sentence(sentence: TokenList) -> list[WPToken]:
     """Convert sentence into list of token.
 
     Sentences are normalized and filtered during this process.
-    If tags are not found in mapping, they are left empty.
+    If tags are not found in mapping, they are left empty. Tags, relations
+    and lemmas are interned to share the strings between tokens.
     """
-
-    def case_by_tag(w: str, tag: str) -> str:
-        if tag in {"VERB", "ADJ", "ADV", "AUX", "ADP"}:
-            return w.lower()
-        elif tag == "NOUN":
-            return w[0].upper() + w[1:]
-        else:
-            return w
-
-    def normalize_caps(t: WPToken) -> WPToken:
-        return WPToken(
-            idx=t.idx,
-            surface=t.surface,
-            lemma=case_by_tag(t.lemma, t.tag),
-            tag=t.tag,
-            head=t.head,
-            rel=t.rel,
-            misc=t.misc,
-            morph=t.morph,
-            prt_pos=t.prt_pos,
-        )
-
-    def entity_tag_conversion(token: Token) -> str:
-        if token["misc"] and "NamedEntity" in token["misc"]:
-            ner_tag = token["misc"]["NamedEntity"]
-            if (
-                ner_tag.endswith("PER")
-                or ner_tag.endswith("LOC")
-                or ner_tag.endswith("ORG")
-            ):
-                return "PROPN"
-        return token["upos"]
-
-    return [
-        normalize_caps(
+    parses = []
+    for token in sentence:
+        tag = sys.intern(entity_tag_conversion(token["upos"], token["misc"]))
+        parses.append(
             WPToken(
                 idx=token["id"],
                 surface=remove_invalid_chars(token["form"]),
-                lemma=remove_invalid_chars(token["lemma"]),
-                tag=entity_tag_conversion(token),
+                lemma=intern_lemma(
+                    case_by_tag(remove_invalid_chars(token["lemma"]), tag)
+                ),
+                tag=tag,
                 head=token["head"],
-                rel=token["deprel"],
+                rel=sys.intern(token["deprel"]),
                 misc=(
                     token["misc"].get("SpaceAfter") == "No" if token["misc"] else False
                 ),
@@ -94,8 +148,7 @@ def convert_sentence(sentence: TokenList) -> list[WPToken]:
                 prt_pos=(token["misc"] or {}).get("compound:prt", None),
             )
         )
-        for token in sentence
-    ]
+    return parses
 
 
 class FileReaderQueue(Protocol):
@@ -104,12 +157,178 @@ class FileReaderQueue(Protocol):
     def put(self, item: Any) -> None: ...
 
 
-class LemmaCounter:
-    def __init__(self) -> None:
+class ExtractionAborted(Exception):
+    """Raised by an `AbortableQueue` once the extraction is aborted."""
+
+
+class AbortableQueue:
+    """Reader queue whose blocking `get` and `put` raise `ExtractionAborted`
+    once the `abort` event is set.
+
+    Readers and workers of an aborted extraction are stopped this way, since
+    a process terminated while waiting in `get` of a native queue keeps its
+    read lock, and no other process can get items anymore.
+    """
+
+    def __init__(self, q: Any, abort: Any) -> None:
+        self.q = q
+        self.abort = abort
+
+    def get(self) -> Any:
+        while not self.abort.is_set():
+            try:
+                return self.q.get(timeout=ABORT_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        raise ExtractionAborted
+
+    def put(self, item: Any) -> None:
+        while not self.abort.is_set():
+            try:
+                self.q.put(item, timeout=ABORT_POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+        raise ExtractionAborted
+
+    def qsize(self) -> int:
+        return self.q.qsize()
+
+
+class QueueFactory(Protocol):
+    """Source of inter-process queues.
+
+    Both a `multiprocessing.Manager()` (proxied queues served by the manager
+    process) and a multiprocessing context (native pipe-backed queues) provide
+    this interface.
+    """
+
+    def Queue(self, maxsize: int = 0) -> Any: ...
+
+
+TRANSPORTS = ("manager", "native")
+READERS = ("conllu", "streaming")
+GZIP_MAGIC = b"\x1f\x8b"
+HASH_BITS = (64, 128)
+
+
+def get_queue_factory(
+    transport: str, manager: multiprocessing.managers.SyncManager
+) -> QueueFactory:
+    """Returns the queue factory for a transport mode.
+
+    'manager' routes all items through the manager server process, whereas
+    'native' uses `multiprocessing.Queue`, which sends pickled items directly
+    through a pipe between producer and consumer.
+    """
+    if transport == "manager":
+        return manager
+    if transport == "native":
+        return multiprocessing.get_context()
+    raise ValueError(f"Unknown transport: {transport}")
+
+
+class RunCounter:
+    """Counts string keys of a worker, e.g. lemmas.
+
+    If a `spill_prefix` is given, the counts are written to sorted run files
+    `<spill_prefix>.<run>` once more than `spill_limit` distinct keys are
+    counted, and at every checkpoint of a `Journal` (see `spill`). `counts`
+    merges the runs with the remaining counts.
+    """
+
+    def __init__(
+        self, spill_prefix: Optional[str] = None, spill_limit: int = SPILL_LIMIT
+    ) -> None:
         self.freqs: Counter[str] = Counter()
+        self.spill_prefix = spill_prefix
+        self.spill_limit = spill_limit
+        self.runs: list[str] = []
+        # number of spills merged into each run, as power of two
+        self.levels: list[int] = []
+        self.obsolete_runs: list[str] = []
+        self.next_run = 0
+
+    def spill_if_full(self) -> None:
+        if self.spill_prefix is not None and len(self.freqs) > self.spill_limit:
+            self.spill()
+
+    def spill(self) -> None:
+        """Writes the counts sorted by key to a new run file and resets them.
+        Without a `spill_prefix`, the counts are kept.
+
+        Runs of the same level are merged into a run of the next level, like
+        the digits of a binary counter, hence a counter spilled n times has
+        at most log2(n) + 1 runs and every count is merged log2(n) times at
+        most. The merged runs are obsolete, but kept until
+        `remove_obsolete_runs`, since a saved state may still refer to them.
+        Runs are synced to disk, since journals refer to them.
+        """
+        if not self.freqs or self.spill_prefix is None:
+            return
+        self._write_run(sorted(self.freqs.items()), 0)
+        self.freqs = Counter()
+        while len(self.levels) > 1 and self.levels[-1] == self.levels[-2]:
+            merged = self.runs[-2:]
+            level = self.levels[-1] + 1
+            del self.runs[-2:], self.levels[-2:]
+            self._write_run(merge_counts(map(read_run, merged)), level)
+            self.obsolete_runs.extend(merged)
+
+    def _write_run(self, counts: Iterable[tuple[str, int]], level: int) -> None:
+        fname = f"{self.spill_prefix}.{self.next_run}"
+        with open(fname, "w") as fh:
+            for key, freq in counts:
+                fh.write(f"{key}\t{freq}\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.runs.append(fname)
+        self.levels.append(level)
+        self.next_run += 1
+
+    def remove_obsolete_runs(self) -> None:
+        for fname in self.obsolete_runs:
+            os.remove(fname)
+        self.obsolete_runs = []
+
+    def remove_unlisted_runs(self) -> None:
+        """Removes the run files of the prefix not listed in the runs of this
+        counter: runs spilled or merged after its state was saved, and runs
+        obsolete since."""
+        for fname in glob.glob(glob.escape(self.spill_prefix) + ".*"):
+            if fname.rpartition(".")[2].isdigit() and fname not in self.runs:
+                os.remove(fname)
+        self.obsolete_runs = []
+
+    def counts(self) -> Iterator[tuple[str, int]]:
+        """Returns the counts of the runs and the remaining counts, sorted by
+        key."""
+        return merge_counts([sorted(self.freqs.items()), *map(read_run, self.runs)])
+
+
+def read_run(fname: str) -> Iterator[tuple[str, int]]:
+    with open(fname) as fh:
+        for line in fh:
+            key, freq = line.rstrip("\n").rsplit("\t", 1)
+            yield key, int(freq)
+
+
+def merge_counts(
+    runs: Iterable[Iterable[tuple[str, int]]],
+) -> Iterator[tuple[str, int]]:
+    """Merges runs of counts sorted by key, equal keys are summed up."""
+    merged = heapq.merge(*runs, key=itemgetter(0))
+    for key, counts in itertools.groupby(merged, key=itemgetter(0)):
+        yield key, sum(freq for _, freq in counts)
+
+
+class LemmaCounter(RunCounter):
+    """Counts the lemmas of the sentences of a worker, keyed by lemma and tag
+    (see `RunCounter`). The counts are merged by `save_lemma_counts_to_file`.
+    """
 
     def count_token(self, parses: list[list[WPToken]]) -> None:
-        lemmata = [
+        self.freqs.update(
             "\t".join((tok.lemma, tok.tag))
             for sent in parses
             for tok in sent
@@ -127,8 +346,134 @@ class LemmaCounter:
                 "INTJ",
                 "PROPN",
             }
-        ]
-        self.freqs += Counter(lemmata)
+        )
+        self.spill_if_full()
+
+
+def format_rows(db_batch: list) -> list[str]:
+    return ["\t".join(map(str, x)) + "\n" for x in db_batch]
+
+
+class TsvWriter:
+    """Writes rows to a TSV table file."""
+
+    def __init__(self, fh: TextIO) -> None:
+        self.fh = fh
+
+    def put(self, db_batch: list) -> None:
+        self.fh.writelines(format_rows(db_batch))
+
+    def flush(self) -> None:
+        self.fh.flush()
+
+    def close(self) -> None:
+        self.fh.close()
+
+
+def open_table_writer(
+    fname: str, table: str, table_format: str = "tsv", mode: str = "w"
+) -> Union[TsvWriter, columnar.ColumnarWriter]:
+    """Opens a writer for an extraction table.
+
+    With the `columnar` format, the tables listed in `COLUMNAR_TABLES` are
+    written in the columnar format (see `wordprofile.wpse.columnar`), all
+    other tables are written as TSV.
+    """
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format: {table_format}")
+    if table_format == "columnar" and table in COLUMNAR_TABLES:
+        return columnar.ColumnarWriter(
+            open_file(fname, mode + "b"), COLUMNAR_TABLES[table]
+        )
+    return TsvWriter(open_file(fname, mode))
+
+
+def read_table_rows(
+    fname: str, start: int = 0, end: Optional[int] = None
+) -> Iterator[Sequence]:
+    """Reads the rows of an extraction table file of either format.
+
+    Values of TSV tables are strings, columnar tables hold integers in their
+    integer columns. With an `end`, only the lines of an uncompressed TSV
+    table between the byte offsets `start` and `end` are read (see
+    `table_ranges`).
+    """
+    if end is not None:
+        with io.TextIOWrapper(
+            io.BufferedReader(FileRange(fname, start, end)), encoding="utf-8"
+        ) as fh:
+            for line in fh:
+                yield line.rstrip("\n").split("\t")
+    elif columnar.is_columnar(fname):
+        yield from columnar.read_rows(fname)
+    else:
+        with open_file(fname) as fh:
+            for line in fh:
+                yield line.rstrip("\n").split("\t")
+
+
+class MatchCounter:
+    """Counts collocations and surface forms of the matches of a worker.
+
+    Aggregating during extraction saves re-reading the matches for
+    `extract_collocations` and `extract_most_common_surface`. Collocations
+    are keyed by relation, lemmas, tags and preposition, surface forms by
+    tag, lemma and surface, as tab-separated fields. Both are spilled to runs
+    like the lemmas (see `RunCounter`) and merged by
+    `save_match_counts_to_file`.
+    """
+
+    def __init__(
+        self,
+        collocation_prefix: Optional[str] = None,
+        surface_prefix: Optional[str] = None,
+        spill_limit: int = SPILL_LIMIT,
+    ) -> None:
+        self.collocations = RunCounter(collocation_prefix, spill_limit)
+        self.surfaces = RunCounter(surface_prefix, spill_limit)
+
+    def count_matches(self, db_matches: list[DBMatch]) -> None:
+        collocations, surfaces = self.collocations.freqs, self.surfaces.freqs
+        for m in db_matches:
+            collocations[
+                "\t".join(
+                    (
+                        m.relation_label,
+                        m.head_lemma,
+                        m.dep_lemma,
+                        m.head_tag,
+                        m.dep_tag,
+                        m.prep,
+                    )
+                )
+            ] += 1
+            surfaces["\t".join((m.head_tag, m.head_lemma, m.head_surface))] += 1
+            surfaces["\t".join((m.dep_tag, m.dep_lemma, m.dep_surface))] += 1
+        self.collocations.spill_if_full()
+        self.surfaces.spill_if_full()
+
+    def spill(self) -> None:
+        self.collocations.spill()
+        self.surfaces.spill()
+
+    def remove_obsolete_runs(self) -> None:
+        self.collocations.remove_obsolete_runs()
+        self.surfaces.remove_obsolete_runs()
+
+    def remove_unlisted_runs(self) -> None:
+        self.collocations.remove_unlisted_runs()
+        self.surfaces.remove_unlisted_runs()
+
+
+def shard_counters(storage_path: str, shard: int) -> tuple[LemmaCounter, MatchCounter]:
+    """Returns the counters of a worker, spilling to run files of its shard."""
+
+    def prefix(runs: str) -> str:
+        return os.path.join(storage_path, shard_name(runs, shard))
+
+    return LemmaCounter(prefix(LEMMA_RUNS)), MatchCounter(
+        prefix(COLLOCATION_RUNS), prefix(SURFACE_RUNS)
+    )
 
 
 class FileWorker(multiprocessing.Process):
@@ -136,30 +481,38 @@ class FileWorker(multiprocessing.Process):
         self,
         path: str,
         fname: str,
-        manager: multiprocessing.managers.SyncManager,
+        queues: QueueFactory,
         flush_limit: int = 100,
+        table_format: str = "tsv",
+        compression: Optional[str] = None,
     ) -> None:
-        self.q = manager.Queue(maxsize=1000)
+        self.q = queues.Queue(maxsize=1000)
         self.path = path
         self.fname = fname
         self.flush_limit = flush_limit
+        self.table_format = table_format
+        self.compression = compression
         super().__init__()
 
     def run(self) -> None:
         logger.info("INIT queue, wait for jobs")
         flush_ctr = 0
-        with open(os.path.join(self.path, self.fname), "w") as fh:
+        writer = open_table_writer(
+            os.path.join(self.path, compressed_name(self.fname, self.compression)),
+            self.fname,
+            self.table_format,
+        )
+        with contextlib.closing(writer):
             while True:
                 db_batch = self.q.get()
                 if db_batch is None:
                     logger.info("{:10} - CLOSE queue".format(self.fname))
                     break
                 try:
-                    items = ["\t".join(map(str, x)) + "\n" for x in db_batch]
-                    fh.writelines(items)
+                    writer.put(db_batch)
                     flush_ctr += 1
                     if flush_ctr >= self.flush_limit:
-                        fh.flush()
+                        writer.flush()
                         flush_ctr = 0
                 except Exception as e:
                     logger.exception(e)
@@ -168,36 +521,736 @@ class FileWorker(multiprocessing.Process):
         self.q.put(None)
 
 
+STAT_FIELDS = ("documents", "sentences", "invalid_sentences", "matches")
+
+
+class WorkerStats:
+    """Counters of an extraction worker, read by the `QueueMonitor`.
+
+    The counters are kept in shared memory and written by the worker only.
+    """
+
+    def __init__(self) -> None:
+        self.counts = multiprocessing.RawArray("Q", len(STAT_FIELDS))
+
+    def add(
+        self, documents: int, sentences: int, invalid_sentences: int, matches: int
+    ) -> None:
+        counts = self.counts
+        counts[0] += documents
+        counts[1] += sentences
+        counts[2] += invalid_sentences
+        counts[3] += matches
+
+    def totals(self) -> dict[str, int]:
+        return dict(zip(STAT_FIELDS, self.counts))
+
+
+def process_rss(pid: Optional[int]) -> Optional[int]:
+    """Returns the resident set size of a process in bytes, if available."""
+    try:
+        with open(f"/proc/{pid}/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class QueueMonitor(threading.Thread):
+    """Logs the number of items waiting in the queues every `interval` seconds.
+
+    If a `stats_file` is given, a JSON object is written to it as line at
+    every interval and when the monitor is stopped, with the seconds since
+    the start, the queue depths, the totals and rates per second of the
+    `workers` since the previous line, and the resident set size of the
+    processes returned by `processes` (see `process_rss`). The processes are
+    looked up at every line, since crashed workers may have been restarted.
+    """
+
+    def __init__(
+        self,
+        queues: dict[str, Any],
+        interval: float,
+        stats_file: Optional[str] = None,
+        workers: Optional[dict[str, WorkerStats]] = None,
+        processes: Optional[Callable[[], dict[str, Any]]] = None,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.queues = queues
+        self.interval = interval
+        self.stats_file = stats_file
+        self.workers = workers or {}
+        self.processes = processes or dict
+        self.stopped = threading.Event()
+        self.start_time = self.last_time = time.monotonic()
+        self.last_totals = {name: w.totals() for name, w in self.workers.items()}
+
+    def depths(self) -> dict[str, int]:
+        depths = {}
+        for name, queue in self.queues.items():
+            try:
+                depths[name] = queue.qsize()
+            except NotImplementedError:
+                # native queues do not support qsize on macOS
+                pass
+        return depths
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        elapsed = max(now - self.last_time, 1e-9)
+        workers = {}
+        for name, worker in self.workers.items():
+            totals = worker.totals()
+            last = self.last_totals[name]
+            rates = {
+                f"{field}_per_s": (totals[field] - last[field]) / elapsed
+                for field in ("documents", "sentences", "matches")
+            }
+            workers[name] = {
+                **totals,
+                **rates,
+                "invalid_share": totals["invalid_sentences"]
+                / max(1, totals["sentences"]),
+            }
+            self.last_totals[name] = totals
+        self.last_time = now
+        return {
+            "time": now - self.start_time,
+            "queues": self.depths(),
+            "workers": workers,
+            "rss": {
+                "main": process_rss(os.getpid()),
+                **{
+                    name: process_rss(process.pid)
+                    for name, process in self.processes().items()
+                },
+            },
+        }
+
+    def run(self) -> None:
+        fh = open(self.stats_file, "w") if self.stats_file else None
+        while not self.stopped.wait(self.interval):
+            logger.info(
+                "QUEUE depths: %s"
+                % " ".join(f"{name}={depth}" for name, depth in self.depths().items())
+            )
+            if fh is not None:
+                fh.write(json.dumps(self.stats()) + "\n")
+                fh.flush()
+        if fh is not None:
+            fh.write(json.dumps(self.stats()) + "\n")
+            fh.close()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+class ShardWriter:
+    """Writes the results of a single extraction worker to its own table shard.
+
+    Provides the queue interface used by `process_doc_file`, rows are written
+    directly into the file `<fname>.<shard>.part` instead of being sent to a
+    central `FileWorker`. The part file is renamed to `<fname>.<shard>` when
+    the extraction is finalized. If `size` is given, a previous part file is
+    truncated to this size and continued. With a `compression`, its suffix
+    is appended to both names.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fname: str,
+        shard: int,
+        size: Optional[int] = None,
+        table_format: str = "tsv",
+        compression: Optional[str] = None,
+    ) -> None:
+        self.table = fname
+        self.table_format = table_format
+        self.fname = compressed_name(shard_name(fname, shard), compression)
+        self.part_file = os.path.join(
+            path, compressed_name(shard_name(fname, shard) + PART_SUFFIX, compression)
+        )
+        if size is None:
+            self.writer = open_table_writer(self.part_file, fname, table_format)
+        else:
+            if not os.path.exists(self.part_file):
+                # the previous run was interrupted during finalization
+                os.replace(os.path.join(path, self.fname), self.part_file)
+            os.truncate(self.part_file, size)
+            self.writer = open_table_writer(self.part_file, fname, table_format, "a")
+        self.fh = self.writer.fh
+
+    def put(self, db_batch: list) -> None:
+        self.writer.put(db_batch)
+
+    def sync(self) -> int:
+        """Writes all rows to disk and returns the size of the shard."""
+        self.writer.flush()
+        if not is_compressed(self.part_file):
+            os.fsync(self.fh.fileno())
+            return os.fstat(self.fh.fileno()).st_size
+        # a compressed shard is readable only up to the end of a stream, the
+        # stream is closed and further rows are appended as a new stream
+        self.writer.close()
+        fd = os.open(self.part_file, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        self.writer = open_table_writer(
+            self.part_file, self.table, self.table_format, "a"
+        )
+        self.fh = self.writer.fh
+        return size
+
+    def close(self) -> None:
+        self.writer.close()
+
+    def __enter__(self) -> ShardWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class DocumentChunk(NamedTuple):
+    """Consecutive sentences of a large document, split by the `FileReader`.
+
+    The sentences are already converted. `index` numbers the chunks of a
+    document and `sentence_offset` is the number of valid sentences (see
+    `sentence_is_valid`) in the preceding chunks, the ids of the valid
+    sentences of the chunk continue from there.
+    """
+
+    meta: dict[str, Any]
+    index: int
+    sentence_offset: int
+    sentences: list[list[WPToken]]
+
+
+class InputDocument(NamedTuple):
+    """Document with its position in the input, sent for journaled runs.
+
+    For chunks of a document, `chunk` is the index of the chunk.
+    """
+
+    path: str
+    offset: int
+    doc_id: str
+    document: Union[list[TokenList], Document, DocumentChunk]
+    chunk: Optional[int] = None
+
+
+class DocumentBatch(NamedTuple):
+    """Documents sent as a single item to reduce the per item overhead."""
+
+    documents: list[Any]
+
+
+class TrackedItem(NamedTuple):
+    """Item of the reader queue kept by the `Supervisor` until committed."""
+
+    seq: int
+    item: Any
+
+
+class InFlightItems:
+    """Sequence numbers of the `TrackedItem`s a worker took since its last
+    journal checkpoint, in shared memory.
+
+    On a checkpoint, the numbers are sent to the `acks` queue, which lets the
+    `Supervisor` release the items. If the worker dies, the supervisor hands
+    the items taken but not committed to its replacement. `finished` is set
+    once the worker took its stop signal.
+    """
+
+    def __init__(self, capacity: int, acks: Any) -> None:
+        self.seqs = multiprocessing.RawArray("Q", capacity)
+        self.count = multiprocessing.RawValue("Q", 0)
+        self.finished = multiprocessing.RawValue("b", 0)
+        self.acks = acks
+
+    def take(self, seq: int) -> None:
+        self.seqs[self.count.value] = seq
+        self.count.value += 1
+
+    def taken(self) -> list[int]:
+        return list(self.seqs[: self.count.value])
+
+    def commit(self) -> None:
+        self.acks.put(self.taken())
+        self.count.value = 0
+
+    def reset(self) -> None:
+        self.count.value = 0
+        self.finished.value = 0
+
+
+def count_document_tokens(
+    document: Union[list[TokenList], Document, DocumentChunk],
+) -> int:
+    if isinstance(document, (Document, DocumentChunk)):
+        sentences = document.sentences
+    else:
+        sentences = document
+    return sum(len(sentence) for sentence in sentences)
+
+
+class Journal:
+    """Progress journal of a sharded extraction worker.
+
+    Every processed document is appended to `journal.<shard>` with its input
+    file and offset. Every `checkpoint_interval` documents, the shards are
+    synced, the counts since the last checkpoint are spilled to runs (see
+    `RunCounter`), and the sizes of the shards and the journal are stored
+    together with the worker's counters in `state.<shard>`. The counters
+    hold no counts then, only the names of their runs, so apart from merging
+    runs, a checkpoint takes time in proportion to the documents since the
+    last one. Replacing this
+    file commits all documents processed so far. On resume, shards and
+    journal are truncated to the last committed state, and runs not in the
+    state are removed.
+
+    Checkpoints are made by `checkpoint_if_due` between items of the reader
+    queue. With `in_flight`, the state lists the items committed by the
+    checkpoint (see `InFlightItems`).
+    """
+
+    def __init__(
+        self,
+        storage_path: str,
+        shard: int,
+        resume: bool = False,
+        checkpoint_interval: int = CHECKPOINT_INTERVAL,
+        table_format: str = "tsv",
+        compression: Optional[str] = None,
+        in_flight: Optional[InFlightItems] = None,
+    ) -> None:
+        self.state_file = os.path.join(storage_path, shard_name(STATE, shard))
+        journal_file = os.path.join(storage_path, shard_name(JOURNAL, shard))
+        state = read_state(self.state_file) if resume else None
+        self.writers = [
+            ShardWriter(
+                storage_path,
+                table,
+                shard,
+                state["sizes"][table] if state else None,
+                table_format,
+                compression if table in COMPRESSED_TABLES else None,
+            )
+            for table in SHARDED_TABLES
+        ]
+        if state:
+            os.truncate(journal_file, state["journal"])
+            self.fh = open(journal_file, "a")
+            self.lemma_counter = state["lemma_counter"]
+            self.lemma_counter.remove_unlisted_runs()
+            self.match_counter = state["match_counter"]
+            self.match_counter.remove_unlisted_runs()
+        else:
+            self.fh = open(journal_file, "w")
+            self.lemma_counter, self.match_counter = shard_counters(storage_path, shard)
+        self.checkpoint_interval = checkpoint_interval
+        self.in_flight = in_flight
+        self.uncommitted = 0
+
+    def record(self, position: InputDocument) -> None:
+        self.fh.write(format_position(position))
+        self.uncommitted += 1
+
+    def checkpoint_if_due(self) -> None:
+        if self.uncommitted >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        self.fh.flush()
+        os.fsync(self.fh.fileno())
+        self.lemma_counter.spill()
+        self.match_counter.spill()
+        state = {
+            "sizes": {
+                table: writer.sync()
+                for table, writer in zip(SHARDED_TABLES, self.writers)
+            },
+            "journal": os.fstat(self.fh.fileno()).st_size,
+            "lemma_counter": self.lemma_counter,
+            "match_counter": self.match_counter,
+            "items": self.in_flight.taken() if self.in_flight else [],
+        }
+        with open(self.state_file + ".tmp", "wb") as fh:
+            pickle.dump(state, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(self.state_file + ".tmp", self.state_file)
+        self.lemma_counter.remove_obsolete_runs()
+        self.match_counter.remove_obsolete_runs()
+        self.uncommitted = 0
+        if self.in_flight is not None:
+            self.in_flight.commit()
+
+    def close(self) -> None:
+        self.checkpoint()
+        self.fh.close()
+        for writer in self.writers:
+            writer.close()
+
+
+def format_position(position: InputDocument) -> str:
+    """Formats the position of a document as line of a journal."""
+    offset = position.offset
+    if position.chunk is not None:
+        offset = f"{offset}.{position.chunk}"
+    return f"{position.path}\t{offset}\t{position.doc_id}\n"
+
+
+def read_state(state_file: str) -> Optional[dict]:
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, "rb") as fh:
+        return pickle.load(fh)
+
+
+def read_journals(
+    storage_path: str, njobs: int
+) -> dict[str, set[Union[int, tuple[int, int]]]]:
+    """Collects the committed documents of all journals of a storage path.
+
+    Returns:
+        input offsets of finished documents, and (offset, index) pairs of
+        finished chunks of split documents, by input file
+    """
+    done: dict[str, set[Union[int, tuple[int, int]]]] = defaultdict(set)
+    for fname in os.listdir(storage_path):
+        table, _, shard = fname.partition(".")
+        if table == STATE and shard.isdigit() and int(shard) >= njobs:
+            raise ValueError(
+                f"Cannot resume shard {shard} of an extraction with {njobs} jobs"
+            )
+    for shard in range(njobs):
+        state = read_state(os.path.join(storage_path, shard_name(STATE, shard)))
+        if state is None:
+            continue
+        journal_file = os.path.join(storage_path, shard_name(JOURNAL, shard))
+        with open(journal_file) as fh:
+            for line in fh.read(state["journal"]).splitlines():
+                path, offset, _ = line.split("\t")
+                if "." in offset:
+                    offset, chunk = offset.split(".")
+                    done[path].add((int(offset), int(chunk)))
+                else:
+                    done[path].add(int(offset))
+    return done
+
+
+def remove_journals(storage_path: str) -> None:
+    for fname in os.listdir(storage_path):
+        table, _, shard = fname.partition(".")
+        if table in (JOURNAL, STATE, *RUNS) and shard.split(".")[0].isdigit():
+            os.remove(os.path.join(storage_path, fname))
+
+
+def shard_name(fname: str, shard: int) -> str:
+    return f"{fname}.{shard}"
+
+
+def write_manifest(storage_path: str, tables: dict[str, list[str]]) -> None:
+    """Lists the files of every table of a sharded extraction."""
+    manifest_file = os.path.join(storage_path, MANIFEST)
+    with open(manifest_file + ".tmp", "w") as fh:
+        json.dump({"tables": tables}, fh, indent=2)
+    os.replace(manifest_file + ".tmp", manifest_file)
+
+
+def table_ranges(fname: str, n: int) -> list[tuple[str, int, Optional[int]]]:
+    """Splits a table file into at most n ranges of whole lines of about equal
+    size, as arguments of `read_table_rows`.
+
+    Only uncompressed TSV tables are split, other tables are a single range.
+    """
+    if n <= 1 or is_compressed(fname) or columnar.is_columnar(fname):
+        return [(fname, 0, None)]
+    size = os.path.getsize(fname)
+    offsets = [0]
+    with open(fname, "rb") as fh:
+        for i in range(1, n):
+            # the next range starts after the end of the line at the split
+            fh.seek(max(size * i // n, offsets[-1] + 1) - 1)
+            fh.readline()
+            if fh.tell() >= size:
+                break
+            offsets.append(fh.tell())
+    return [(fname, start, end) for start, end in zip(offsets, offsets[1:] + [size])]
+
+
+def table_files(path: str) -> list[str]:
+    """Resolves the path of an extraction table to the files containing it.
+
+    If the extraction directory holds a manifest listing the table, the
+    table's shard files are returned. Otherwise, the table is a single file,
+    possibly compressed (see `wordprofile.utils.open_file`).
+    """
+    storage_path, table = os.path.split(path)
+    manifest_file = os.path.join(storage_path, MANIFEST)
+    if os.path.exists(manifest_file):
+        with open(manifest_file) as fh:
+            manifest = json.load(fh)
+        if table in manifest["tables"]:
+            return [os.path.join(storage_path, f) for f in manifest["tables"][table]]
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if not os.path.exists(path) and os.path.exists(path + suffix):
+            return [path + suffix]
+    return [path]
+
+
 class FileReader:
-    def __init__(self, paths: list[str], queue: FileReaderQueue) -> None:
+    """Reads documents from conll files and puts them into the queue.
+
+    The 'conllu' reader sends documents as lists of `conllu` token lists,
+    the 'streaming' reader parses only the required columns and sends
+    `Document`s with already converted sentences.
+
+    If `skip` is given, documents are sent as `InputDocument`s with their
+    position in the input, documents at the offsets in `skip` are left out.
+    With `batch_tokens` > 0, documents are collected into `DocumentBatch`es
+    of at least this number of tokens (or the rest of an input file).
+
+    With `chunk_sentences` > 0, documents with more sentences are sent as
+    `DocumentChunk`s of this many sentences, hence at most this many
+    sentences of a document are held in memory. The sentences of the chunks
+    are converted and counted by the reader to number them consistently.
+    Chunks are skipped by their offset and index.
+
+    Block-compressed input files with an index (see
+    `wordprofile.block_gzip`) are split into ranges of blocks, which are
+    read in parallel by several reader processes.
+    """
+
+    def __init__(
+        self,
+        paths: list[str],
+        queue: FileReaderQueue,
+        reader: str = "conllu",
+        skip: Optional[dict[str, set[Union[int, tuple[int, int]]]]] = None,
+        batch_tokens: int = 0,
+        chunk_sentences: int = 0,
+    ) -> None:
+        if reader not in READERS:
+            raise ValueError(f"Unknown reader: {reader}")
         self.q = queue
         self.paths = paths
-
-    def _process_content(self, file_handle) -> None:
-        conll_sentences = conllu.parse_incr(
-            file_handle, fields=conllu.parser.DEFAULT_FIELDS
+        self.reader = reader
+        self.skip = skip
+        self.batch_tokens = batch_tokens
+        self.chunk_sentences = chunk_sentences
+        self.batch: list[Any] = []
+        self.batch_size = 0
+        self.first_document = 0
+
+    def _put(
+        self, file: str, doc_ids: list[str], document: Any, chunk: Optional[int] = None
+    ) -> None:
+        offset = self.first_document + len(doc_ids) - 1
+        if self.skip is not None:
+            key = offset if chunk is None else (offset, chunk)
+            if key in self.skip.get(file, ()):
+                return
+            document = InputDocument(file, offset, doc_ids[-1], document, chunk)
+        if not self.batch_tokens:
+            self.q.put(document)
+            return
+        self.batch.append(document)
+        self.batch_size += count_document_tokens(
+            document.document if self.skip is not None else document
         )
-        doc: list[TokenList] = []
-        for sent in conll_sentences:
-            if "DDC:meta.file_" in sent.metadata:
-                if doc:
-                    self.q.put(doc)
-                doc = []
+        if self.batch_size >= self.batch_tokens:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self.batch:
+            self.q.put(DocumentBatch(self.batch))
+        self.batch = []
+        self.batch_size = 0
+
+    def _put_chunk(
+        self,
+        file: str,
+        doc_ids: list[str],
+        meta: dict[str, Any],
+        sentences: list[Any],
+        index: int,
+        sentence_offset: int,
+    ) -> int:
+        """Sends a chunk of a document and returns its number of valid sentences.
+
+        Chunks whose sentences cannot be converted are logged and left out.
+        """
+        n_valid = 0
+        with document_errors_logged(doc_ids[-1]):
+            if self.reader != "streaming":
+                sentences = list(map(convert_sentence, sentences))
+            n_valid = sum(map(sentence_is_valid, sentences))
+            chunk = DocumentChunk(meta, index, sentence_offset, sentences)
+            self._put(file, doc_ids, chunk, index)
+        return n_valid
+
+    def _put_document(
+        self,
+        file: str,
+        doc_ids: list[str],
+        meta: dict[str, Any],
+        sentences: list[Any],
+        n_chunks: int,
+        sentence_offset: int,
+    ) -> None:
+        if n_chunks == 0:
+            if self.reader == "streaming":
+                self._put(file, doc_ids, Document(meta, sentences))
+            else:
+                self._put(file, doc_ids, sentences)
+        elif sentences:
+            self._put_chunk(file, doc_ids, meta, sentences, n_chunks, sentence_offset)
+
+    def _process_content(self, file_handle, file: str) -> list[str]:
+        if self.reader == "streaming":
+            sentences: Iterable[tuple[dict[str, Any], Any]] = parse_sentences(
+                file_handle
+            )
+        else:
+            sentences = (
+                (sent.metadata, sent)
+                for sent in conllu.parse_incr(
+                    file_handle, fields=conllu.parser.DEFAULT_FIELDS
+                )
+            )
+        doc_ids: list[str] = []
+        meta: Optional[dict[str, Any]] = None
+        doc: list[Any] = []
+        n_chunks = n_valid = 0
+        for sent_meta, sent in sentences:
+            if DOC_START in sent_meta or meta is None:
+                if meta is not None:
+                    self._put_document(file, doc_ids, meta, doc, n_chunks, n_valid)
+                meta, doc, n_chunks, n_valid = sent_meta, [], 0, 0
+                doc_ids.append(str(meta.get(DOC_START)))
             doc.append(sent)
-        self.q.put(doc)
+            if self.chunk_sentences and len(doc) >= self.chunk_sentences:
+                n_valid += self._put_chunk(file, doc_ids, meta, doc, n_chunks, n_valid)
+                doc, n_chunks = [], n_chunks + 1
+        if meta is not None:
+            self._put_document(file, doc_ids, meta, doc, n_chunks, n_valid)
+        return doc_ids
+
+    def read_file(self, file: str, blocks: Optional[list[Block]] = None) -> list[str]:
+        """Reads documents of a file into the queue and returns their ids.
+
+        If `blocks` are given, only the documents of this range of blocks of
+        a block-compressed file are read.
+        """
+        self.first_document = blocks[0].first_document if blocks else 0
+        if file == "-":
+            doc_ids = self._process_content(sys.stdin, file)
+        elif blocks:
+            with open_blocks(file, blocks) as fh:
+                doc_ids = self._process_content(fh, str(file))
+        else:
+            with open_conllu(file) as fh:
+                doc_ids = self._process_content(fh, str(file))
+        self._flush()
+        return doc_ids
 
-    def run(self) -> None:
+    def run(self, nreaders: int = 1) -> None:
+        """Reads all files, with `nreaders` > 1 files, and the block ranges of
+        indexed files, are distributed over several reader processes.
+
+        The ids of the documents read are kept in input order in `doc_order`.
+        """
         logger.info("INIT queue, reading files")
-        for file in self.paths:
-            if file == "-":
-                self._process_content(sys.stdin)
+        try:
+            if nreaders > 1 and "-" not in self.paths:
+                self.doc_order = self._run_parallel(nreaders)
+            else:
+                self.doc_order = [self.read_file(file) for file in self.paths]
+        except ExtractionAborted:
+            logger.info("STOP reading, extraction aborted")
+            self.doc_order = []
+
+    def _run_parallel(self, nreaders: int) -> list[list[str]]:
+        ctx = multiprocessing.get_context()
+        path_queue = ctx.Queue()
+        order_queue = ctx.Queue()
+        parts = []
+        for file_i, file in enumerate(self.paths):
+            blocks = read_index(file)
+            if blocks:
+                parts.extend((file_i, file, r) for r in split_blocks(blocks, nreaders))
             else:
-                with gzip.open(file, "rt", encoding="utf-8") as fh:
-                    self._process_content(fh)
+                parts.append((file_i, file, None))
+        for item in enumerate(parts):
+            path_queue.put(item)
+        readers = []
+        for _ in range(nreaders):
+            path_queue.put(None)
+            p = ctx.Process(target=self._read_files, args=(path_queue, order_queue))
+            p.start()
+            readers.append(p)
+        part_doc_ids = dict(order_queue.get() for _ in parts)
+        for p in readers:
+            p.join()
+        doc_order: list[list[str]] = [[] for _ in self.paths]
+        for part_i, (file_i, _, _) in enumerate(parts):
+            doc_order[file_i].extend(part_doc_ids[part_i])
+        return doc_order
+
+    def _read_files(self, path_queue: Queue, order_queue: Queue) -> None:
+        """Reader process, reads files or block ranges of files from the path
+        queue until it is empty."""
+        while (item := path_queue.get()) is not None:
+            part_i, (_, file, blocks) = item
+            try:
+                doc_ids = self.read_file(file, blocks)
+            except ExtractionAborted:
+                doc_ids = []
+            except Exception:
+                logger.exception("Couldn't read file: %s" % file)
+                doc_ids = []
+            order_queue.put((part_i, doc_ids))
 
     def stop(self, n_procs: int) -> None:
-        for _ in range(n_procs):
-            self.q.put(None)
+        try:
+            for _ in range(n_procs):
+                self.q.put(None)
+        except ExtractionAborted:
+            pass
+
+
+@contextlib.contextmanager
+def open_conllu(file: str) -> Iterator[TextIO]:
+    """Opens a CoNLL-U input file, gzip compressed or plain text.
+
+    The compression is detected by the content, hence pipes can be read.
+    """
+    with open(file, "rb") as raw:
+        if raw.peek(len(GZIP_MAGIC))[: len(GZIP_MAGIC)] == GZIP_MAGIC:
+            with gzip.open(raw, "rt", encoding="utf-8") as fh:
+                yield fh
+        else:
+            with io.TextIOWrapper(raw, encoding="utf-8") as fh:
+                yield fh
+
+
+@contextlib.contextmanager
+def document_errors_logged(doc_id: Any) -> Iterator[None]:
+    """Logs and suppresses errors raised while processing documents."""
+    try:
+        yield
+    except TypeError:
+        logger.exception(
+            "Type Conversion Error: invalid sentence parse in document: %s" % doc_id
+        )
+    except Exception:
+        logger.exception("Couldn't process document: %s" % doc_id)
 
 
 def process_doc_file(
@@ -205,111 +1258,983 @@ def process_doc_file(
     db_files_queue: Queue,
     db_sents_queue: Queue,
     db_matches_queue: Queue,
-    lemma_counters: multiprocessing.managers.ListProxy,
+    lemma_counters: multiprocessing.managers.ListProxy | None,
+    match_counters: multiprocessing.managers.ListProxy | None = None,
+    journal: Journal | None = None,
+    sentence_hashes: SharedHashSet | None = None,
+    stats: WorkerStats | None = None,
+    counters: Optional[tuple[LemmaCounter, MatchCounter]] = None,
 ) -> None:
-    """Extracts information from files and forwards to corresponding queue."""
-    counter = LemmaCounter()
+    """Extracts information from files and forwards to corresponding queue.
+
+    The results of a `DocumentBatch` are sent as a single batch of rows per
+    queue. Lemma frequencies and, if `match_counters` is given, collocation and
+    surface frequencies of the processed documents are appended to the
+    shared lists when the worker is finished. The frequencies are counted by
+    the given `counters` or, if none are given, in memory. Counters with
+    spill prefixes (see `shard_counters`) spill all frequencies to run files
+    at the end, hence only the names of the runs are appended. If a
+    `journal` is given, the counters are continued from the journal and every `InputDocument` is
+    recorded in it once processed. `TrackedItem`s are registered as taken in
+    the `InFlightItems` of the journal.
+
+    If `sentence_hashes` is given, sentences whose robust hash (see
+    `reindex_concordances`) was seen before by any worker are skipped: they
+    are neither counted nor written and produce no matches. The sentence ids
+    of the remaining sentences are kept. The copy kept is the one processed
+    first, with several workers it depends on their scheduling.
+
+    If `stats` is given, the processed documents, sentences, invalid sentences
+    and matches are counted in it.
+    """
+    if journal is not None:
+        counter, match_counter = journal.lemma_counter, journal.match_counter
+    else:
+        counter, match_counter = counters or (LemmaCounter(), MatchCounter())
+    n_duplicates = 0
     while True:
-        sentences: list[TokenList] = file_reader_queue.get()
-        if not sentences:
-            lemma_counters.append(counter)
-            break
         try:
-            doc_id, db_corpus_file = prepare_corpus_file(sentences[0].metadata)
-            parses = list(filter(sentence_is_valid, map(convert_sentence, sentences)))
-            db_concord_sentences = prepare_concord_sentences(doc_id, parses)
-            counter.count_token(parses)
-            matches = extract_matches_from_doc(parses)
-            db_matches = prepare_matches(doc_id, matches)
-            db_files_queue.put([db_corpus_file])
-            db_sents_queue.put(db_concord_sentences)
-            db_matches_queue.put(db_matches)
-        except TypeError:
-            logger.exception(
-                "Type Conversion Error: invalid sentence parse in document: %s"
-                % sentences[0].metadata.get("DDC:meta.file_")
-            )
-        except Exception:
-            logger.exception(
-                "Couldn't process document: %s"
-                % sentences[0].metadata.get("DDC:meta.file_")
-            )
+            item = file_reader_queue.get()
+        except ExtractionAborted:
+            return
+        if isinstance(item, TrackedItem) and journal and journal.in_flight:
+            journal.in_flight.take(item.seq)
+            item = item.item
+        if not item:
+            if journal is not None and journal.in_flight is not None:
+                journal.in_flight.finished.value = 1
+            if sentence_hashes is not None:
+                logger.info("Skipped %d duplicate sentences" % n_duplicates)
+            counter.spill()
+            match_counter.spill()
+            if journal is None:
+                counter.remove_obsolete_runs()
+                match_counter.remove_obsolete_runs()
+            if lemma_counters is not None:
+                lemma_counters.append(counter)
+            if match_counters is not None:
+                match_counters.append(match_counter)
+            break
+        documents = item.documents if isinstance(item, DocumentBatch) else [item]
+        db_corpus_files: list = []
+        db_concord_sentences: list = []
+        db_matches: list = []
+        positions = []
+        for document in documents:
+            if isinstance(document, InputDocument):
+                positions.append(document)
+                document = document.document
+            sentence_offset = 0
+            is_first = True
+            if isinstance(document, DocumentChunk):
+                meta = document.meta
+                sentences: Iterable[list[WPToken]] = document.sentences
+                sentence_offset = document.sentence_offset
+                is_first = document.index == 0
+            elif isinstance(document, Document):
+                meta = document.meta
+                sentences = document.sentences
+            else:
+                meta = document[0].metadata
+                sentences = map(convert_sentence, document)
+            sentences = list(sentences)
+            with document_errors_logged(meta.get(DOC_START)):
+                doc_id, db_corpus_file = prepare_corpus_file(meta)
+                parses = list(filter(sentence_is_valid, sentences))
+                doc_concord_sentences = prepare_concord_sentences(
+                    doc_id, parses, sentence_offset
+                )
+                if sentence_hashes is not None:
+                    is_new = sentence_hashes.add_new(
+                        get_robust_hash64(s.sentence) for s in doc_concord_sentences
+                    )
+                    n_duplicates += is_new.count(False)
+                    doc_concord_sentences = [
+                        s for s, new in zip(doc_concord_sentences, is_new) if new
+                    ]
+                    # duplicates are replaced by empty sentences to keep the ids
+                    parses = [p if new else [] for p, new in zip(parses, is_new)]
+                counter.count_token(parses)
+                matches = extract_matches_from_doc(parses, sentence_offset)
+                doc_matches = prepare_matches(doc_id, matches)
+                if is_first:
+                    # the corpus file of a split document is sent once
+                    db_corpus_files.append(db_corpus_file)
+                db_concord_sentences.extend(doc_concord_sentences)
+                db_matches.extend(doc_matches)
+                match_counter.count_matches(doc_matches)
+                if stats is not None:
+                    stats.add(
+                        is_first,
+                        len(sentences),
+                        len(sentences) - len(parses),
+                        len(doc_matches),
+                    )
+        if db_corpus_files or db_concord_sentences:
+            with document_errors_logged(", ".join(f.id for f in db_corpus_files)):
+                db_files_queue.put(db_corpus_files)
+                db_sents_queue.put(db_concord_sentences)
+                db_matches_queue.put(db_matches)
+        if journal is not None:
+            # documents are committed only after their results are written
+            for position in positions:
+                journal.record(position)
+            journal.checkpoint_if_due()
+        else:
+            # runs merged by a journal are removed at its checkpoints
+            counter.remove_obsolete_runs()
+            match_counter.remove_obsolete_runs()
+
+
+class RequeuedItems:
+    """Reader queue returning the given items before those of the queue."""
 
+    def __init__(self, items: list[Any], queue: FileReaderQueue) -> None:
+        self.items = list(items)
+        self.queue = queue
+
+    def get(self) -> Any:
+        return self.items.pop(0) if self.items else self.queue.get()
+
+    def put(self, item: Any) -> None:
+        self.queue.put(item)
+
+
+def process_doc_file_sharded(
+    file_reader_queue: Queue,
+    storage_path: str,
+    shard: int,
+    resume: bool = False,
+    table_format: str = "tsv",
+    compression: Optional[str] = None,
+    sentence_hashes: SharedHashSet | None = None,
+    stats: WorkerStats | None = None,
+    in_flight: InFlightItems | None = None,
+    requeued: Sequence[TrackedItem] = (),
+) -> None:
+    """Extracts information from files and writes it to worker-local shards.
 
-def process_files(file_path: list[str], storage_path: str, njobs: int = 1) -> None:
+    The progress is recorded in the journal of the shard, with `resume` the
+    worker continues from its last checkpoint. The counters are stored in
+    the state of the journal only (see `read_shard_counters`). The
+    `requeued` items of a crashed worker are processed first.
+    """
+    journal = Journal(
+        storage_path,
+        shard,
+        resume,
+        table_format=table_format,
+        compression=compression,
+        in_flight=in_flight,
+    )
+    process_doc_file(
+        RequeuedItems(requeued, file_reader_queue) if requeued else file_reader_queue,
+        *journal.writers,
+        None,
+        None,
+        journal,
+        sentence_hashes,
+        stats,
+    )
+    journal.close()
+
+
+def read_shard_counters(
+    storage_path: str, njobs: int
+) -> tuple[list[LemmaCounter], list[MatchCounter]]:
+    """Reads the counters of the workers of a sharded extraction from the
+    states of their journals."""
+    states = [
+        read_state(os.path.join(storage_path, shard_name(STATE, shard)))
+        for shard in range(njobs)
+    ]
+    return (
+        [state["lemma_counter"] for state in states if state],
+        [state["match_counter"] for state in states if state],
+    )
+
+
+class Supervisor(threading.Thread):
+    """Watches the extraction workers and writers of `process_files`.
+
+    If a process dies, the extraction is aborted: the abort event of the
+    reader queue (an `AbortableQueue`) is set, which stops the reader and
+    the workers, and the writers are terminated. Workers still running after
+    `ABORT_TIMEOUT` seconds are terminated as well. `error` describes the
+    cause.
+
+    With `in_flight` and a budget of `max_restarts`, crashed workers of a
+    sharded extraction are restarted from their last checkpoint instead, and
+    the items they took since then are handed to their replacement. For
+    this, the items have to be put into the reader queue by `put`, which
+    keeps them until a checkpoint commits them. An item being processed at
+    `MAX_ITEM_ATTEMPTS` crashes is given up and kept in `failed`, the
+    documents of a batch are retried one by one.
+    """
+
+    def __init__(
+        self,
+        queue: Any,
+        workers: list[multiprocessing.Process],
+        start_worker: Callable[..., multiprocessing.Process],
+        writers: Sequence[FileWorker] = (),
+        in_flight: Optional[list[InFlightItems]] = None,
+        max_restarts: int = 0,
+        storage_path: str = "",
+        interval: float = 0.2,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.workers = workers
+        self.start_worker = start_worker
+        self.writers = writers
+        self.in_flight = in_flight
+        self.max_restarts = max_restarts
+        self.storage_path = storage_path
+        self.interval = interval
+        self.pending: dict[int, tuple[Any, int]] = {}
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self.requeued: dict[int, list[TrackedItem]] = {}
+        self.failed: list[Any] = []
+        self.error: Optional[str] = None
+
+    def put(self, item: Any) -> None:
+        if item is not None and self.in_flight is not None:
+            item = self._track(item, 0)
+        self.queue.put(item)
+
+    def get(self) -> Any:
+        return self.queue.get()
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+    def _track(self, item: Any, attempts: int) -> TrackedItem:
+        with self.lock:
+            self.seq += 1
+            self.pending[self.seq] = (item, attempts)
+            return TrackedItem(self.seq, item)
+
+    def run(self) -> None:
+        while not all(p.exitcode == 0 for p in self.workers):
+            alive = [p for p in [*self.workers, *self.writers] if p.exitcode is None]
+            multiprocessing.connection.wait(
+                [p.sentinel for p in alive], timeout=self.interval
+            )
+            self._release_committed()
+            for shard, p in enumerate(self.workers):
+                if p.exitcode not in (None, 0) and self.error is None:
+                    self._restart(shard, p.exitcode)
+            for writer in self.writers:
+                if writer.exitcode is not None and self.error is None:
+                    self._abort(
+                        f"Writer of {writer.fname} died with exit code {writer.exitcode}"
+                    )
+            if self.error is not None:
+                return
+        self._release_committed()
+        # items taken by crashed workers before they registered them
+        self.failed.extend(item for item, _ in self.pending.values())
+        self.pending.clear()
+
+    def _release_committed(self) -> None:
+        if self.in_flight is None:
+            return
+        while True:
+            try:
+                seqs = self.in_flight[0].acks.get_nowait()
+            except queue.Empty:
+                return
+            with self.lock:
+                for seq in seqs:
+                    self.pending.pop(seq, None)
+
+    def _restart(self, shard: int, exitcode: int) -> None:
+        message = f"Extraction worker {shard} died with exit code {exitcode}"
+        if self.in_flight is None or self.restarts >= self.max_restarts:
+            self._abort(message)
+            return
+        self.restarts += 1
+        logger.error(
+            "%s, restart %d of %d" % (message, self.restarts, self.max_restarts)
+        )
+        in_flight = self.in_flight[shard]
+        state = read_state(os.path.join(self.storage_path, shard_name(STATE, shard)))
+        committed = set(state["items"]) if state else set()
+        taken = [seq for seq in in_flight.taken() if seq not in committed]
+        suspect = taken[-1] if taken else None
+        # items handed to the crashed worker on its start, but not taken yet
+        taken += [
+            tracked.seq
+            for tracked in self.requeued.pop(shard, [])
+            if tracked.seq not in committed and tracked.seq not in taken
+        ]
+        with self.lock:
+            entries = [
+                (seq, self.pending.pop(seq)) for seq in taken if seq in self.pending
+            ]
+        requeued = []
+        for seq, (item, attempts) in entries:
+            if seq == suspect:
+                # the item being processed when the worker died
+                attempts += 1
+                if attempts >= MAX_ITEM_ATTEMPTS:
+                    self.failed.append(item)
+                    continue
+                if isinstance(item, DocumentBatch):
+                    requeued.extend(
+                        self._track(document, attempts) for document in item.documents
+                    )
+                    continue
+            requeued.append(self._track(item, attempts))
+        finished = in_flight.finished.value
+        in_flight.reset()
+        self.requeued[shard] = requeued
+        self.workers[shard] = self.start_worker(shard, True, requeued)
+        if finished:
+            # the stop signal taken by the crashed worker
+            self.queue.put(None)
+
+    def _abort(self, message: str) -> None:
+        logger.error("%s, abort extraction" % message)
+        self.error = message
+        self.queue.abort.set()
+        deadline = time.monotonic() + ABORT_TIMEOUT
+        for p in self.workers:
+            p.join(max(0, deadline - time.monotonic()))
+        processes = [*self.workers, *self.writers]
+        for p in processes:
+            if p.exitcode is None:
+                p.terminate()
+        for p in processes:
+            p.join()
+
+
+def write_failed_documents(storage_path: str, items: list[Any]) -> int:
+    """Lists the documents of the failed items of a `Supervisor` in
+    `failed_documents`, in the format of the journals.
+
+    Returns:
+        number of failed documents
+    """
+    fname = os.path.join(storage_path, FAILED_DOCUMENTS)
+    positions = [
+        position
+        for item in items
+        for position in (item.documents if isinstance(item, DocumentBatch) else [item])
+    ]
+    if not positions:
+        if os.path.exists(fname):
+            os.remove(fname)
+        return 0
+    with open(fname, "w") as fh:
+        fh.writelines(map(format_position, positions))
+    return len(positions)
+
+
+def process_files(
+    file_path: list[str],
+    storage_path: str,
+    njobs: int = 1,
+    transport: str = "manager",
+    sharded: bool = False,
+    reader: str = "conllu",
+    nreaders: int = 1,
+    resume: bool = False,
+    batch_tokens: int = 0,
+    monitor_interval: float = 0,
+    table_format: str = "tsv",
+    compression: Optional[str] = None,
+    dedup_capacity: int = 0,
+    stats_file: Optional[str] = None,
+    chunk_sentences: int = 0,
+    max_restarts: int = 0,
+) -> None:
     """Extract WP related information from given files.
 
     This method processes a given list of files in parallel.
     Workers are created for each result (corpus_files, concordances,
     matches, collocations) in relation to db tables. The file list is
     split into several chunks for parallel processing. The extracted
-    results are sent to the workers.
+    results are sent to the workers. Collocations and the most common
+    surface forms are aggregated by the workers and merged at the end.
+
+    The transport determines how documents and results are passed between
+    processes (see `get_queue_factory`). If `sharded` is set, each
+    extraction process writes its results to its own shard files instead,
+    the shards are listed in the manifest of the storage path. The reader
+    selects the CoNLL-U parser of the `FileReader`, with `nreaders` > 1 the
+    input files are read by several processes. Corpus files are written in
+    input order in any case.
+
+    Sharded extractions are journaled (see `Journal`). With `resume`, the
+    documents finished by an interrupted run with the same inputs, number
+    of jobs and `chunk_sentences` are skipped and the shards are continued.
+    The journals are removed once the extraction is finalized.
+
+    If a process dies, the extraction is aborted with a RuntimeError (see
+    `Supervisor`). With `max_restarts` > 0, up to this many crashed workers of
+    a sharded extraction are restarted from their checkpoints instead, the
+    documents lost in the crashes are processed again. Documents given up
+    after repeated crashes are listed in `failed_documents`, a later run
+    with `resume` retries them. The main process keeps the documents until
+    they are committed (see `Journal`).
+
+    With `batch_tokens` > 0, documents are sent to the extraction processes
+    in batches of about this number of tokens. With `chunk_sentences` > 0,
+    documents with more sentences are split into chunks of this many
+    sentences, which are processed in parallel (see `FileReader`); the
+    results are the same as without splitting. With `monitor_interval` > 0,
+    the queue depths are logged at this interval in seconds. With a
+    `stats_file` in addition, the throughput of every extraction process,
+    the queue depths and the memory usage of the processes are written to it
+    at this interval as JSON lines (see `QueueMonitor`).
+
+    With `table_format` "columnar", concordances and matches are written in
+    the columnar format (see `wordprofile.wpse.columnar`), which is read by
+    `compute_stats` as well. With a `compression` (see `COMPRESSION_SUFFIXES`),
+    they are written as compressed streams with the corresponding suffix.
+
+    With `dedup_capacity` > 0, the workers share a set of the hashes of up to
+    this many sentences and skip sentences seen before (see
+    `process_doc_file`). Duplicates beyond the capacity, or from before a
+    resume, are removed by `compute_stats` as before. Which copy of a
+    duplicate is kept depends on the scheduling of the workers, so the
+    concordances and matches may differ between runs with `njobs` > 1.
     """
+    if resume and not sharded:
+        raise ValueError("Resuming an extraction requires sharded output")
+    if max_restarts > 0 and (not sharded or nreaders > 1 or dedup_capacity > 0):
+        raise ValueError(
+            "Restarting workers requires sharded output, a single reader "
+            "and no deduplication during extraction"
+        )
+    if compression is not None and compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {compression}")
+    manifest_file = os.path.join(storage_path, MANIFEST)
+    if os.path.exists(manifest_file):
+        # outputs of a previous sharded run must not shadow the new results
+        os.remove(manifest_file)
+    for table in COMPRESSED_TABLES:
+        # nor outputs of a previous run with another compression
+        for suffix in COMPRESSION_SUFFIXES.values():
+            if os.path.exists(fname := os.path.join(storage_path, table + suffix)):
+                os.remove(fname)
+    skip = None
+    if sharded:
+        if resume:
+            skip = read_journals(storage_path, njobs)
+            logger.info(
+                "RESUME extraction, skip %d documents" % sum(map(len, skip.values()))
+            )
+        else:
+            remove_journals(storage_path)
+            skip = {}
     mp_manager = multiprocessing.Manager()
-    fr_queue = mp_manager.Queue(maxsize=2 * njobs)
-    file_reader = FileReader(file_path, fr_queue)
-    db_files_worker = FileWorker(storage_path, "corpus_files", mp_manager)
-    db_sents_worker = FileWorker(
-        storage_path, "concord_sentences", mp_manager, flush_limit=1000
-    )
-    db_matches_worker = FileWorker(
-        storage_path, "matches", mp_manager, flush_limit=10000
-    )
-    db_files_worker.start()
-    db_sents_worker.start()
-    db_matches_worker.start()
-    pool = []
+    queues = get_queue_factory(transport, mp_manager)
+    fr_queue = AbortableQueue(queues.Queue(maxsize=2 * njobs), multiprocessing.Event())
     lemma_counters = mp_manager.list()
-    for i in range(njobs):
-        p = multiprocessing.Process(
-            target=process_doc_file,
-            args=(
-                file_reader.q,
-                db_files_worker.q,
-                db_sents_worker.q,
-                db_matches_worker.q,
-                lemma_counters,
+    match_counters = mp_manager.list()
+    writers = []
+    if not sharded:
+        writers = [
+            FileWorker(storage_path, "corpus_files", queues),
+            FileWorker(
+                storage_path,
+                "concord_sentences",
+                queues,
+                flush_limit=1000,
+                table_format=table_format,
+                compression=compression,
             ),
-        )
+            FileWorker(
+                storage_path,
+                "matches",
+                queues,
+                flush_limit=10000,
+                table_format=table_format,
+                compression=compression,
+            ),
+        ]
+        for writer in writers:
+            writer.start()
+    sentence_hashes = SharedHashSet(dedup_capacity) if dedup_capacity > 0 else None
+    worker_stats = [WorkerStats() for _ in range(njobs)]
+    in_flight = None
+    if max_restarts > 0:
+        acks = mp_manager.Queue()
+        # a worker takes at most one item per document since its checkpoint
+        in_flight = [InFlightItems(CHECKPOINT_INTERVAL + 1, acks) for _ in range(njobs)]
+
+    def start_worker(
+        shard: int, resume: bool, requeued: Sequence[TrackedItem] = ()
+    ) -> multiprocessing.Process:
+        if sharded:
+            p = multiprocessing.Process(
+                target=process_doc_file_sharded,
+                args=(
+                    fr_queue,
+                    storage_path,
+                    shard,
+                    resume,
+                    table_format,
+                    compression,
+                    sentence_hashes,
+                    worker_stats[shard],
+                    in_flight[shard] if in_flight else None,
+                    requeued,
+                ),
+            )
+        else:
+            p = multiprocessing.Process(
+                target=process_doc_file,
+                args=(
+                    fr_queue,
+                    *(writer.q for writer in writers),
+                    lemma_counters,
+                    match_counters,
+                    None,
+                    sentence_hashes,
+                    worker_stats[shard],
+                    shard_counters(storage_path, shard),
+                ),
+            )
         p.start()
-        pool.append(p)
-    file_reader.run()
+        return p
+
+    pool = [start_worker(shard, resume) for shard in range(njobs)]
+    supervisor = Supervisor(
+        fr_queue, pool, start_worker, writers, in_flight, max_restarts, storage_path
+    )
+    supervisor.start()
+    file_reader = FileReader(
+        file_path,
+        supervisor if in_flight else fr_queue,
+        reader,
+        skip,
+        batch_tokens,
+        chunk_sentences,
+    )
+    monitor = QueueMonitor(
+        {
+            "reader": file_reader.q,
+            **{writer.fname: writer.q for writer in writers},
+        },
+        monitor_interval,
+        stats_file,
+        {f"worker-{shard}": stats for shard, stats in enumerate(worker_stats)},
+        lambda: {
+            **{f"worker-{shard}": p for shard, p in enumerate(supervisor.workers)},
+            **{writer.fname: writer for writer in writers},
+        },
+    )
+    if monitor_interval > 0:
+        monitor.start()
+    file_reader.run(nreaders)
     logger.info("STOP file reader queue...")
     file_reader.stop(njobs)
     logger.info("JOIN processes...")
+    supervisor.join()
     for p in pool:
         p.join()
-    logger.info("STOP first queues and wait...")
-    db_files_worker.stop()
-    db_sents_worker.stop()
-    db_files_worker.join()
-    db_sents_worker.join()
-    logger.info("STOP final matches queue and wait...")
-    db_matches_worker.stop()
-    db_matches_worker.join()
+    if supervisor.error is None:
+        logger.info("STOP output queues and wait...")
+        for writer in writers:
+            writer.stop()
+        for writer in writers:
+            writer.join()
+    if monitor.is_alive():
+        monitor.stop()
+    if supervisor.error is not None:
+        raise RuntimeError(supervisor.error)
+    if n_failed := write_failed_documents(storage_path, supervisor.failed):
+        logger.warning(
+            "%d documents failed after %d worker restarts, listed in %s"
+            % (
+                n_failed,
+                supervisor.restarts,
+                os.path.join(storage_path, FAILED_DOCUMENTS),
+            )
+        )
+    elif supervisor.restarts:
+        logger.warning(
+            "%d crashed workers restarted, no documents failed" % supervisor.restarts
+        )
+    if sentence_hashes is not None and sentence_hashes.is_full():
+        logger.warning(
+            "Sentence hash set full (%d sentences), duplicates were kept"
+            % dedup_capacity
+        )
     logger.info("ALL JOBS DONE")
-    save_lemma_counts_to_file(lemma_counters, storage_path)
+    if sharded:
+        lemma_counters, match_counters = read_shard_counters(storage_path, njobs)
+    # journaled runs are kept until the shards are finalized
+    save_lemma_counts_to_file(lemma_counters, storage_path, remove_runs=not sharded)
+    save_match_counts_to_file(match_counters, storage_path, remove_runs=not sharded)
+    corpus_files = os.path.join(storage_path, "corpus_files")
+    if sharded:
+        finalize_shards(
+            storage_path, njobs, file_reader.doc_order, compression, table_format
+        )
+    else:
+        restore_document_order([corpus_files], corpus_files, file_reader.doc_order)
+        for table in COMPRESSED_TABLES:
+            fname = os.path.join(storage_path, compressed_name(table, compression))
+            tmp_file = os.path.join(
+                storage_path, compressed_name(table + ".tmp", compression)
+            )
+            sort_by_document(
+                [fname], [tmp_file], table, file_reader.doc_order, table_format
+            )
+            os.replace(tmp_file, fname)
+
+
+def finalize_shards(
+    storage_path: str,
+    njobs: int,
+    doc_order: list[list[str]],
+    compression: Optional[str] = None,
+    table_format: str = "tsv",
+) -> None:
+    """Sorts the rows of the shard part files by document into the final
+    shards (see `sort_by_document`), merges the corpus files and commits the
+    extraction by writing the manifest.
+
+    Finalization can be repeated by resuming, until the journals are removed.
+    """
+    corpus_files = os.path.join(storage_path, "corpus_files")
+    corpus_files_parts = [
+        shard_name(corpus_files, shard) + PART_SUFFIX for shard in range(njobs)
+    ]
+    restore_document_order(corpus_files_parts, corpus_files, doc_order)
+    tables = {"corpus_files": ["corpus_files"]}
+    parts = []
+    for table in COMPRESSED_TABLES:
+        fnames = [
+            compressed_name(shard_name(table, shard), compression)
+            for shard in range(njobs)
+        ]
+        table_parts = [
+            os.path.join(
+                storage_path,
+                compressed_name(shard_name(table, shard) + PART_SUFFIX, compression),
+            )
+            for shard in range(njobs)
+        ]
+        sort_by_document(
+            table_parts,
+            [os.path.join(storage_path, fname) for fname in fnames],
+            table,
+            doc_order,
+            table_format,
+        )
+        tables[table] = fnames
+        parts.extend(table_parts)
+    write_manifest(storage_path, tables)
+    remove_journals(storage_path)
+    for fname in corpus_files_parts + parts:
+        os.remove(fname)
+
+
+def document_positions(doc_order: list[list[str]]) -> dict[str, int]:
+    """Numbers the documents by the order in which they were read."""
+    position: dict[str, int] = {}
+    for doc_ids in doc_order:
+        for doc_id in doc_ids:
+            position.setdefault(doc_id, len(position))
+    return position
+
+
+def sort_by_document(
+    fins: list[str],
+    fouts: list[str],
+    table: str,
+    doc_order: list[list[str]],
+    table_format: str = "tsv",
+) -> None:
+    """Sorts the rows of a concord_sentences or matches table by the order
+    in which their documents were read and by sentence id.
+
+    The workers write the rows in the order in which they finish documents,
+    so this makes the order of the rows, and the ids assigned from it by
+    `compute_stats`, independent of scheduling. Rows of the same sentence,
+    and of documents with the same id, are ordered by their values. See
+    `sort_table_rows` for the output files.
+    """
+    position = document_positions(doc_order)
+    doc_column, sentence_column = DOCUMENT_COLUMNS[table]
+
+    def key(row: Sequence) -> tuple[int, int, Sequence]:
+        return (
+            position.get(row[doc_column], len(position)),
+            int(row[sentence_column]),
+            row,
+        )
+
+    sort_table_rows(fins, fouts, table, key, table_format)
+
+
+def read_pickled_rows(fname: str) -> Iterator[Sequence]:
+    with open(fname, "rb") as fh:
+        while True:
+            try:
+                rows = pickle.load(fh)
+            except EOFError:
+                return
+            yield from rows
+
+
+def sort_table_rows(
+    fins: list[str],
+    fouts: list[str],
+    table: str,
+    key: Callable[[Sequence], Any],
+    table_format: str = "tsv",
+) -> None:
+    """Sorts the rows of table files by `key` and writes them in order to the
+    `fouts`, split into parts of about equal numbers of rows.
+
+    Runs of `SORT_RUN_ROWS` rows are sorted in memory, kept in a temporary
+    directory next to the first output file and merged. The sort is stable.
+    """
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(fouts[0]) or None) as tmp:
+        runs = []
+        n_rows = 0
+        rows = itertools.chain.from_iterable(map(read_table_rows, fins))
+        while batch := list(itertools.islice(rows, SORT_RUN_ROWS)):
+            batch.sort(key=key)
+            runs.append(os.path.join(tmp, str(len(runs))))
+            with open(runs[-1], "wb") as fh:
+                for i in range(0, len(batch), 10_000):
+                    pickle.dump(batch[i : i + 10_000], fh)
+            n_rows += len(batch)
+        merged = heapq.merge(*map(read_pickled_rows, runs), key=key)
+        part_rows = -(-n_rows // len(fouts))
+        for fout in fouts:
+            writer = open_table_writer(fout, table, table_format)
+            with contextlib.closing(writer):
+                remaining = part_rows
+                while remaining > 0 and (
+                    batch := list(itertools.islice(merged, min(remaining, 10_000)))
+                ):
+                    writer.put(batch)
+                    remaining -= len(batch)
+
+
+def restore_document_order(
+    fins: list[str], fout: str, doc_order: list[list[str]]
+) -> None:
+    """Sorts corpus files by the order in which their documents were read.
+
+    Args:
+        fins: corpus files tables written by the extraction
+        fout: output file, may be one of the inputs
+        doc_order: document ids per input file in reading order
+    """
+    position = document_positions(doc_order)
+    rows = []
+    for fin in fins:
+        with open(fin) as fh:
+            rows.extend(fh)
+    rows.sort(key=lambda row: position.get(row.split("\t", 1)[0], len(position)))
+    with open(fout + ".tmp", "w") as fh:
+        fh.writelines(rows)
+    os.replace(fout + ".tmp", fout)
 
 
 def save_lemma_counts_to_file(
     lemma_counters: multiprocessing.managers.ListProxy,
     output_path: str,
+    remove_runs: bool = True,
 ) -> None:
-    total: Counter[str] = Counter()
-    for counter in lemma_counters:
-        total += counter.freqs
+    """Merges the lemma counts of all workers into the lemma_freqs file,
+    sorted by lemma.
+
+    The runs spilled by the counters and their remaining counts are merged
+    as sorted streams. With `remove_runs`, the run files are removed
+    afterwards.
+    """
+    counters = list(lemma_counters)
     with open(os.path.join(output_path, "lemma_freqs"), "w") as fh:
-        for lemma, freq in total.items():
-            print("\t".join([lemma, str(freq)]), file=fh)
+        for lemma, freq in merge_counts(counter.counts() for counter in counters):
+            fh.write(f"{lemma}\t{freq}\n")
+    if remove_runs:
+        for counter in counters:
+            remove_runs_of(counter)
+
+
+def save_match_counts_to_file(
+    match_counters: multiprocessing.managers.ListProxy,
+    output_path: str,
+    remove_runs: bool = True,
+) -> None:
+    """Merges the match counts of all workers into the collocations and
+    common_surfaces files, sorted by collocation and lemma.
+
+    Like the lemma counts, the runs and remaining counts of the counters are
+    merged as sorted streams and, with `remove_runs`, the run files are
+    removed afterwards.
+    """
+    counters = list(match_counters)
+    with open(os.path.join(output_path, "collocations"), "w") as fh:
+        for collocation, freq in merge_counts(
+            counter.collocations.counts() for counter in counters
+        ):
+            rel, lemma1, lemma2, tag1, tag2, prep = collocation.split("\t")
+            fh.write(f"{rel}\t{lemma1}\t{tag1}\t{lemma2}\t{tag2}\t{prep}\t{freq}\n")
+    write_sorted_common_surfaces(
+        merge_counts(counter.surfaces.counts() for counter in counters),
+        os.path.join(output_path, "common_surfaces"),
+    )
+    if remove_runs:
+        for counter in counters:
+            remove_runs_of(counter.collocations)
+            remove_runs_of(counter.surfaces)
+
+
+def remove_runs_of(counter: RunCounter) -> None:
+    for fname in counter.runs:
+        os.remove(fname)
+    counter.remove_obsolete_runs()
+
+
+def convert_tables_to_tsv(storage_path: str, output_path: str) -> None:
+    """Writes the concordances and matches of an extraction as single TSV
+    tables to the output path, regardless of their format and sharding."""
+    for table in COLUMNAR_TABLES:
+        with open(os.path.join(output_path, table), "w") as fh:
+            for fin in table_files(os.path.join(storage_path, table)):
+                fh.writelines(format_rows(read_table_rows(fin)))
+
+
+class SentenceIndex:
+    """Set of sentences given by their corpus file id and sentence id.
+
+    Both ids are small non-negative integers, the corpus files are numbered
+    by `reindex_corpus_files` and the sentences of a document by the
+    extraction. Hence the sentences are kept as a numpy bitmap with a bit
+    per sentence id of each corpus file, the bits of corpus file `i` start
+    at `offsets[i]`. This takes a bit per sentence and 8 bytes per corpus
+    file, instead of a tuple of two strings per sentence in a set.
+
+    Sentences are added as 64-bit ids, the corpus file id in the upper and
+    the sentence id in the lower 32 bits, which are buffered until the index
+    is read next and then merged into the bitmap. Many sentences are looked
+    up at once by `contains_many` and `has_documents`.
+    """
+
+    def __init__(self, sentences: Iterable[tuple[int, int]] = ()) -> None:
+        self.offsets = np.zeros(2, dtype=np.int64)
+        self.bits = np.zeros(0, dtype=np.uint8)
+        self.size = 0
+        self.added = array.array("q")
+        self.added_arrays: list[np.ndarray] = []
+        for doc_id, sent_id in sentences:
+            self.add(doc_id, sent_id)
+
+    def __len__(self) -> int:
+        self._merge()
+        return self.size
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        doc_ids, sent_ids = self._sentences()
+        return zip(doc_ids.tolist(), sent_ids.tolist())
+
+    def add(self, doc_id: int, sent_id: int) -> None:
+        self.added.append(doc_id << 32 | sent_id)
+
+    def add_many(self, doc_ids: np.ndarray, sent_ids: np.ndarray) -> None:
+        self.added_arrays.append(doc_ids.astype(np.int64) << 32 | sent_ids)
+
+    def update(self, other: SentenceIndex) -> None:
+        """Adds the sentences of another index."""
+        self.add_many(*other._sentences())
+
+    def contains(self, doc_id: int, sent_id: int) -> bool:
+        self._merge()
+        if not 0 <= doc_id < len(self.offsets) - 1:
+            return False
+        start, end = self.offsets[doc_id : doc_id + 2].tolist()
+        if not 0 <= sent_id < end - start:
+            return False
+        position = start + sent_id
+        return bool(self.bits[position >> 3] >> (position & 7) & 1)
+
+    def has_document(self, doc_id: int) -> bool:
+        """Checks whether any sentence of the corpus file is in the set."""
+        self._merge()
+        if not 0 <= doc_id < len(self.offsets) - 1:
+            return False
+        return bool(self.offsets[doc_id + 1] > self.offsets[doc_id])
+
+    def contains_many(self, doc_ids: np.ndarray, sent_ids: np.ndarray) -> np.ndarray:
+        """Returns a boolean mask of the given sentences in the set."""
+        self._merge()
+        found, start, end = self._document_bits(doc_ids)
+        positions = start + sent_ids
+        found &= (sent_ids >= 0) & (positions < end)
+        positions = np.where(found, positions, 0)
+        if not len(self.bits):
+            return found
+        return found & (self.bits[positions >> 3] >> (positions & 7) & 1).astype(bool)
+
+    def has_documents(self, doc_ids: np.ndarray) -> np.ndarray:
+        """Returns a boolean mask of the corpus files with any sentence in
+        the set."""
+        self._merge()
+        found, start, end = self._document_bits(doc_ids)
+        return found & (end > start)
+
+    def _document_bits(
+        self, doc_ids: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns a mask of the corpus files within the bitmap, and the
+        start and end of their bits."""
+        found = (doc_ids >= 0) & (doc_ids < len(self.offsets) - 1)
+        doc_ids = np.where(found, doc_ids, 0)
+        return found, self.offsets[doc_ids], self.offsets[doc_ids + 1]
+
+    def _sentences(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the corpus file ids and sentence ids in the set, sorted."""
+        self._merge()
+        positions = np.flatnonzero(
+            np.unpackbits(self.bits, bitorder="little")[: self.offsets[-1]]
+        )
+        doc_ids = np.searchsorted(self.offsets, positions, side="right") - 1
+        return doc_ids, positions - self.offsets[doc_ids]
+
+    def _merge(self) -> None:
+        if not self.added and not self.added_arrays:
+            return
+        ids = np.concatenate(
+            [
+                np.frombuffer(self.added, dtype=np.int64),
+                *self.added_arrays,
+            ]
+        )
+        self.added = array.array("q")
+        self.added_arrays = []
+        doc_ids, sent_ids = self._sentences() if self.size else ([], [])
+        doc_ids = np.concatenate([doc_ids, ids >> 32]).astype(np.int64)
+        sent_ids = np.concatenate([sent_ids, ids & 0xFFFFFFFF]).astype(np.int64)
+        lengths = np.zeros(doc_ids.max() + 1, dtype=np.int64)
+        np.maximum.at(lengths, doc_ids, sent_ids + 1)
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)])
+        flags = np.zeros(self.offsets[-1], dtype=bool)
+        flags[self.offsets[doc_ids] + sent_ids] = True
+        self.size = int(np.count_nonzero(flags))
+        self.bits = np.packbits(flags, bitorder="little")
 
 
 def reindex_corpus_files(fins: list[str], fout: str) -> dict[str, int]:
     """Iterates over generated corpus file and replaces index by numeric index."""
     corpus_file_idx = {}
     c_i = 0
-    with open(fout, "w") as files_out:
+    with open_file(fout, "w") as files_out:
         for fin in fins:
-            with open(fin, "r") as files_in:
+            with open_file(fin, "r") as files_in:
                 for line in files_in:
                     tokens = line.split("\t")
                     corpus_file_idx[tokens[0]] = c_i
@@ -323,50 +2248,123 @@ def reindex_concordances(
     fout: str,
     corpus_file_idx: dict[str, int],
     fout_duplicate: str,
-) -> set[tuple[str, str]]:
+    hash_bits: int = 128,
+) -> SentenceIndex:
     """
     Filters and removes duplicates from concordances and replaces corpus
-    file index.
-    """
+    file index. Returns the index of the remaining sentences.
 
-    def get_robust_hash(sentence: str) -> str:
-        """Generates an md5 sentence hash.
-        The sentence string is converted to lowercase and all symbols
-        except letters are removed for robustness.
-        """
-        sentence = re.sub(r"[^a-z]", "", sentence.lower())
-        return hashlib.md5(sentence.encode()).hexdigest()
-
-    sent_hashes = set()
-    sents_idx = []
-    with open(fout, "w") as sents_out, open(fout_duplicate, "w") as dups_out:
+    Duplicates are detected by the first `hash_bits` bits of the robust md5
+    hash of the sentences. 64-bit hashes are kept in a compact `HashSet64`,
+    at the risk of rare false duplicates (see there); with 128 bits the full
+    hashes are kept in a Python set, which takes about seven times the memory.
+    """
+    if hash_bits not in HASH_BITS:
+        raise ValueError(f"Unsupported number of hash bits: {hash_bits}")
+    sent_hashes: Union[HashSet64, set[str]] = HashSet64() if hash_bits == 64 else set()
+    sents_idx = SentenceIndex()
+    with open_file(fout, "w") as sents_out, open_file(fout_duplicate, "w") as dups_out:
         for fin in fins:
             logger.info("- %s" % fin)
-            with open(fin, "r") as sents_in:
-                for item in sents_in:
-                    doc_corpus, sent_id, sentence = item.split("\t")
-                    doc_id = str(corpus_file_idx[doc_corpus])
+            for doc_corpus, sent_id, sentence in read_table_rows(fin):
+                doc_id = corpus_file_idx[doc_corpus]
+                sent_id = int(sent_id)
+                # checks for duplicates based on sentence checksum (md5)
+                if isinstance(sent_hashes, HashSet64):
+                    is_new = sent_hashes.add(get_robust_hash64(sentence))
+                else:
                     sent_hash = get_robust_hash(sentence)
-                    # checks for duplicates based on sentence checksum (md5)
-                    if sent_hash not in sent_hashes:
-                        sent_hashes.add(sent_hash)
-                        sents_out.write("\t".join([doc_id, sent_id, sentence]))
-                        sents_idx.append((doc_id, sent_id))
-                    else:
-                        dups_out.write("\t".join([doc_corpus, sent_id, sentence]))
-    return set(sents_idx)
+                    is_new = sent_hash not in sent_hashes
+                    sent_hashes.add(sent_hash)
+                if is_new:
+                    sents_out.write(f"{doc_id}\t{sent_id}\t{sentence}\n")
+                    sents_idx.add(doc_id, sent_id)
+                else:
+                    dups_out.write(f"{doc_corpus}\t{sent_id}\t{sentence}\n")
+    return sents_idx
+
+
+def transform_matches(
+    fin: str,
+    relation_dict: dict[str, int],
+    corpus_file_idx: dict[str, int],
+    sents_idx: SentenceIndex,
+    valid_sentence_ids: SentenceIndex,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Iterator[str]:
+    """Yields the rows of the valid matches of a file, or of a range of it
+    (see `read_table_rows`), without the match id and adds their sentences
+    to `valid_sentence_ids`. The sentences of `FILTER_BATCH_ROWS` matches
+    are looked up at once."""
+    rows = read_table_rows(fin, start, end)
+    while batch := list(itertools.islice(rows, FILTER_BATCH_ROWS)):
+        matches = []
+        for match in batch:
+            if len(match) != 13:
+                raise ValueError(f"Invalid match in {fin}: {match}")
+            corpus_file_id = corpus_file_idx[match[11]]
+            # check whether concordances and collocations still exist for match
+            colloc_id = relation_dict.get("-".join(match[:6]))
+            if colloc_id is not None:
+                matches.append((colloc_id, corpus_file_id, int(match[12]), match))
+        if not matches:
+            continue
+        doc_ids = np.fromiter((m[1] for m in matches), np.int64, len(matches))
+        sent_ids = np.fromiter((m[2] for m in matches), np.int64, len(matches))
+        found = sents_idx.contains_many(doc_ids, sent_ids)
+        valid_sentence_ids.add_many(doc_ids[found], sent_ids[found])
+        for colloc_id, corpus_file_id, sentence_id, match in itertools.compress(
+            matches, found
+        ):
+            # same columns as `DBMatch.convert_to_database_entry`
+            head_surface, dep_surface, head_pos, dep_pos, extra_pos = match[6:11]
+            yield (
+                f"{colloc_id}\t{head_surface}\t{dep_surface}\t"
+                f"{head_pos}\t{dep_pos}\t{extra_pos}\t{corpus_file_id}\t"
+                f"{sentence_id}\n"
+            )
+
+
+# arguments of `transform_matches` in the processes of `filter_transform_matches`
+_match_filter: tuple = ()
+
+
+def _init_match_filter(*args) -> None:
+    global _match_filter
+    _match_filter = args
+
+
+def _filter_transform_match_range(
+    task: tuple[tuple[str, int, Optional[int]], str],
+) -> SentenceIndex:
+    (fin, start, end), fout = task
+    valid_sentence_ids = SentenceIndex()
+    with open(fout, "w") as fh:
+        fh.writelines(
+            transform_matches(fin, *_match_filter, valid_sentence_ids, start, end)
+        )
+    return valid_sentence_ids
 
 
 def filter_transform_matches(
     fins: list[str],
     fout: str,
     corpus_file_idx: dict[str, int],
-    sents_idx: set[tuple[str, str]],
+    sents_idx: SentenceIndex,
     collocs: dict[int, Colloc],
-) -> set[tuple[str, str]]:
+    njobs: int = 1,
+) -> SentenceIndex:
     """
     Filter matches with any missing entry for corpus file, sentence,
     or collocation, then transform using collocation id.
+
+    With `njobs` > 1, the match files are filtered by a pool of processes
+    into part files, which are concatenated in input order. Uncompressed TSV
+    files are split into ranges of lines, so that a single file is filtered
+    in parallel, too (see `table_ranges`). If there is only a single range,
+    the matches are filtered by this process. The matches are numbered while
+    concatenating, so the output does not depend on `njobs`.
     """
     relation_dict = dict()
     for c in collocs.values():
@@ -374,67 +2372,201 @@ def filter_transform_matches(
             "-".join([c.label, c.lemma1, c.lemma2, c.lemma1_tag, c.lemma2_tag, c.prep])
         ] = c.id
 
-    valid_sentence_ids = set()
+    valid_sentence_ids = SentenceIndex()
     match_i = 0
     with open(fout, "w") as matches_out:
+        ranges = [
+            table_range
+            for fin in fins
+            for table_range in table_ranges(fin, -(-njobs // max(1, len(fins))))
+        ]
+        if njobs > 1 and len(ranges) > 1:
+            parts = [f"{fout}.{i}{PART_SUFFIX}" for i in range(len(ranges))]
+            ctx = multiprocessing.get_context()
+            with ctx.Pool(
+                njobs,
+                _init_match_filter,
+                (relation_dict, corpus_file_idx, sents_idx),
+            ) as pool:
+                results = pool.imap(_filter_transform_match_range, zip(ranges, parts))
+                for (fin, start, _), part, part_ids in zip(ranges, parts, results):
+                    if start == 0:
+                        logger.info("- %s" % fin)
+                    with open(part) as fh:
+                        for row in fh:
+                            matches_out.write(f"{match_i}\t{row}")
+                            match_i += 1
+                    os.remove(part)
+                    valid_sentence_ids.update(part_ids)
+            return valid_sentence_ids
         for fin in fins:
             logger.info("- %s" % fin)
-            with open(fin, "r") as matches_in:
-                for line in matches_in:
-                    match = DBMatch.fromline(line)
-                    match.corpus_file_id = str(corpus_file_idx[match.corpus_file_id])
-                    # check whether concordances and collocations still exist for match
-                    colloc_id = relation_dict.get(match.get_collocation_key())
-                    if colloc_id is None:
-                        continue
-                    sentence_id = (match.corpus_file_id, str(match.sentence_id))
-                    if sentence_id in sents_idx:
-                        matches_out.write(
-                            match.convert_to_database_entry(match_i, colloc_id) + "\n"
-                        )
-                        match_i += 1
-                        valid_sentence_ids.add(sentence_id)
+            for row in transform_matches(
+                fin, relation_dict, corpus_file_idx, sents_idx, valid_sentence_ids
+            ):
+                matches_out.write(f"{match_i}\t{row}")
+                match_i += 1
     return valid_sentence_ids
 
 
+class Collocations(dict[int, Colloc]):
+    """Collocations by id, as loaded by `load_collocations`.
+
+    Alongside the dict, the collocations are kept as columns in the order of
+    the dict: their `ids` and `frequencies`, and integer codes of their
+    relation labels and of their (lemma, tag) pairs, which index `labels`
+    and `lemmas`. The codes are assigned once, when the collocations are
+    loaded, so that they are scored and filtered on the columns (see
+    `compute_collocation_scores`). Items set later on the dict are not added
+    to the columns.
+    """
+
+    columns = ("ids", "frequencies", "label_ids", "lemma1_ids", "lemma2_ids")
+
+    def __init__(self, collocs: Iterable[Colloc] = ()) -> None:
+        collocs = list(collocs)
+        super().__init__(zip(map(attrgetter("id"), collocs), collocs))
+
+        def column(field: str) -> list:
+            return list(map(attrgetter(field), collocs))
+
+        self.ids = np.fromiter(self, dtype=np.int64, count=len(self))
+        # the type of the frequencies is kept, as they are written as given
+        self.frequencies = np.array(
+            column("frequency"), dtype=None if collocs else np.int64
+        )
+        self.labels, (self.label_ids,) = intern_codes(column("label"))
+        # (lemma, tag) pairs are coded by the codes of the lemma and the tag
+        lemmas, lemma_ids = intern_codes(column("lemma1"), column("lemma2"))
+        tags, tag_ids = intern_codes(column("lemma1_tag"), column("lemma2_tag"))
+        pairs, pair_ids = np.unique(
+            np.concatenate(lemma_ids) * len(tags) + np.concatenate(tag_ids),
+            return_inverse=True,
+        )
+        self.lemma1_ids, self.lemma2_ids = np.split(pair_ids.reshape(-1), 2)
+        self.lemmas = list(
+            zip(
+                np.array(lemmas, dtype=object)[pairs // max(1, len(tags))].tolist(),
+                np.array(tags, dtype=object)[pairs % max(1, len(tags))].tolist(),
+            )
+        )
+
+    def select(self, mask: np.ndarray) -> Collocations:
+        """Returns the collocations selected by a boolean mask of the columns."""
+        selected = Collocations()
+        ids = self.ids[mask].tolist()
+        selected.update(zip(ids, map(self.__getitem__, ids)))
+        selected.labels, selected.lemmas = self.labels, self.lemmas
+        for column in self.columns:
+            setattr(selected, column, getattr(self, column)[mask])
+        return selected
+
+    def frequencies_by_id(self) -> np.ndarray:
+        """Returns the frequencies indexed by collocation id, 0 for other ids."""
+        frequencies = np.zeros(self.ids.max(initial=0) + 1, dtype=np.float64)
+        frequencies[self.ids] = self.frequencies
+        return frequencies
+
+    def rows(self, scores: np.ndarray) -> Iterator[str]:
+        """Returns the rows of the collocations with their scores for the
+        collocations file."""
+        lemmas = np.array(self.lemmas, dtype=object).reshape(-1, 2)
+        lemmas1 = lemmas[self.lemma1_ids]
+        lemmas2 = lemmas[self.lemma2_ids]
+        return format_columns(
+            self.ids,
+            np.array(self.labels, dtype=object)[self.label_ids],
+            lemmas1[:, 0],
+            lemmas2[:, 0],
+            lemmas1[:, 1],
+            lemmas2[:, 1],
+            list(map(attrgetter("prep"), self.values())),
+            self.frequencies,
+            scores,
+        )
+
+
+def intern_codes(*columns: list) -> tuple[list, list[np.ndarray]]:
+    """Returns the distinct values of columns in order of first occurrence,
+    and the columns as arrays of the indices of their values."""
+    values = dict.fromkeys(itertools.chain(*columns))
+    codes = dict(zip(values, itertools.count()))
+    return list(values), [
+        np.fromiter(map(codes.__getitem__, column), dtype=np.int64, count=len(column))
+        for column in columns
+    ]
+
+
+def format_columns(*columns: Union[np.ndarray, list]) -> Iterator[str]:
+    """Joins columns to TSV rows, the values are formatted by `str`."""
+    row = "\t".join(["{}"] * len(columns)) + "\n"
+    return map(
+        row.format,
+        *(c.tolist() if isinstance(c, np.ndarray) else c for c in columns),
+    )
+
+
+def log_dice(
+    pair_freqs: np.ndarray, freqs1: np.ndarray, freqs2: np.ndarray
+) -> np.ndarray:
+    """Computes the logDice scores of pairs from the pair frequencies and the
+    frequencies of both parts, element-wise. Frequencies below 1 count as 1.
+
+    The logarithms are taken by `math.log2`, as `np.log2` differs from it in
+    the last bit for some values, which would change the written scores.
+    """
+    ratios = (
+        2 * np.maximum(1, pair_freqs) / (np.maximum(1, freqs1) + np.maximum(1, freqs2))
+    )
+    return 14 + np.fromiter(
+        map(math.log2, ratios.tolist()), dtype=np.float64, count=len(ratios)
+    )
+
+
+def collocation_frequencies(
+    collocs: Collocations, lemma_freqs: dict[tuple[str, str], int]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the columns of the collocation frequencies and of the
+    frequencies of both lemmas, in the order of the collocations. The lemma
+    frequencies are looked up once per lemma code."""
+    freqs = np.fromiter(
+        map(lemma_freqs.get, collocs.lemmas, itertools.repeat(0)),
+        dtype=np.float64,
+        count=len(collocs.lemmas),
+    )
+    return (
+        collocs.frequencies.astype(np.float64),
+        freqs[collocs.lemma1_ids],
+        freqs[collocs.lemma2_ids],
+    )
+
+
 def compute_collocation_scores(
     fout: str,
-    collocs: dict[int, Colloc],
-    lemma_freqs: defaultdict[tuple[str, str], int],
+    collocs: Collocations,
+    lemma_freqs: dict[tuple[str, str], int],
 ) -> set[int]:
     """
     Computes logDice values and writes collocations to file.
 
     Collocations with negative logDice are not written to the final file
-    but instead their ids are collected and returned.
+    but instead their ids are collected and returned. The scores are
+    computed at once for all collocations (see `collocation_frequencies`).
     """
+    scores = log_dice(*collocation_frequencies(collocs, lemma_freqs))
+    valid = scores >= 0
     with open(fout, "w") as f_out:
-        invalid_ids = set()
-        for c_id, c in collocs.items():
-            log_dice = 14 + math.log2(
-                2
-                * max(1, c.frequency)
-                / (
-                    max(1, lemma_freqs[(c.lemma1, c.lemma1_tag)])
-                    + max(1, lemma_freqs[(c.lemma2, c.lemma2_tag)])
-                )
-            )
-            if log_dice < 0:
-                invalid_ids.add(c_id)
-                continue
-            f_out.write(
-                "{c.id}\t{c.label}\t{c.lemma1}\t{c.lemma2}\t{c.lemma1_tag}\t{c.lemma2_tag}\t"
-                "{c.prep}\t{c.frequency}\t{score}\n".format(c=c, score=log_dice)
-            )
-    return invalid_ids
+        f_out.writelines(collocs.select(valid).rows(scores[valid]))
+    return set(collocs.ids[~valid].tolist())
 
 
 def filter_invalid_collocations(
-    collocations: dict[int, Colloc], invalid_ids: set[int]
-) -> dict[int, Colloc]:
-    return {
-        col_id: col for col_id, col in collocations.items() if col_id not in invalid_ids
-    }
+    collocations: Collocations, invalid_ids: set[int]
+) -> Collocations:
+    if not invalid_ids:
+        return collocations
+    invalid = np.fromiter(invalid_ids, dtype=np.int64, count=len(invalid_ids))
+    return collocations.select(~np.isin(collocations.ids, invalid))
 
 
 def extract_mwe_from_collocs(
@@ -468,7 +2600,7 @@ def extract_mwe_from_collocs(
         """Checks whether positions have one overlap."""
         return len(set(pos)) == (len(pos) - 1)
 
-    with open(mwe_match_fout, "w") as mwe_map:
+    with open_file(mwe_match_fout, "w") as mwe_map:
         mwe_freqs: defaultdict[int, int] = defaultdict(lambda: 1)
         mwe_ids: dict[tuple, int] = {}
         for sent in read_collapsed_sentence_matches(match_fin):
@@ -591,30 +2723,33 @@ def compute_mwe_scores(
     mwe_fout: str,
     mwe_ids,
     mwe_freqs,
-    collocations: dict[int, Colloc],
+    collocations: Collocations,
     min_freq: int = 5,
 ) -> None:
     """Calculates Log Dice score for MWE"""
-
+    n = len(mwe_ids)
+    freqs = np.fromiter(map(mwe_freqs.__getitem__, mwe_ids.values()), np.int64, n)
+    ids = np.fromiter(mwe_ids.values(), dtype=np.int64, count=n)
+    # columns of (collocation id, collocation id, label, lemma, tag, inverse)
+    mwes = np.array(list(mwe_ids), dtype=object).reshape(-1, 6)
+    valid = freqs >= min_freq
+    ids, freqs, mwes = ids[valid], freqs[valid], mwes[valid]
+    colloc_freqs = collocations.frequencies_by_id()
+    colloc_ids1 = mwes[:, 0].astype(np.int64)
+    colloc_ids2 = mwes[:, 1].astype(np.int64)
+    scores = log_dice(freqs, colloc_freqs[colloc_ids1], colloc_freqs[colloc_ids2])
     with open(mwe_fout, "w") as mwe_out:
-        for mwe, mwe_id in mwe_ids.items():
-            mwe_freq = mwe_freqs[mwe_id]
-            if mwe_freq < min_freq:
-                continue
-            c1, c2, label, lemma, tag, inv = mwe
-            log_dice = 14 + math.log2(
-                2
-                * max(1, mwe_freq)
-                / (
-                    max(1, collocations[c1].frequency)
-                    + max(1, collocations[c2].frequency)
-                )
-            )
-            mwe_out.write(
-                "{}\n".format(
-                    "\t".join(map(str, (mwe_id,) + mwe + (mwe_freq, log_dice)))
-                )
+        mwe_out.writelines(
+            format_columns(
+                ids,
+                colloc_ids1,
+                colloc_ids2,
+                *mwes[:, 2:5].T,
+                mwes[:, 5].astype(np.int64),
+                freqs,
+                scores,
             )
+        )
 
 
 def extract_collocations(match_fin: str, collocs_fout: str) -> None:
@@ -624,47 +2759,200 @@ def extract_collocations(match_fin: str, collocs_fout: str) -> None:
     Collocations contain only lemmatized match information and, additionally,
     frequencies are counted for matches. The mapping is written to a file
     and used later for simplifying the matches information.
+
+    During extraction, the mapping is computed by the workers already
+    (see `MatchCounter`), this function derives it from a matches file.
     """
-    relation_dict: defaultdict[
-        str, defaultdict[tuple[str, str, str, str, str], int]
-    ] = defaultdict(lambda: defaultdict(int))
-    with open(match_fin, "r") as fin:
-        for line in fin:
-            m = tuple(line.strip().split("\t"))
-            rel, lemma1, lemma2, tag1, tag2, prep = m[0:6]
-            relation_dict[rel][lemma1, lemma2, tag1, tag2, prep] += 1
+    collocations: Counter[tuple[str, ...]] = Counter()
+    for match_file in table_files(match_fin):
+        for match in read_table_rows(match_file):
+            collocations[tuple(match[0:6])] += 1
+    write_collocations(collocations, collocs_fout)
+
 
-    with open(collocs_fout, "w") as fh:
-        for rel, cols_dict in relation_dict.items():
-            for (lemma1, lemma2, tag1, tag2, prep), freq in cols_dict.items():
-                fh.write(f"{rel}\t{lemma1}\t{tag1}\t{lemma2}\t{tag2}\t{prep}\t{freq}\n")
+def write_collocations(collocations: Counter[tuple[str, ...]], fout: str) -> None:
+    with open(fout, "w") as fh:
+        for (rel, lemma1, lemma2, tag1, tag2, prep), freq in collocations.items():
+            fh.write(f"{rel}\t{lemma1}\t{tag1}\t{lemma2}\t{tag2}\t{prep}\t{freq}\n")
 
 
 def extract_most_common_surface(match_fin: str, fout: str) -> None:
     """Generates a mapping from a lemma to its most common surface form."""
-    common_surfaces: defaultdict[str, defaultdict[str, defaultdict[str, int]]] = (
-        defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-    )
-    with open(match_fin, "r") as fin:
-        for line in fin:
-            m = tuple(line.strip().split("\t"))
+    surfaces: Counter[tuple[str, str, str]] = Counter()
+    for match_file in table_files(match_fin):
+        for m in read_table_rows(match_file):
             rel, lemma1, lemma2, tag1, tag2, _, form1, form2 = m[:8]
-            common_surfaces[tag1][lemma1][form1] += 1
-            common_surfaces[tag2][lemma2][form2] += 1
+            surfaces[tag1, lemma1, form1] += 1
+            surfaces[tag2, lemma2, form2] += 1
+    write_common_surfaces(surfaces, fout)
+
+
+def write_common_surfaces(surfaces: Counter[tuple[str, str, str]], fout: str) -> None:
+    """Writes the most common surface form for each lemma and tag.
+
+    On equal frequencies, the surface form counted first is chosen.
+    """
+    common_surfaces: dict[tuple[str, str], tuple[str, int]] = {}
+    for (tag, lemma, surface), freq in surfaces.items():
+        if freq > common_surfaces.get((tag, lemma), ("", 0))[1]:
+            common_surfaces[tag, lemma] = surface, freq
+    with open(fout, "w") as fh:
+        for (tag, lemma), (surface, freq) in common_surfaces.items():
+            fh.write(f"{lemma}\t{tag}\t{surface}\t{freq}\n")
+
+
+def write_sorted_common_surfaces(
+    surfaces: Iterable[tuple[str, int]], fout: str
+) -> None:
+    """Writes the most common surface form for each lemma and tag, given the
+    surface counts sorted by tag, lemma and surface (see `MatchCounter`).
 
+    On equal frequencies, the first surface form in this order is chosen.
+    """
     with open(fout, "w") as fh:
-        for tag in common_surfaces:
-            for lemma in common_surfaces[tag]:
-                surface, freq = sorted(
-                    common_surfaces[tag][lemma].items(),
-                    key=lambda x: x[1],
-                    reverse=True,
-                )[0]
-                fh.write(f"{lemma}\t{tag}\t{surface}\t{freq}\n")
-
-
-def load_collocations(fins: list[str], min_rel_freq: int = 5) -> dict[int, Colloc]:
-    """Load collocations from file and filter by frequency limit."""
+        for tag_lemma, counts in itertools.groupby(
+            surfaces, key=lambda count: count[0].rsplit("\t", 1)[0]
+        ):
+            key, freq = max(counts, key=itemgetter(1))
+            tag, lemma, surface = key.split("\t")
+            fh.write(f"{lemma}\t{tag}\t{surface}\t{freq}\n")
+
+
+def collocation_buckets(fins: list[str], max_memory: Optional[int]) -> int:
+    """Returns the number of buckets needed to aggregate the collocations of
+    the files within `max_memory` bytes (see `COLLOCATION_MEMORY_FACTOR`)."""
+    if max_memory is None:
+        return 1
+    size = sum(os.path.getsize(fin) for fin in fins) * COLLOCATION_MEMORY_FACTOR
+    n_buckets = -(-size // max_memory)
+    if n_buckets > MAX_COLLOCATION_BUCKETS:
+        logger.warning(
+            "Collocations need %d buckets to fit in %d bytes, using %d."
+            % (n_buckets, max_memory, MAX_COLLOCATION_BUCKETS)
+        )
+        return MAX_COLLOCATION_BUCKETS
+    return max(1, n_buckets)
+
+
+def partition_collocations(
+    fins: list[str], prefix: str, n_buckets: int, compression: Optional[str] = None
+) -> tuple[list[str], dict[str, int]]:
+    """Distributes the collocations of the files to bucket files by the hash
+    of their key.
+
+    The lines are written to `<prefix>.<bucket>` as they are, preceded by
+    their position in the input, so that all frequencies of a collocation
+    end up in the same bucket in input order.
+
+    Returns:
+        names of the bucket files and the relations in order of their first
+        occurrence
+    """
+    bucket_files = [
+        compressed_name(f"{prefix}.{bucket}", compression)
+        for bucket in range(n_buckets)
+    ]
+    relations: dict[str, int] = {}
+    with contextlib.ExitStack() as stack:
+        outs = [stack.enter_context(open_file(f, "w")) for f in bucket_files]
+        position = 0
+        for fin in fins:
+            with open(fin, "r") as f_in:
+                for line in f_in:
+                    line = line.strip()
+                    key = line.rsplit("\t", 1)[0]
+                    relations.setdefault(key.split("\t", 1)[0], len(relations))
+                    bucket = zlib.crc32(key.encode("utf-8")) % n_buckets
+                    outs[bucket].write(f"{position}\t{line}\n")
+                    position += 1
+    return bucket_files, relations
+
+
+def aggregate_collocation_bucket(
+    fname: str, relations: dict[str, int], min_rel_freq: int
+) -> list[tuple[int, int, tuple[str, ...], int]]:
+    """Sums the frequencies of the collocations of a bucket file.
+
+    Returns:
+        collocations with at least frequency `min_rel_freq` as tuples of the
+        rank of the relation, the position of the first occurrence, the key
+        `(rel, lemma1, lemma2, tag1, tag2, prep)` and the frequency
+    """
+    freqs: dict[tuple[str, ...], int] = {}
+    # positions of the first occurrences, in the order of `freqs`
+    positions = []
+    with open_file(fname) as fh:
+        for line in fh:
+            position, rel, lemma1, tag1, lemma2, tag2, prep, freq = line.split("\t")
+            key = (rel, lemma1, lemma2, tag1, tag2, prep)
+            if key in freqs:
+                freqs[key] += int(freq)
+            else:
+                freqs[key] = int(freq)
+                positions.append(int(position))
+    return [
+        (relations[key[0]], position, key, freq)
+        for (key, freq), position in zip(freqs.items(), positions)
+        if freq >= min_rel_freq
+    ]
+
+
+def load_collocations(
+    fins: list[str],
+    min_rel_freq: int = 5,
+    max_memory: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
+    compression: Optional[str] = None,
+    njobs: int = 1,
+) -> Collocations:
+    """Load collocations from file and filter by frequency limit.
+
+    The collocations are numbered by relation in order of the first
+    occurrence of the relation, and within a relation in order of the first
+    occurrence of the collocation.
+
+    If aggregating all collocations at once would take more than
+    `max_memory` bytes, they are partitioned into bucket files in a
+    temporary directory in `tmp_dir` (see `partition_collocations`), which
+    are aggregated one at a time. Only the collocations passing the
+    frequency limit are kept, and numbered as above. With `njobs` > 1, the
+    collocations are always partitioned into at least `njobs` buckets,
+    which are aggregated by a pool of processes sharing `max_memory`.
+
+    The lemmas and labels of the collocations are coded once here, for the
+    columns of the returned `Collocations`.
+    """
+    n_buckets = collocation_buckets(fins, max_memory and max_memory // njobs)
+    if njobs > 1:
+        n_buckets = max(n_buckets, njobs)
+    if n_buckets > 1:
+        logger.info("Aggregate collocations in %d buckets." % n_buckets)
+        with (
+            tempfile.TemporaryDirectory(dir=tmp_dir) as bucket_dir,
+            contextlib.ExitStack() as stack,
+        ):
+            bucket_files, relations = partition_collocations(
+                fins, os.path.join(bucket_dir, "collocations"), n_buckets, compression
+            )
+            aggregate = functools.partial(
+                aggregate_collocation_bucket,
+                relations=relations,
+                min_rel_freq=min_rel_freq,
+            )
+            if njobs > 1:
+                pool = stack.enter_context(multiprocessing.get_context().Pool(njobs))
+                buckets = pool.imap(aggregate, bucket_files)
+            else:
+                buckets = map(aggregate, bucket_files)
+            aggregated = []
+            for fname, bucket in zip(bucket_files, buckets):
+                aggregated.extend(bucket)
+                os.remove(fname)
+        aggregated.sort(key=itemgetter(0, 1))
+        return Collocations(
+            Colloc(c_id, *key, 0, freq)
+            for c_id, (_, _, key, freq) in enumerate(aggregated, start=1)
+        )
     relation_dict: defaultdict[
         str, defaultdict[tuple[str, str, str, str, str], int]
     ] = defaultdict(lambda: defaultdict(int))
@@ -678,16 +2966,16 @@ def load_collocations(fins: list[str], min_rel_freq: int = 5) -> dict[int, Collo
                     int(m[6]),
                 )
                 relation_dict[rel][(lemma1, lemma2, tag1, tag2, prep)] += freq
-    collocs = {}
+    collocs = []
     c_id = 1
     for rel, cols_dict in relation_dict.items():
         for (lemma1, lemma2, tag1, tag2, prep), freq in cols_dict.items():
             if freq >= min_rel_freq:
-                collocs[c_id] = Colloc(
-                    c_id, rel, lemma1, lemma2, tag1, tag2, prep, 0, freq
+                collocs.append(
+                    Colloc(c_id, rel, lemma1, lemma2, tag1, tag2, prep, 0, freq)
                 )
                 c_id += 1
-    return collocs
+    return Collocations(collocs)
 
 
 def compute_token_statistics(
@@ -737,30 +3025,66 @@ def compute_stats(
     output_path: str,
     min_freq: int = 5,
     with_mwe: bool = False,
+    compression: Optional[str] = None,
+    hash_bits: int = 128,
+    max_memory: Optional[int] = None,
+    njobs: int = 1,
 ) -> None:
-    "Aggregate data from subcorpora and compute collocations scores."
+    """Aggregate data from subcorpora and compute collocations scores.
+
+    With a `compression`, temporary files and duplicate concordances are
+    written as compressed streams. Duplicate concordances are detected by
+    sentence hashes of `hash_bits` bits (see `reindex_concordances`). The
+    collocations are aggregated in partitions on disk if they would take
+    more than `max_memory` bytes (see `load_collocations`). With `njobs` > 1,
+    the collocations are aggregated and the matches filtered by pools of
+    processes, the results are the same as with a single job.
+    """
     # define output file paths
     corpus_file = os.path.join(output_path, "corpus_files")
-    corpus_file_tmp = os.path.join(output_path, "corpus_files.tmp")
+    corpus_file_tmp = os.path.join(
+        output_path, compressed_name("corpus_files.tmp", compression)
+    )
     concordance_file = os.path.join(output_path, "concord_sentences")
-    concordance_file_tmp = os.path.join(output_path, "concord_sentences.tmp")
-    duplicate_sents_file = os.path.join(output_path, "concord_sentences.duplicate")
+    concordance_file_tmp = os.path.join(
+        output_path, compressed_name("concord_sentences.tmp", compression)
+    )
+    duplicate_sents_file = os.path.join(
+        output_path, compressed_name("concord_sentences.duplicate", compression)
+    )
+    mwe_match_file = os.path.join(
+        output_path, compressed_name("mwe_match_full", compression)
+    )
 
     logger.info("REINDEX corpus files")
     corpus_file_idx = reindex_corpus_files(
-        [os.path.join(p, "corpus_files") for p in storage_paths],
+        [
+            f
+            for p in storage_paths
+            for f in table_files(os.path.join(p, "corpus_files"))
+        ],
         corpus_file_tmp,
     )
     logger.info("DEDUPLICATE concordances")
     sents_idx = reindex_concordances(
-        [os.path.join(p, "concord_sentences") for p in storage_paths],
+        [
+            f
+            for p in storage_paths
+            for f in table_files(os.path.join(p, "concord_sentences"))
+        ],
         concordance_file_tmp,
         corpus_file_idx,
         duplicate_sents_file,
+        hash_bits,
     )
     logger.info("LOAD FILTERED collocations")
     collocs = load_collocations(
-        [os.path.join(p, "collocations") for p in storage_paths], min_freq
+        [os.path.join(p, "collocations") for p in storage_paths],
+        min_freq,
+        max_memory,
+        output_path,
+        compression,
+        njobs,
     )
     logger.info(
         "%d collocations with at least frequency %d collected."
@@ -780,22 +3104,23 @@ def compute_stats(
     )
     logger.info("FILTER matches.")
     valid_sentence_ids = filter_transform_matches(
-        [os.path.join(p, "matches") for p in storage_paths],
+        [f for p in storage_paths for f in table_files(os.path.join(p, "matches"))],
         os.path.join(output_path, "matches"),
         corpus_file_idx,
         sents_idx,
         collocs,
+        njobs,
     )
     logger.info(
         "Found %d valid concordances (of %d)."
         % (len(valid_sentence_ids), len(sents_idx))
     )
-    sents_idx = set()
+    del sents_idx
     corpus_file_idx = {}
     logger.info("FILTER corpus files and sentences.")
     filter_corpus_files(corpus_file_tmp, corpus_file, valid_sentence_ids)
     filter_concordances(concordance_file_tmp, concordance_file, valid_sentence_ids)
-    valid_sentence_ids = set()
+    del valid_sentence_ids
     logger.info("Remove temporary files")
     os.remove(concordance_file_tmp)
     os.remove(corpus_file_tmp)
@@ -811,7 +3136,7 @@ def compute_stats(
         logger.info("MAKE MWE LVL 1")
         mwe_ids, mwe_freqs = extract_mwe_from_collocs(
             os.path.join(output_path, "matches"),
-            os.path.join(output_path, "mwe_match_full"),
+            mwe_match_file,
             collocs,
         )
         # remove all MWE that don't appear in mwe_freqs, i.e. appear only once
@@ -831,32 +3156,42 @@ def compute_stats(
         mwe_freqs_filtered = {
             mwe_id: freq for mwe_id, freq in mwe_freqs.items() if freq >= min_freq
         }
-        filter_mwe_matches(output_path, mwe_freqs_filtered)
+        filter_mwe_matches(output_path, mwe_freqs_filtered, compression)
         # remove temporary file with MWE matches
-        os.remove(os.path.join(output_path, "mwe_match_full"))
+        os.remove(mwe_match_file)
+
+
+def parse_ids(fields: list[str], columns: int = 1) -> np.ndarray:
+    """Parses the integer ids of the rows of a table, given as one string of
+    `columns` tab-separated ids per row, into an array of shape
+    (rows, columns)."""
+    ids = np.fromstring("\t".join(fields), dtype=np.int64, sep=" ")
+    if len(ids) != len(fields) * columns:
+        raise ValueError(f"Invalid ids in rows: {fields[:3]}...")
+    return ids.reshape(-1, columns)
 
 
 def filter_concordances(
-    tmp_file: str, final_file: str, valid_sentence_ids: set[tuple[str, str]]
+    tmp_file: str, final_file: str, valid_sentence_ids: SentenceIndex
 ) -> None:
-    with open(tmp_file) as fh:
-        with open(final_file, "w") as fo:
-            for line in fh:
-                sent_id = tuple(line.strip().split("\t")[:2])
-                if sent_id in valid_sentence_ids:
-                    print(line, end="", file=fo)
+    with open_file(tmp_file) as fh, open(final_file, "w") as fo:
+        while lines := fh.readlines(FILTER_BATCH_ROWS * 64):
+            ids = parse_ids(
+                [line[: line.index("\t", line.index("\t") + 1)] for line in lines],
+                2,
+            )
+            found = valid_sentence_ids.contains_many(ids[:, 0], ids[:, 1])
+            fo.writelines(itertools.compress(lines, found))
 
 
 def filter_corpus_files(
-    tmp_file: str, final_file: str, valid_sentence_ids: set[tuple[str, str]]
+    tmp_file: str, final_file: str, valid_sentence_ids: SentenceIndex
 ) -> None:
-    valid_doc_ids = {sent_id[0] for sent_id in valid_sentence_ids}
-    with open(tmp_file) as fh:
-        with open(final_file, "w") as fo:
-            for line in fh:
-                doc_id = line.strip().split("\t")[0]
-                if doc_id in valid_doc_ids:
-                    print(line, end="", file=fo)
+    with open_file(tmp_file) as fh, open(final_file, "w") as fo:
+        while lines := fh.readlines(FILTER_BATCH_ROWS * 64):
+            ids = parse_ids([line.partition("\t")[0] for line in lines])
+            found = valid_sentence_ids.has_documents(ids[:, 0])
+            fo.writelines(itertools.compress(lines, found))
 
 
 def aggregate_lemma_frequencies(
@@ -871,8 +3206,11 @@ def aggregate_lemma_frequencies(
     return lemma_frequencies
 
 
-def filter_mwe_matches(final_path: str, mwe_freqs: dict[int, int]) -> None:
-    with open(os.path.join(final_path, "mwe_match_full")) as fh:
+def filter_mwe_matches(
+    final_path: str, mwe_freqs: dict[int, int], compression: Optional[str] = None
+) -> None:
+    mwe_match_file = compressed_name("mwe_match_full", compression)
+    with open_file(os.path.join(final_path, mwe_match_file)) as fh:
         with open(os.path.join(final_path, "mwe_match"), "w") as fo:
             for line in fh:
                 mwe_id = int(line.strip().split("\t")[0])